@@ -1,10 +1,10 @@
 import os
+import asyncio
 import json
 import re
-import time
 import hashlib
+import time
 import uuid
-import urllib.parse
 from datetime import datetime
 from pathlib import Path
 from typing import Optional, Dict, Any, Tuple, List
@@ -14,10 +14,9 @@ try:
 except ModuleNotFoundError:
     pass
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from typing import Optional
 try:
     import google.generativeai as genai
 except ModuleNotFoundError as e:
@@ -27,12 +26,53 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from plotly.utils import PlotlyJSONEncoder
+import plotly.io as pio
 from scipy.interpolate import griddata
-from sqlalchemy import create_engine, text, inspect
-from sqlalchemy.pool import QueuePool
+from sqlalchemy import text
 from sqlalchemy.engine import Engine
-import pyodbc
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+from backend.safe_sql import (
+    validate_chart_request,
+    build_sql,
+    quote_ident,
+    build_range_probe_sql,
+    build_binned_sql,
+    build_box_stats_sql,
+    choose_bins,
+    get_aggregated_y_axis_name,
+    BinAxis,
+    SafeSQLError,
+    MAX_DENSITY_BINS,
+    MAX_DENSITY_BINS_3D,
+    MAX_HISTOGRAM_BINS,
+    LIMIT_DIALECTS,
+)
+from backend.executors import (
+    run_llm,
+    run_db,
+    run_render,
+    get_executor_stats,
+    shutdown_executors,
+)
+from backend.schema_metadata import (
+    TARGET_TABLES,
+    ColumnMetadataStore,
+)
+from backend.intent_parser import IntentParser
+from backend.param_cache import ParamCache
+from backend.singleflight import SingleFlight
+from backend.config import get_cache_settings, get_columnar_settings, get_replica_settings, get_rollup_settings
+from backend.db_backend import DatabaseBackend, get_database_backend
+from backend.db_pool import PoolMetrics, warm_pool
+from backend.readiness import Readiness
+from backend.cache_backends import create_cache
+from backend.json_encoding import RawJSON, encode_json, encode_json_text
+from backend.downsample import DOWNSAMPLE_MAX_ROWS, downsample_frame, target_points
+from backend.arrow_transport import ARROW_STREAM_MEDIA_TYPE, accepts_arrow, encode_arrow_response
+from backend.columnar import ColumnarEngine, duckdb_available
+from backend.replica import SnapshotReplica
+from backend.rollups import RollupStore, rollup_specs_from_schema
+from backend.table_versions import TableVersions, build_fingerprint_sql, detects_updates, fingerprints_from_rows
 
 # Configure FastAPI with backend-relative paths
 # Get backend directory path
@@ -50,6 +90,7 @@ class ChatRequest(BaseModel):
     message: str
     language: Optional[str] = None
     forced_chart_type: Optional[str] = None
+    plot_width: Optional[int] = None  # Chart width in pixels; sizes line/area downsampling
 
 # --- LLM API Configuration ---
 # Load from environment variable, with fallback for backward compatibility
@@ -64,48 +105,33 @@ genai.configure(api_key=GEMINI_API_KEY)
 model_for_chart_params = genai.GenerativeModel('gemini-2.5-flash', generation_config={'temperature': 0})
 model_for_suggestions = genai.GenerativeModel('gemini-2.5-flash')
 
-# --- Database Configuration (Azure SQL) ---
-# All credentials loaded from environment variables (required)
-AZURE_SQL_SERVER = os.getenv('AZURE_SQL_SERVER')
-AZURE_SQL_DATABASE = os.getenv('AZURE_SQL_DATABASE')
-AZURE_SQL_USERNAME = os.getenv('AZURE_SQL_USERNAME')
-AZURE_SQL_PASSWORD = os.getenv('AZURE_SQL_PASSWORD')
-AZURE_SQL_DRIVER = os.getenv('AZURE_SQL_DRIVER', '{ODBC Driver 17 for SQL Server}')
-
-# Validate required environment variables
-if not all([AZURE_SQL_SERVER, AZURE_SQL_DATABASE, AZURE_SQL_USERNAME, AZURE_SQL_PASSWORD]):
-    raise ValueError(
-        "Missing required Azure SQL environment variables. Please set:\n"
-        "  - AZURE_SQL_SERVER\n"
-        "  - AZURE_SQL_DATABASE\n"
-        "  - AZURE_SQL_USERNAME\n"
-        "  - AZURE_SQL_PASSWORD\n"
-        "Optional: AZURE_SQL_DRIVER (defaults to '{ODBC Driver 17 for SQL Server}')\n"
-        "See .env.example for template."
-    )
-
-# Build connection string for SQLAlchemy
-# URL-encode driver name and credentials for proper connection string
-driver_encoded = urllib.parse.quote_plus(AZURE_SQL_DRIVER)
-username_encoded = urllib.parse.quote_plus(AZURE_SQL_USERNAME)
-password_encoded = urllib.parse.quote_plus(AZURE_SQL_PASSWORD)
-
-CONNECTION_STRING = (
-    f"mssql+pyodbc://{username_encoded}:{password_encoded}@"
-    f"{AZURE_SQL_SERVER}/{AZURE_SQL_DATABASE}?"
-    f"driver={driver_encoded}&"
-    f"Encrypt=yes&TrustServerCertificate=no&Connection+Timeout=30"
-)
+# --- Database Configuration ---
+# Azure SQL (AZURE_SQL_* variables) or a local SQLite file (DATABASE_URL); see backend/db_backend.py
+_db_backend = get_database_backend()
+# SQL dialect passed to safe_sql builders: TOP + bracket quoting, or LIMIT + double quotes
+SQL_DIALECT = _db_backend.dialect
+print(f"Database backend: {SQL_DIALECT}")
 
 # --- Caching Configuration ---
-# Schema cache: {value: schema_dict, expires_at: timestamp}
-_schema_cache: Optional[Tuple[Dict, float]] = None
+# Schema cache: column metadata for all target tables (see _schema_store below)
 SCHEMA_CACHE_TTL = 1800  # 30 minutes
 
-# Response cache: {cache_key: (response_dict, expires_at)}
-_response_cache: Dict[str, Tuple[Dict, float]] = {}
+# Cache backend (memory | sqlite | redis) shared by the response and schema caches
+_cache_settings = get_cache_settings()
+
+# Response cache: LRU + TTL with an entry limit and a memory budget (see _response_cache below)
+# Entries are dropped when their table changes (see _table_versions below). Tables whose
+# version sees UPDATEs (rowversion or modified-date column) keep entries up to
+# RESPONSE_CACHE_MAX_TTL; all others, or any table whose version is unknown, RESPONSE_CACHE_TTL
 RESPONSE_CACHE_TTL = 120  # 2 minutes
+RESPONSE_CACHE_MAX_TTL = int(os.getenv('RESPONSE_CACHE_MAX_TTL', '3600'))
+TABLE_VERSION_CHECK_SECONDS = float(os.getenv('TABLE_VERSION_CHECK_SECONDS', '10'))
 MAX_RESPONSE_CACHE_ENTRIES = 200
+MAX_RESPONSE_CACHE_BYTES = 64 * 1024 * 1024  # 64 MB of encoded responses
+
+# Chart parameter cache: paraphrases reuse validated Gemini output (see _param_cache below)
+PARAM_CACHE_TTL = 3600  # 1 hour
+MAX_PARAM_CACHE_ENTRIES = 500
 
 # --- Chart Type Constants ---
 VALID_CHART_TYPES = {
@@ -136,6 +162,14 @@ CHART_TYPE_MAPPING = {
     '3d': '3d_scatter_plot', '3d_scatter': '3d_scatter_plot', '3d_scatter_plot': '3d_scatter_plot', '3d scatter': '3d_scatter_plot',
 }
 
+# Deterministic parser for simple requests; falls back to Gemini when unsure
+_intent_parser = IntentParser(CHART_TYPE_MAPPING)
+_param_cache = ParamCache(CHART_TYPE_MAPPING, ttl=PARAM_CACHE_TTL, max_entries=MAX_PARAM_CACHE_ENTRIES)
+
+# In-flight coalescing: identical concurrent /chat requests and identical chart SQL run once
+_chat_flights = SingleFlight()
+_query_flights = SingleFlight()
+
 def normalize_chart_type(chart_type: Optional[str]) -> Optional[str]:
     """Normalize chart type to canonical backend value."""
     if not chart_type:
@@ -160,22 +194,6 @@ def ensure_json_dict(x: Any) -> Optional[Dict]:
         return json.loads(x)
     raise TypeError(f"Expected dict, str, bytes, or None, got {type(x).__name__}")
 
-def to_json_safe_plotly(obj: Any) -> Any:
-    """
-    Convert Plotly objects (and nested numpy/pandas types) to JSON-serializable Python types.
-    Uses PlotlyJSONEncoder to handle numpy arrays, pandas timestamps, and Plotly-specific types.
-    """
-    if obj is None:
-        return None
-    try:
-        # Use PlotlyJSONEncoder to serialize, then parse back to get pure Python types
-        json_str = json.dumps(obj, cls=PlotlyJSONEncoder)
-        return json.loads(json_str)
-    except (TypeError, ValueError) as e:
-        # Fallback: return as-is if serialization fails (shouldn't happen with PlotlyJSONEncoder)
-        print(f"Warning: Failed to convert Plotly object to JSON-safe format: {e}")
-        return obj
-
 def extract_json_from_text(text: str) -> Optional[Dict]:
     """
     Extract the first valid JSON object from text that may contain markdown, code fences, or extra text.
@@ -309,130 +327,156 @@ def assess_chart_suitability(chart_type: str, df: pd.DataFrame, chart_params: Di
     
     return result
 
-def _get_response_cache_key(message: str, language: str, forced_chart_type: Optional[str] = None) -> str:
+def _get_response_cache_key(message: str, language: str, forced_chart_type: Optional[str] = None, schema_version: str = '', max_points: int = 0) -> str:
     """Generate cache key for response caching."""
-    normalized = message.lower().strip()
-    key_input = f"{normalized}|{language}|{forced_chart_type or ''}"
+    normalized = ' '.join(message.lower().split())
+    key_input = f"{normalized}|{language}|{forced_chart_type or ''}|{schema_version}|{max_points}"
     return hashlib.sha256(key_input.encode('utf-8')).hexdigest()
 
-def _clean_response_cache():
-    """Remove expired entries and enforce LRU size limit."""
-    current_time = time.time()
-    expired_keys = [k for k, (_, exp) in _response_cache.items() if exp < current_time]
-    for k in expired_keys:
-        del _response_cache[k]
-    
-    # LRU: if over limit, remove oldest entries
-    if len(_response_cache) > MAX_RESPONSE_CACHE_ENTRIES:
-        sorted_items = sorted(_response_cache.items(), key=lambda x: x[1][1])
-        to_remove = len(_response_cache) - MAX_RESPONSE_CACHE_ENTRIES
-        for k, _ in sorted_items[:to_remove]:
-            del _response_cache[k]
+def _get_cached_response(cache_key: str) -> Optional[str]:
+    """
+    Look up a cached response body (expired entries are dropped on access).
+    Entries computed from an older version of their table are invalidated.
+    """
+    entry = _response_cache.get(cache_key)
+    if not isinstance(entry, dict):
+        return None
+    current_version = _table_versions.get(entry['table'])
+    if current_version is None or entry['version'] is None:
+        # Change detection unavailable: fall back to the fixed TTL
+        max_age = RESPONSE_CACHE_TTL
+    elif current_version == entry['version']:
+        max_age = _response_max_age(entry['table'])
+    else:
+        max_age = -1
+    if time.time() - entry['stored_at'] <= max_age:
+        return entry['body']
+    _response_cache.discard(cache_key)
+    return None
+
+def _response_max_age(table_name: str) -> float:
+    """
+    How long an unchanged table's cached responses stay valid. Without a rowversion
+    or modified-date column its version misses UPDATEs, so the short TTL applies.
+    """
+    column_types = _schema_store.get().get_column_types(table_name)
+    if column_types and detects_updates(table_name, column_types, db_type=SQL_DIALECT):
+        return RESPONSE_CACHE_MAX_TTL
+    return RESPONSE_CACHE_TTL
+
+def _cache_response(cache_key: str, table_name: str, table_version: Optional[str], response_text: str) -> None:
+    """Cache an encoded response body with the version of the table it was computed from."""
+    _response_cache.put(cache_key, {
+        'table': table_name, 'version': table_version, 'stored_at': time.time(), 'body': response_text
+    })
+
+# Entries hold encoded response bodies (JSON text), so the body length is their size
+_response_cache = create_cache(
+    _cache_settings, 'response', RESPONSE_CACHE_MAX_TTL, MAX_RESPONSE_CACHE_ENTRIES, MAX_RESPONSE_CACHE_BYTES,
+    sizer=lambda entry: len(entry['body'])
+)
+
+def get_response_cache_stats() -> Dict[str, Any]:
+    """Return response cache counters for monitoring."""
+    return _response_cache.get_stats()
 
 # SQLAlchemy engine with connection pooling
 _db_engine: Optional[Engine] = None
+_db_pool_metrics: Optional[PoolMetrics] = None
 
 def get_db_engine() -> Engine:
     """
     Get or create SQLAlchemy engine with connection pooling.
-    Uses QueuePool for connection management with timeouts.
+    The pool is sized by the SQL_POOL_* settings (see DatabaseBackend.create_engine)
+    and instrumented for /metrics (see backend/db_pool.py).
     """
-    global _db_engine
+    global _db_engine, _db_pool_metrics
     if _db_engine is None:
-        _db_engine = create_engine(
-            CONNECTION_STRING,
-            poolclass=QueuePool,
-            pool_size=5,
-            max_overflow=10,
-            pool_timeout=30,
-            pool_recycle=3600,  # Recycle connections after 1 hour
-            echo=False  # Set to True for SQL query logging
-        )
+        engine = _db_backend.create_engine()
+        _db_pool_metrics = PoolMetrics(engine)
+        _db_engine = engine
     return _db_engine
 
 def get_db_connection():
     """
     Establishes and returns a database connection using SQLAlchemy.
-    Returns a connection from the connection pool.
+    Returns a connection from the connection pool, or None if none is available;
+    waits, pool timeouts and connection errors are recorded in the pool metrics.
     """
     try:
-        engine = get_db_engine()
-        return engine.connect()
+        get_db_engine()
+        return _db_pool_metrics.connect()
+    except SQLAlchemyTimeoutError as ex:
+        pool = _db_backend.pool
+        print(
+            f"Database connection pool exhausted: no connection free after {pool.timeout}s "
+            f"({pool.size} + {pool.max_overflow} overflow in use): {ex}"
+        )
+        return None
     except Exception as ex:
         print(f"Database connection error: {type(ex).__name__}: {ex}")
         return None
 
-def get_all_table_schemas():
-    """
-    Fetches all table names and their column schemas from Azure SQL Server.
-    Uses INFORMATION_SCHEMA and caches for 30 minutes to improve performance.
-    Only includes target tables: Account, Contact, Lead, Opportunity.
-    """
-    global _schema_cache
-    
-    # Check cache
-    current_time = time.time()
-    if _schema_cache is not None:
-        schema_dict, expires_at = _schema_cache
-        if expires_at > current_time:
-            return schema_dict
+# With a shared cache backend, one worker's schema discovery serves every worker on the host
+_shared_schema_cache = (
+    create_cache(_cache_settings, 'schema', SCHEMA_CACHE_TTL, 16, 4 * 1024 * 1024)
+    if _cache_settings.backend != 'memory' else None
+)
+
+def _load_schema_rows():
+    """Load column metadata for all target tables in one query (INFORMATION_SCHEMA or PRAGMA)."""
+    shared_key = f"columns:{_db_backend.name}"
+    if _shared_schema_cache is not None:
+        rows = _shared_schema_cache.get(shared_key)
+        if rows:
+            return [tuple(row) for row in rows]
     
-    # Cache miss or expired - fetch fresh
-    conn = None
-    all_table_schemas = {}
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection unavailable")
     try:
-        conn = get_db_connection()
-        if conn:
-            # Target tables only
-            target_tables = ['Account', 'Contact', 'Lead', 'Opportunity']
-            
-            for table_name in target_tables:
-                all_columns = []
-                numerical_columns = []
-                date_columns = []
-                categorical_columns = []
-                
-                # Query INFORMATION_SCHEMA for column metadata
-                query = text("""
-                    SELECT COLUMN_NAME, DATA_TYPE 
-                    FROM INFORMATION_SCHEMA.COLUMNS 
-                    WHERE TABLE_NAME = :table_name 
-                    AND TABLE_CATALOG = :database
-                    ORDER BY ORDINAL_POSITION
-                """)
-                result = conn.execute(query, {'table_name': table_name, 'database': AZURE_SQL_DATABASE})
-                
-                for row in result:
-                    col_name = row.COLUMN_NAME
-                    data_type = row.DATA_TYPE.lower()
-                    all_columns.append(col_name)
-        
-                    # Classify column types
-                    if data_type in ['int', 'smallint', 'bigint', 'tinyint', 'decimal', 'numeric', 'real', 'float', 'money', 'smallmoney', 'bit']:
-                        numerical_columns.append(col_name)
-                    elif data_type in ['date', 'datetime', 'datetime2', 'smalldatetime', 'timestamp', 'time', 'datetimeoffset']:
-                        date_columns.append(col_name)
-                    else:
-                        categorical_columns.append(col_name)
-                
-                if all_columns:  # Only add if table exists and has columns
-                    all_table_schemas[table_name] = {
-                        'all_columns': all_columns,
-                        'numerical_columns': numerical_columns,
-                        'date_columns': date_columns,
-                        'categorical_columns': categorical_columns
-                    }
-    except Exception as e:
-        print(f"Error getting table schemas: {e}")
-        import traceback
-        traceback.print_exc()
+        rows = _db_backend.load_columns(conn, TARGET_TABLES)
     finally:
-        if conn:
-            conn.close()
+        conn.close()
     
-    # Update cache
-    _schema_cache = (all_table_schemas, current_time + SCHEMA_CACHE_TTL)
-    return all_table_schemas
+    if _shared_schema_cache is not None and rows:
+        _shared_schema_cache.put(shared_key, rows)
+    return rows
+
+# Single column metadata store read by every request path
+_schema_store = ColumnMetadataStore(_load_schema_rows, SCHEMA_CACHE_TTL, table_order=TARGET_TABLES)
+
+def _load_table_versions() -> Dict[str, str]:
+    """Fingerprint all target tables (row count + change markers) in one query."""
+    snapshot = _schema_store.get()
+    tables = {table: snapshot.get_column_types(table) for table in TARGET_TABLES if snapshot.get_column_types(table)}
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("Database connection unavailable")
+    try:
+        rows = conn.execute(text(build_fingerprint_sql(tables, db_type=SQL_DIALECT))).fetchall()
+    finally:
+        conn.close()
+    return fingerprints_from_rows(rows)
+
+# Per-table change detection for cached responses
+_table_versions = TableVersions(_load_table_versions, TABLE_VERSION_CHECK_SECONDS)
+
+def get_all_table_schemas():
+    """
+    Fetches all table names and their column schemas from the chart database.
+    Uses one batched INFORMATION_SCHEMA query and caches for 30 minutes to improve performance.
+    Only includes target tables: Account, Contact, Lead, Opportunity.
+    """
+    return _schema_store.get().tables
+
+def get_column_metadata(table_name: str) -> Dict[str, str]:
+    """Return {column_name: data_type} for a table from the shared metadata store."""
+    return _schema_store.get().get_column_types(table_name)
+
+def get_schema_version() -> str:
+    """Return a short hash identifying the currently cached schema."""
+    return _schema_store.get().version
     
 def validate_chart_fields(chart_type: str, chart_params: Dict, schema_info: Dict) -> Tuple[bool, Optional[str], Optional[List[str]]]:
     """
@@ -477,128 +521,110 @@ def validate_chart_fields(chart_type: str, chart_params: Dict, schema_info: Dict
     
     return True, None, None
 
-def fetch_data_for_chart(chart_params):
+def build_chart_query(chart_params, db_type: Optional[str] = None) -> Optional[str]:
     """
-    Fetches data from Azure SQL Server based on chart parameters.
-    Applies row limits: 1000 for non-aggregated, 50 groups for aggregated.
-    Uses SQL Server dialect (TOP instead of LIMIT, bracket quoting).
+    Builds the SQL for a chart request without touching the database.
+    Aggregations are pushed down to SQL via safe_sql.build_sql (GROUP BY + TOP),
+    so at most MAX_GROUPS rows are transferred for aggregated charts (aggregated series
+    in x order and other charts: chart_row_limit() rows; line/area rows are ordered by x,
+    so the cap keeps a contiguous range for downsampling). Uses the backend's dialect (TOP or LIMIT, bracket or double-quote quoting)
+    unless db_type is given (see READ_DIALECTS).
+    For aggregated charts, chart_params['y_axis'] is renamed to the aggregate alias.
     """
+    db_type = db_type or SQL_DIALECT
     table_name = chart_params.get('table_name')
     if not table_name:
         print("Error: Table name not provided in chart_params.")
         return None
     
-    conn = None
-    df = None
-    try:
-        conn = get_db_connection()
-        if not conn:
-            return None
-        
-        # Get column metadata from INFORMATION_SCHEMA
-        column_metadata = {}
-        query = text("""
-            SELECT COLUMN_NAME, DATA_TYPE 
-            FROM INFORMATION_SCHEMA.COLUMNS 
-            WHERE TABLE_NAME = :table_name 
-            AND TABLE_CATALOG = :database
-            ORDER BY ORDINAL_POSITION
-        """)
-        result = conn.execute(query, {'table_name': table_name, 'database': AZURE_SQL_DATABASE})
-        for row in result:
-            column_metadata[row.COLUMN_NAME] = row.DATA_TYPE
+    x_col = chart_params.get('x_axis')
+    y_col = chart_params.get('y_axis')
+    color_col = chart_params.get('color')
+    z_col = chart_params.get('z_axis')
+    size_col = chart_params.get('size')
+    aggregate_y = (chart_params.get('aggregate_y') or '').upper()
+    is_aggregated = bool(
+        aggregate_y and aggregate_y != 'NONE' and x_col and y_col
+        and chart_params.get('chart_type') != 'histogram'
+    )
     
-        x_col = chart_params.get('x_axis')
-        y_col = chart_params.get('y_axis')
-        color_col = chart_params.get('color')
-        z_col = chart_params.get('z_axis')
-        size_col = chart_params.get('size')
-        aggregate_y = chart_params.get('aggregate_y')
-        
-        # Build column list (never SELECT *)
-        columns_to_select_set = set()
-        if x_col: columns_to_select_set.add(x_col)
-        if y_col: columns_to_select_set.add(y_col)
-        if color_col: columns_to_select_set.add(color_col)
-        if z_col: columns_to_select_set.add(z_col)
-        if size_col: columns_to_select_set.add(size_col)
-        
-        if not columns_to_select_set:
-            print(f"No specific columns identified for table {table_name}. Selecting all available columns.")
-            # Get all columns from schema
-            query = text("""
-                SELECT COLUMN_NAME 
-                FROM INFORMATION_SCHEMA.COLUMNS 
-                WHERE TABLE_NAME = :table_name 
-                AND TABLE_CATALOG = :database
-                ORDER BY ORDINAL_POSITION
-            """)
-            result = conn.execute(query, {'table_name': table_name, 'database': AZURE_SQL_DATABASE})
-            all_cols = [row.COLUMN_NAME for row in result]
-            columns_to_select = ", ".join([f'[{col}]' for col in all_cols])
-        else:
-            # Quote column names with SQL Server brackets
-            columns_to_select = ", ".join([f'[{col}]' for col in columns_to_select_set])
-        
-        if not columns_to_select:
-            print(f"Could not determine columns to select for table {table_name}.")
+    if is_aggregated:
+        # Validate against the schema allowlist and let the database do the GROUP BY
+        try:
+            schema_map = get_all_table_schemas()
+            validated = validate_chart_request(chart_params, schema_map)
+            query_str, _ = build_sql(validated, schema_map, db_type=db_type, max_rows=chart_row_limit(chart_params))
+        except SafeSQLError as e:
+            print(f"Warning: Cannot aggregate chart data for table {table_name}: {e}")
             return None
-        
-        # Build query with SQL Server TOP clause (not LIMIT)
-        if not aggregate_y:
-            query_str = f"SELECT TOP 1000 {columns_to_select} FROM [{table_name}]"
+        chart_params['y_axis'] = get_aggregated_y_axis_name(validated)
+        return query_str
+    
+    # Build column list (never SELECT *)
+    columns_to_select_set = set()
+    if x_col: columns_to_select_set.add(x_col)
+    if y_col: columns_to_select_set.add(y_col)
+    if color_col: columns_to_select_set.add(color_col)
+    if z_col: columns_to_select_set.add(z_col)
+    if size_col: columns_to_select_set.add(size_col)
+    
+    if not columns_to_select_set:
+        print(f"No specific columns identified for table {table_name}. Selecting all available columns.")
+        # Column metadata comes from the shared schema store (no INFORMATION_SCHEMA round trip)
+        all_cols = list(get_column_metadata(table_name))
+        columns_to_select = ", ".join([quote_ident(col, db_type) for col in all_cols])
+    else:
+        # Quote column names for the dialect (sorted so identical requests build identical SQL)
+        columns_to_select = ", ".join([quote_ident(col, db_type) for col in sorted(columns_to_select_set)])
+    
+    if not columns_to_select:
+        print(f"Could not determine columns to select for table {table_name}.")
+        return None
+    
+    quoted_table = quote_ident(table_name, db_type)
+    row_limit = chart_row_limit(chart_params)
+    order_by = ''
+    if chart_params.get('chart_type') in DOWNSAMPLE_CHART_TYPES and x_col:
+        order_by = f" ORDER BY {quote_ident(x_col, db_type)}"
+    if db_type in LIMIT_DIALECTS:
+        return f"SELECT {columns_to_select} FROM {quoted_table}{order_by} LIMIT {row_limit}"
+    return f"SELECT TOP {row_limit} {columns_to_select} FROM {quoted_table}{order_by}"
+
+def chart_row_limit(chart_params) -> int:
+    """Rows fetched for one chart: line/area series are downsampled afterwards, so they may fetch more."""
+    if chart_params.get('chart_type') in DOWNSAMPLE_CHART_TYPES:
+        return DOWNSAMPLE_MAX_ROWS
+    return 1000
+
+def run_chart_query(table_name: str, query_str: str, max_rows: Optional[int] = 1000, source: str = 'primary') -> Optional[pd.DataFrame]:
+    """
+    Executes a query built by build_chart_query and converts date columns.
+    Binned queries pass max_rows=None: their size is bounded by the bin count.
+    source selects where it runs: 'primary', 'replica' or 'columnar' (see _read_source);
+    the query must be built for that source's dialect (READ_DIALECTS).
+    Returns None if the database is unavailable or the query fails.
+    """
+    conn = None
+    try:
+        if source == 'columnar':
+            df = _columnar.query(query_str)
         else:
-            query_str = f"SELECT {columns_to_select} FROM [{table_name}]"
-        
-        # Use pandas with SQLAlchemy connection
-        df = pd.read_sql(text(query_str), conn)
+            conn = get_replica_connection() if source == 'replica' else get_db_connection()
+            if not conn:
+                return None
+            
+            # Use pandas with SQLAlchemy connection
+            df = pd.read_sql(text(query_str), conn)
         
         # Apply row limit in pandas if needed (fallback)
-        if not aggregate_y and len(df) > 1000:
-            df = df.head(1000)
+        if max_rows is not None and len(df) > max_rows:
+            df = df.head(max_rows)
         
         # Convert date columns
-        date_types = ['date', 'datetime', 'datetime2', 'smalldatetime', 'timestamp', 'time', 'datetimeoffset']
-        for col, dtype in column_metadata.items():
-            if dtype.lower() in date_types and col in df.columns:
+        for col in _schema_store.get().get_date_columns(table_name):
+            if col in df.columns:
                 df[col] = pd.to_datetime(df[col], errors='coerce')
         
-        # Apply aggregation with group limit
-        if aggregate_y and y_col and x_col:
-            if aggregate_y.upper() == 'COUNT':
-                df_agg = df.groupby(x_col).size().reset_index(name=f'Count of {y_col}')
-                # Limit groups to 50
-                if len(df_agg) > 50:
-                    df_agg = df_agg.head(50)
-                chart_params['y_axis'] = f'Count of {y_col}'
-                df = df_agg
-            elif aggregate_y.upper() in ['SUM', 'AVG', 'MIN', 'MAX'] and y_col in df.columns:
-                # Check if numerical
-                is_numerical = column_metadata.get(y_col, '').lower() in [
-                    'int', 'smallint', 'bigint', 'tinyint', 'decimal', 'numeric', 
-                    'real', 'float', 'money', 'smallmoney', 'bit'
-                ]
-                
-                if not is_numerical:
-                    print(f"Warning: Cannot apply {aggregate_y} to non-numerical column '{y_col}'.")
-                    return None
-    
-                if aggregate_y.upper() == 'SUM':
-                    df_agg = df.groupby(x_col)[y_col].sum().reset_index(name=f'Sum of {y_col}')
-                elif aggregate_y.upper() == 'AVG':
-                    df_agg = df.groupby(x_col)[y_col].mean().reset_index(name=f'Average of {y_col}')
-                elif aggregate_y.upper() == 'MIN':
-                    df_agg = df.groupby(x_col)[y_col].min().reset_index(name=f'Min of {y_col}')
-                elif aggregate_y.upper() == 'MAX':
-                    df_agg = df.groupby(x_col)[y_col].max().reset_index(name=f'Max of {y_col}')
-                
-                # Limit groups to 50
-                if len(df_agg) > 50:
-                    df_agg = df_agg.head(50)
-                
-                chart_params['y_axis'] = df_agg.columns[1]  # Use the aggregated column name
-                df = df_agg
-        
         print(f"Data fetched successfully for table {table_name}. Shape: {df.shape}")
         return df
     except Exception as e:
@@ -609,7 +635,261 @@ def fetch_data_for_chart(chart_params):
     finally:
         if conn:
             conn.close()
+
+def fetch_data_for_chart(chart_params):
+    """
+    Fetches data from the chart database based on chart parameters.
+    Applies row limits: chart_row_limit() for non-aggregated, 50 groups for aggregated.
+    """
+    query_str = build_chart_query(chart_params)
+    if not query_str:
+        return None
+    return run_chart_query(chart_params.get('table_name'), query_str, chart_row_limit(chart_params))
+
+# Pre-aggregated rollups (opened at startup; see backend/rollups.py)
+_rollup_settings = get_rollup_settings()
+_rollup_store: Optional[RollupStore] = None
+_rollup_task: Optional[asyncio.Task] = None
+
+def refresh_rollups() -> None:
+    """Brings the rollups of all target tables up to date from the base tables."""
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        specs = rollup_specs_from_schema(get_all_table_schemas(), TARGET_TABLES)
+        _rollup_store.refresh(conn, specs, db_type=SQL_DIALECT)
+    finally:
+        conn.close()
+
+async def _refresh_rollups_periodically():
+    while True:
+        try:
+            await run_db(refresh_rollups)
+        except Exception as e:
+            print(f"Warning: Rollup refresh failed: {type(e).__name__}: {e}")
+        await asyncio.sleep(_rollup_settings.refresh_seconds)
+
+def query_rollup(chart_params) -> Optional[pd.DataFrame]:
+    """
+    Answers an aggregated chart request from the rollups instead of the base table.
+    Returns None if rollups are disabled, stale or don't cover the request.
+    Like build_chart_query, chart_params['y_axis'] is renamed to the aggregate alias.
+    """
+    aggregate_y = (chart_params.get('aggregate_y') or '').upper()
+    if (
+        _rollup_store is None or aggregate_y in ('', 'NONE')
+        or chart_params.get('chart_type') == 'histogram' or chart_params.get('color')
+    ):
+        return None
+    try:
+        validated = validate_chart_request(chart_params, get_all_table_schemas())
+    except SafeSQLError:
+        return None  # build_chart_query reports the validation error
+    df = _rollup_store.query(validated)
+    if df is not None:
+        chart_params['y_axis'] = get_aggregated_y_axis_name(validated)
+    return df
+
+# Local read replica of the target tables (Azure SQL only; opened at startup, see backend/replica.py)
+_replica_settings = get_replica_settings()
+_replica: Optional[SnapshotReplica] = None
+_replica_backend: Optional[DatabaseBackend] = None
+_replica_engine: Optional[Engine] = None
+_replica_task: Optional[asyncio.Task] = None
+
+def get_replica_connection():
+    """Returns a pooled connection to the local replica, or None if it is unavailable."""
+    global _replica_engine
+    try:
+        if _replica_engine is None:
+            _replica_engine = _replica_backend.create_engine()
+        return _replica_engine.connect()
+    except Exception as ex:
+        print(f"Replica connection error: {type(ex).__name__}: {ex}")
+        return None
+
+def sync_replica() -> None:
+    """Brings the replica of all target tables up to date from the primary database."""
+    snapshot = _schema_store.get()
+    column_types = {table: snapshot.get_column_types(table) for table in TARGET_TABLES if snapshot.get_column_types(table)}
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        _replica.sync(conn, column_types, db_type=SQL_DIALECT)
+    finally:
+        conn.close()
+
+async def _sync_replica_periodically():
+    while True:
+        try:
+            await run_db(sync_replica)
+        except Exception as e:
+            print(f"Warning: Replica sync failed: {type(e).__name__}: {e}")
+        await asyncio.sleep(_replica_settings.sync_seconds)
+
+# In-process DuckDB copy of the target tables (optional; opened at startup, see backend/columnar.py)
+_columnar_settings = get_columnar_settings()
+_columnar: Optional[ColumnarEngine] = None
+_columnar_task: Optional[asyncio.Task] = None
+
+def refresh_columnar() -> None:
+    """Reloads target tables whose version changed into the columnar engine."""
+    snapshot = _schema_store.get()
+    column_types = {table: snapshot.get_column_types(table) for table in TARGET_TABLES if snapshot.get_column_types(table)}
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        _columnar.refresh(conn, column_types, _table_versions.get, db_type=SQL_DIALECT)
+    finally:
+        conn.close()
+
+async def _refresh_columnar_periodically():
+    while True:
+        try:
+            await run_db(refresh_columnar)
+        except Exception as e:
+            print(f"Warning: Columnar refresh failed: {type(e).__name__}: {e}")
+        await asyncio.sleep(_columnar_settings.refresh_seconds)
+
+# SQL dialect of each read source (the primary database uses SQL_DIALECT)
+READ_DIALECTS = {'columnar': 'duckdb', 'replica': 'sqlite'}
+
+def _read_source(chart_params) -> str:
+    """
+    Where the chart's queries run: the columnar engine, then the local replica,
+    if they hold a fresh copy of the table with every column the chart reads;
+    otherwise the primary database.
+    """
+    table_name = chart_params.get('table_name')
+    columns = [chart_params.get(field) for field in ('x_axis', 'y_axis', 'color', 'z_axis', 'size')]
+    columns = [col for col in columns if col] or list(get_column_metadata(table_name))
+    if _columnar is not None and _columnar.covers(table_name, columns):
+        return 'columnar'
+    if _replica is not None and _replica.is_fresh(table_name, columns):
+        return 'replica'
+    return 'primary'
+
+def _source_table_version(table_name: str, read_source: str) -> Optional[str]:
+    """
+    Version of the copy of the table a chart reads, stored with its cached response.
+    The columnar copy keeps the version it was loaded at; the replica syncs on its
+    own schedule and tracks no version: None (short TTL).
+    """
+    if read_source == 'columnar':
+        return _columnar.version(table_name)
+    if read_source == 'replica':
+        return None
+    return _table_versions.get(table_name)
     
+# Chart font color (FastAPI has no app.config; read from environment instead)
+PLOTLY_FONT_COLOR = os.getenv('PLOTLY_FONT_COLOR', '#333')
+
+# Chart types whose series are downsampled to the plot width before rendering
+DOWNSAMPLE_CHART_TYPES = {'line_chart', 'area_chart'}
+# Rows sent as raw_data (shown as a table in the UI), whatever was fetched for the plot
+RAW_DATA_MAX_ROWS = 1000
+
+# Scatter-type charts over more rows than this are binned in SQL and drawn as a density
+# (per color group and with the average bubble size per cell; 3D scatter plots that map
+# a color or size column are always plotted point by point)
+DENSITY_CHART_TYPES = {'scatter_plot', 'bubble_chart', '3d_scatter_plot'}
+DENSITY_ROW_THRESHOLD = int(os.getenv('DENSITY_ROW_THRESHOLD', '1000'))
+# Chart types that may be counted per bucket in SQL (histograms always are)
+BINNED_CHART_TYPES = DENSITY_CHART_TYPES | {'histogram'}
+BIN_COUNT_COLUMN = 'Row count'
+
+
+def build_range_probe_query(chart_params, db_type: Optional[str] = None) -> Optional[str]:
+    """
+    Builds the row count + MIN/MAX probe for a chart that may be binned in SQL.
+    Returns None if the chart type is not binnable, its axes are not numeric, or
+    it is a 3D scatter plot with a color or size column (its cells can't show them).
+    """
+    if chart_params.get('chart_type') not in BINNED_CHART_TYPES:
+        return None
+    if chart_params.get('chart_type') == '3d_scatter_plot' and (chart_params.get('color') or chart_params.get('size')):
+        return None
+    try:
+        schema_map = get_all_table_schemas()
+        validated = validate_chart_request(chart_params, schema_map)
+    except SafeSQLError as e:
+        print(f"Warning: Cannot bin chart data for table {chart_params.get('table_name')}: {e}")
+        return None
+    if validated.chart_type == 'histogram':
+        columns = [validated.x_axis]
+    elif validated.chart_type == '3d_scatter_plot':
+        columns = [validated.x_axis, validated.y_axis, validated.z_axis]
+    else:
+        columns = [validated.x_axis, validated.y_axis]
+    numerical_columns = set(schema_map[validated.table_name].get('numerical_columns', []))
+    if not all(col in numerical_columns for col in columns):
+        return None
+    return build_range_probe_sql(validated.table_name, columns, db_type=db_type or SQL_DIALECT)
+
+def build_binned_query(chart_params, probe: pd.Series, db_type: Optional[str] = None) -> Optional[Tuple[str, List[BinAxis]]]:
+    """
+    Builds the GROUP BY bucket query from a range probe result.
+    Histograms are always binned over the whole column (split by color if set).
+    Scatter-type charts are only binned above DENSITY_ROW_THRESHOLD rows; below it
+    every point is plotted as before. 2D scatter and bubble charts are split by
+    color, and bubble charts average their size column per cell.
+    Returns (sql, bin axes) or None.
+    """
+    chart_type = chart_params.get('chart_type')
+    table_name = chart_params['table_name'].split('.')[-1]
+    row_count = int(probe.get('row_count') or 0)
+    group_column = chart_params.get('color') or None
+    value_column = chart_params.get('size') if chart_type == 'bubble_chart' else None
+    if chart_type == 'histogram':
+        if row_count == 0:
+            return None
+        columns = [chart_params['x_axis']]
+        max_bins = MAX_HISTOGRAM_BINS
+    else:
+        if row_count <= DENSITY_ROW_THRESHOLD:
+            return None
+        columns = [chart_params['x_axis'], chart_params['y_axis']]
+        if chart_type == '3d_scatter_plot':
+            columns.append(chart_params['z_axis'])
+        max_bins = MAX_DENSITY_BINS_3D if len(columns) == 3 else MAX_DENSITY_BINS
+    axes = []
+    for i, col in enumerate(columns):
+        low, high = probe.get(f'min_{i}'), probe.get(f'max_{i}')
+        if pd.isna(low) or pd.isna(high):
+            return None
+        axes.append(choose_bins(col, low, high, max_bins, integer=_is_integer_column(table_name, col)))
+    try:
+        sql = build_binned_sql(
+            table_name, axes, db_type=db_type or SQL_DIALECT, group_column=group_column, value_column=value_column
+        )
+        return sql, axes
+    except SafeSQLError as e:
+        print(f"Warning: Cannot bin chart data for table {table_name}: {e}")
+        return None
+
+def build_box_stats_query(chart_params, db_type: Optional[str] = None) -> Optional[str]:
+    """
+    Builds the per-category quartile query for a box plot (see safe_sql.build_box_stats_sql).
+    Returns None if the request can't be validated or y is not numeric.
+    """
+    try:
+        schema_map = get_all_table_schemas()
+        validated = validate_chart_request(chart_params, schema_map)
+        if validated.y_axis not in schema_map[validated.table_name].get('numerical_columns', []):
+            return None
+        return build_box_stats_sql(validated, db_type=db_type or SQL_DIALECT)
+    except SafeSQLError as e:
+        print(f"Warning: Cannot compute box plot statistics for table {chart_params.get('table_name')}: {e}")
+        return None
+
+def _is_integer_column(table_name: str, column: str) -> bool:
+    """True if the column's SQL type is an integer type."""
+    data_type = get_column_metadata(table_name).get(column, '')
+    return str(data_type).lower() in ('int', 'smallint', 'bigint', 'tinyint', 'integer')
+
 def create_chart_json(df, chart_params):
     """Generates Plotly chart JSON based on DataFrame and chart parameters."""
     chart_type = chart_params.get('chart_type')
@@ -665,17 +945,141 @@ def create_chart_json(df, chart_params):
     else:
         return {'error': "Unsupported chart type requested."}
     
+    return _finish_chart(fig)
+
+def _finish_chart(fig) -> RawJSON:
+    """Apply the shared chart styling and serialize the figure."""
     fig.update_layout(
         plot_bgcolor='rgba(0,0,0,0)',
         paper_bgcolor='rgba(0,0,0,0)',
-        font_color=app.config.get('PLOTLY_FONT_COLOR', '#333'),
+        font_color=PLOTLY_FONT_COLOR,
         title_font_size=20,
         title_x=0.5,
         margin=dict(l=40, r=40, t=40, b=40)
     )
     
-    # Use to_plotly_json() to get dict directly (faster, avoids double serialization)
-    return fig.to_plotly_json()
+    # Serialize once; the encoded figure is spliced into the response as-is
+    return RawJSON(pio.to_json(fig, validate=False))
+
+def binned_frame(df: pd.DataFrame, axes: List[BinAxis], value_column: Optional[str] = None) -> pd.DataFrame:
+    """
+    Turn bucket indices from build_binned_sql into bin centers (used for raw_data).
+    The per-cell average of value_column (bubble size), if binned, is named after it.
+    """
+    result = pd.DataFrame({
+        axis.column: axis.low + (df[f'bin_{i}'].to_numpy(dtype=float) + 0.5) * axis.width
+        for i, axis in enumerate(axes)
+    })
+    # Group column (histogram or scatter color), if any
+    for col in df.columns:
+        if col != 'bin_count' and not col.startswith('bin_'):
+            result[col] = df[col].to_numpy()
+    result[BIN_COUNT_COLUMN] = df['bin_count'].to_numpy()
+    if value_column and 'bin_value' in df.columns:
+        result[binned_value_name(value_column)] = df['bin_value'].to_numpy()
+    return result
+
+def binned_value_name(value_column: str) -> str:
+    """Column name of a per-cell average in binned_frame (distinct from the axis columns)."""
+    return f"Average {value_column}"
+
+def create_binned_chart_json(df: pd.DataFrame, chart_params: Dict, axes: List[BinAxis]):
+    """
+    Generates Plotly chart JSON from per-bucket counts (build_binned_sql).
+    Histograms become pre-aggregated bars; 2D scatter charts become a density
+    heatmap, or, with a color column or for bubble charts, one marker per non-empty
+    cell and color group, sized by the cell's average size (bubble) or row count;
+    3D scatter plots show one marker per non-empty cell, sized and colored by its row count.
+    """
+    chart_type = chart_params.get('chart_type')
+    title = chart_params.get('title') or f"Density of {axes[-1].column} vs {axes[0].column}"
+    counts = df['bin_count'].to_numpy(dtype=float)
+    
+    if len(axes) == 1 and chart_type == 'histogram':
+        axis = axes[0]
+        centers = binned_frame(df, axes)
+        color_col = chart_params.get('color')
+        groups = centers.groupby(color_col, sort=False, dropna=False) if color_col in centers.columns else [(None, centers)]
+        color_sequence = px.colors.qualitative.Plotly
+        fig = go.Figure()
+        for i, (name, group) in enumerate(groups):
+            fig.add_trace(go.Bar(
+                x=group[axis.column], y=group[BIN_COUNT_COLUMN], width=axis.width,
+                name=str(name) if name is not None else axis.column, showlegend=name is not None,
+                marker_color=color_sequence[i % len(color_sequence)]
+            ))
+        fig.update_layout(
+            title=title, xaxis_title=axis.column, yaxis_title='count',
+            barmode='stack', bargap=0, legend_title_text=color_col if color_col in centers.columns else None
+        )
+    elif len(axes) == 2 and (chart_type == 'bubble_chart' or len(df.columns) > len(axes) + 1):
+        size_col = chart_params.get('size') if chart_type == 'bubble_chart' else None
+        centers = binned_frame(df, axes, size_col)
+        color_col = chart_params.get('color')
+        marker_size = binned_value_name(size_col) if size_col else BIN_COUNT_COLUMN
+        # Cells whose rows have no size value (average NULL) get no marker
+        centers = centers.dropna(subset=[marker_size])
+        fig = px.scatter(
+            centers, x=axes[0].column, y=axes[1].column, size=marker_size,
+            color=color_col if color_col in centers.columns else None,
+            hover_data=[BIN_COUNT_COLUMN], title=title, color_discrete_sequence=px.colors.qualitative.Plotly
+        )
+    elif len(axes) == 2:
+        x_axis, y_axis = axes
+        grid = np.full((y_axis.bins, x_axis.bins), np.nan)
+        grid[df['bin_1'].to_numpy(dtype=int), df['bin_0'].to_numpy(dtype=int)] = counts
+        fig = go.Figure(go.Heatmap(
+            x=x_axis.centers(), y=y_axis.centers(), z=grid,
+            colorscale='Viridis', colorbar=dict(title=BIN_COUNT_COLUMN),
+            hovertemplate=f"{x_axis.column}=%{{x}}<br>{y_axis.column}=%{{y}}<br>{BIN_COUNT_COLUMN}=%{{z}}<extra></extra>"
+        ))
+        fig.update_layout(title=title, xaxis_title=x_axis.column, yaxis_title=y_axis.column)
+    elif len(axes) == 3 and chart_type == '3d_scatter_plot':
+        centers = binned_frame(df, axes)
+        fig = go.Figure(go.Scatter3d(
+            x=centers[axes[0].column], y=centers[axes[1].column], z=centers[axes[2].column],
+            mode='markers',
+            marker=dict(
+                size=4 + 16 * np.sqrt(counts / counts.max()), color=counts,
+                colorscale='Viridis', colorbar=dict(title=BIN_COUNT_COLUMN), opacity=0.8
+            ),
+            hovertemplate=f"{BIN_COUNT_COLUMN}=%{{marker.color}}<extra></extra>"
+        ))
+        fig.update_layout(title=title, scene=dict(
+            xaxis_title=axes[0].column, yaxis_title=axes[1].column, zaxis_title=axes[2].column
+        ))
+    else:
+        return {'error': "Unsupported chart type for binned data."}
+    
+    return _finish_chart(fig)
+
+def create_box_stats_chart_json(df: pd.DataFrame, chart_params: Dict):
+    """
+    Generates a Plotly box plot from precomputed statistics (build_box_stats_sql):
+    one box per x category (grouped by color, if set), without individual points.
+    """
+    x_col = chart_params.get('x_axis')
+    y_col = chart_params.get('y_axis')
+    color_col = chart_params.get('color')
+    title = chart_params.get('title') or f"Box Plot of {y_col} by {x_col}"
+    if x_col not in df.columns:
+        return {'error': f"X-axis column '{x_col}' not found in data. Available columns: {list(df.columns)}"}
+    
+    grouped = bool(color_col and color_col != x_col and color_col in df.columns)
+    groups = df.groupby(color_col, sort=False) if grouped else [(None, df)]
+    color_sequence = px.colors.qualitative.Plotly
+    fig = go.Figure()
+    for i, (name, group) in enumerate(groups):
+        fig.add_trace(go.Box(
+            x=group[x_col], q1=group['q1'], median=group['median'], q3=group['q3'],
+            lowerfence=group['lowerfence'], upperfence=group['upperfence'],
+            name=str(name) if grouped else y_col, showlegend=grouped, boxpoints=False,
+            marker_color=color_sequence[i % len(color_sequence)]
+        ))
+    fig.update_layout(title=title, xaxis_title=x_col, yaxis_title=y_col)
+    if grouped:
+        fig.update_layout(boxmode='group', legend_title_text=color_col)
+    return _finish_chart(fig)
     
 INITIAL_CHART_SUGGESTIONS = [
     "bar chart", "pie chart", "donut chart", "3d chart", "line chart", "scatter plot", "histogram",
@@ -693,22 +1097,65 @@ def detect_language(text: str) -> str:
         return 'ar'
     return 'en'
 
+async def _generate_follow_up_suggestions(chart_context: str, schema_info: str, user_language: str, request_id: str) -> List[str]:
+    """
+    Ask Gemini for follow-up questions about a chart.
+    Never raises: failures are logged and yield an empty list.
+    """
+    prompt_for_follow_up_suggestions = f"""
+            You are an AI assistant that provides follow-up suggestions for data analysis.
+            The user has just seen a chart based on their previous request.
+            
+            Respond in {user_language}.
+
+            Here is the database schema:
+            {schema_info}
+            
+            Here is the context of the last generated chart:
+            {chart_context}
+            
+            Based on this context and the schema, suggest 3-5 relevant next questions or types of charts for further insights.
+            Focus on logical next steps like drilling down, comparing related metrics, or looking at trends.
+            For example, if the last chart was sales by region, suggest "Show me sales over time" or "Break down sales by product category in a pie chart".
+            
+            Provide 3-5 concise suggestions as a comma-separated list.
+            Example: "Show me sales by product, show me average price by category"
+            """
+    
+    try:
+        response_follow_up_suggestions = await run_llm(model_for_suggestions.generate_content, prompt_for_follow_up_suggestions)
+        follow_up_suggestions_text = response_follow_up_suggestions.text.strip()
+        return [s.strip() for s in follow_up_suggestions_text.split(',')] if follow_up_suggestions_text else []
+    except Exception as e:
+        print(f"[{request_id}] Suggestions generation failed: {e}")
+        return []
+
 # API routes (must come before SPA fallback)
-@app.post('/chat')
-async def chat(request_body: ChatRequest):
-    """Handles chatbot interactions with robust error handling and JSON parsing."""
-    request_id = str(uuid.uuid4())[:8]
-    user_message_raw = request_body.message
-    user_message = user_message_raw.lower()
+def _resolve_request_options(request_body: ChatRequest) -> Tuple[str, Optional[str]]:
+    """Return (user_language, forced_chart_type) for a chat request."""
     # Detect language from input if not explicitly provided
-    detected_lang = detect_language(user_message_raw)
+    detected_lang = detect_language(request_body.message)
     user_language = request_body.language if request_body.language else detected_lang # Use detected language as fallback
     forced_chart_type_raw = request_body.forced_chart_type # Get forced chart type from frontend
     forced_chart_type = normalize_chart_type(forced_chart_type_raw) if forced_chart_type_raw else None
+    return user_language, forced_chart_type
+
+async def _chat_events(request_body: ChatRequest):
+    """
+    Chat pipeline as an async generator of (stage, payload) tuples.
+    Intermediate stages ('params', 'chart', 'raw_data', 'suggestions') are yielded as
+    soon as they are ready; the last item is always ('result', full_response_dict).
+    Blocking work (Gemini, database, Plotly rendering) runs on bounded thread pools
+    so one slow request never stalls the event loop for other requests.
+    """
+    request_id = str(uuid.uuid4())[:8]
+    user_message_raw = request_body.message
+    user_message = user_message_raw.lower()
+    user_language, forced_chart_type = _resolve_request_options(request_body)
     
     print(f"[{request_id}] Request: message='{user_message_raw[:50]}...', lang={user_language}, forced_type={forced_chart_type}")
     
-    all_table_schemas = get_all_table_schemas()
+    all_table_schemas = await run_db(get_all_table_schemas)
     if not all_table_schemas:
         error_messages = {
             'en': 'Error: Could not retrieve database schema. Please check database connection.',
@@ -719,10 +1166,11 @@ async def chat(request_body: ChatRequest):
             'ko': '오류: 데이터베이스 스키마를 검색할 수 없습니다. 데이터베이스 연결을 확인하십시오.',
             'ar': 'خطأ: تعذر استرداد مخطط قاعدة البيانات. يرجى التحقق من اتصال قاعدة البيانات.'
         }
-        return {
+        yield 'result', {
             'response': error_messages.get(user_language, 'Error: Could not retrieve database schema. Please check database connection.'),
             'suggestions': []
         }
+        return
     
     schema_info = ""
     for table_name, schema in all_table_schemas.items():
@@ -743,7 +1191,8 @@ async def chat(request_body: ChatRequest):
             'ar': "أنا مساعدك الذكي للتحليلات. كيف يمكنني تصور بياناتك؟"
         }.get(user_language, "I am your AI Insight Assistant. How can I visualize your data?")
         suggestions = ["Bar Chart", "Pie Chart", "Donut Chart", "3D Chart", "Line Chart", "Scatter Plot", "Histogram"]
-        return {'response': welcome_message, 'suggestions': suggestions}
+        yield 'result', {'response': welcome_message, 'suggestions': suggestions}
+        return
     
     # If the user's message is an initial chart type suggestion, respond with a follow-up question
     # and indicate the requested_chart_type for the frontend to store.
@@ -759,14 +1208,37 @@ async def chat(request_body: ChatRequest):
             'ar': f"رائع! ما هي البيانات التي ترغب في رؤيتها في {user_message}؟"
         }
         response_text = response_texts.get(user_language, f"Great! What data would you like to see in a {user_message}?")
-        return {'response': response_text, 'suggestions': [], 'forced_chart_type': normalized_type or user_message}
+        yield 'result', {'response': response_text, 'suggestions': [], 'forced_chart_type': normalized_type or user_message}
+        return
+    
+    # Front-of-pipeline cache: identical requests skip Gemini and the database entirely
+    schema_version = get_schema_version()
+    max_points = target_points(request_body.plot_width)
+    cache_key = _get_response_cache_key(user_message_raw, user_language, forced_chart_type, schema_version, max_points)
+    cached_response = await run_db(_get_cached_response, cache_key)
+    if cached_response:
+        print(f"[{request_id}] Cache hit")
+        # Cached entries are already-encoded response bodies
+        yield 'result', RawJSON(cached_response) if isinstance(cached_response, str) else cached_response
+        return
     
     try:
-        # Include forced_chart_type in the prompt if available, but primarily for context.
-        # The actual enforcement will happen after LLM response.
-        chart_type_hint = f" The user previously selected chart type '{forced_chart_type}' and expects this chart to be of that type. Prioritize this type." if forced_chart_type else ""
+        # Rule-based fast path: simple "<measure> by <dimension>" requests skip Gemini
+        chart_params = _intent_parser.parse(user_message_raw, all_table_schemas, user_language, forced_chart_type)
+        if chart_params:
+            print(f"[{request_id}] Intent parser hit: table={chart_params['table_name']}, x={chart_params['x_axis']}, y={chart_params['y_axis']}, agg={chart_params['aggregate_y']}")
+        else:
+            # Paraphrases of earlier requests reuse the validated Gemini parameters
+            chart_params = _param_cache.get(user_message_raw, all_table_schemas, user_language, forced_chart_type, schema_version)
+            if chart_params:
+                print(f"[{request_id}] Param cache hit: table={chart_params.get('table_name')}, x={chart_params.get('x_axis')}, y={chart_params.get('y_axis')}")
+        params_from_gemini = chart_params is None
+        if params_from_gemini:
+            # Include forced_chart_type in the prompt if available, but primarily for context.
+            # The actual enforcement will happen after LLM response.
+            chart_type_hint = f" The user previously selected chart type '{forced_chart_type}' and expects this chart to be of that type. Prioritize this type." if forced_chart_type else ""
         
-        prompt_for_chart_params = f"""You are an AI assistant that generates chart parameters from natural language queries.
+            prompt_for_chart_params = f"""You are an AI assistant that generates chart parameters from natural language queries.
 
 CRITICAL: You MUST respond with ONLY a valid JSON object. No markdown, no code fences, no explanatory text before or after.
 
@@ -807,32 +1279,32 @@ Example output (JSON only):
 User request: {user_message_raw}
 """
     
-        # Call Gemini with retry on JSON parsing failure
-        chart_params = None
-        parse_error = None
+            # Call Gemini with retry on JSON parsing failure
+            chart_params = None
+            parse_error = None
         
-        for attempt in range(2):  # Try twice
-            try:
-                response_chart_params = model_for_chart_params.generate_content(prompt_for_chart_params)
-                chart_params_str = response_chart_params.text
-                print(f"[{request_id}] Gemini response (attempt {attempt+1}): {chart_params_str[:200]}...")
+            for attempt in range(2):  # Try twice
+                try:
+                    response_chart_params = await run_llm(model_for_chart_params.generate_content, prompt_for_chart_params)
+                    chart_params_str = response_chart_params.text
+                    print(f"[{request_id}] Gemini response (attempt {attempt+1}): {chart_params_str[:200]}...")
                 
-                # Extract JSON from text (handles markdown, code fences, extra text)
-                chart_params = extract_json_from_text(chart_params_str)
+                    # Extract JSON from text (handles markdown, code fences, extra text)
+                    chart_params = extract_json_from_text(chart_params_str)
                 
-                if chart_params:
-                    # Validate schema
-                    is_valid, error_msg, validated_params = validate_chart_params(chart_params, request_id)
-                    if is_valid:
-                        chart_params = validated_params
-                        print(f"[{request_id}] JSON parse success, chart_type={chart_params.get('chart_type')}")
-                        break
-                    else:
-                        parse_error = error_msg
-                        print(f"[{request_id}] Validation failed: {parse_error}")
-                        if attempt == 0:
-                            # Retry with fix prompt
-                            prompt_for_chart_params = f"""The previous response had invalid JSON. Fix it to match this exact schema:
+                    if chart_params:
+                        # Validate schema
+                        is_valid, error_msg, validated_params = validate_chart_params(chart_params, request_id)
+                        if is_valid:
+                            chart_params = validated_params
+                            print(f"[{request_id}] JSON parse success, chart_type={chart_params.get('chart_type')}")
+                            break
+                        else:
+                            parse_error = error_msg
+                            print(f"[{request_id}] Validation failed: {parse_error}")
+                            if attempt == 0:
+                                # Retry with fix prompt
+                                prompt_for_chart_params = f"""The previous response had invalid JSON. Fix it to match this exact schema:
 
 {{
   "table_name": "string",
@@ -859,12 +1331,12 @@ Database schema:
 User request: {user_message_raw}
 
 Respond with ONLY valid JSON matching the schema above."""
-                else:
-                    parse_error = "No valid JSON object found in response"
-                    print(f"[{request_id}] JSON extraction failed: {parse_error}")
-                    if attempt == 0:
-                        # Retry with fix prompt
-                        prompt_for_chart_params = f"""The previous response did not contain valid JSON. Respond with ONLY a JSON object, no markdown or code fences.
+                    else:
+                        parse_error = "No valid JSON object found in response"
+                        print(f"[{request_id}] JSON extraction failed: {parse_error}")
+                        if attempt == 0:
+                            # Retry with fix prompt
+                            prompt_for_chart_params = f"""The previous response did not contain valid JSON. Respond with ONLY a JSON object, no markdown or code fences.
 
 Database schema:
 {schema_info}
@@ -873,40 +1345,44 @@ User request: {user_message_raw}
 
 Required JSON schema:
 {{"table_name":"string","chart_type":"bar_chart|line_chart|...","x_axis":"string","y_axis":"string","title":"string","summary":"string","aggregate_y":"string|null","color":"string|null","z_axis":"string|null","size":"string|null","chart_reasoning":"string|null","chart_warnings":"array|null"}}"""
-            except genai_exceptions.ResourceExhausted as e:
-                print(f"[{request_id}] Gemini quota exceeded: {e}")
-                return {
-                    'error_type': 'RATE_LIMIT',
-                    'message': 'AI quota exceeded. Please try again shortly or upgrade billing.',
-                    'suggestions': []
-                }
-            except Exception as e:
-                print(f"[{request_id}] Gemini call error (attempt {attempt+1}): {type(e).__name__}: {e}")
-                if attempt == 1:
-                    return {
-                        'error_type': 'MODEL_OUTPUT_ERROR',
-                        'message': f'Failed to generate chart parameters: {str(e)}',
+                except genai_exceptions.ResourceExhausted as e:
+                    print(f"[{request_id}] Gemini quota exceeded: {e}")
+                    yield 'result', {
+                        'error_type': 'RATE_LIMIT',
+                        'message': 'AI quota exceeded. Please try again shortly or upgrade billing.',
                         'suggestions': []
                     }
+                    return
+                except Exception as e:
+                    print(f"[{request_id}] Gemini call error (attempt {attempt+1}): {type(e).__name__}: {e}")
+                    if attempt == 1:
+                        yield 'result', {
+                            'error_type': 'MODEL_OUTPUT_ERROR',
+                            'message': f'Failed to generate chart parameters: {str(e)}',
+                            'suggestions': []
+                        }
+                        return
         
-        # If still no valid params after retries
-        if not chart_params:
-            print(f"[{request_id}] Failed to parse JSON after retries: {parse_error}")
-            return {
-                'error_type': 'MODEL_OUTPUT_ERROR',
-                'message': f'Could not parse chart parameters from AI response. {parse_error}',
-                'suggestions': []
-            }
+            # If still no valid params after retries
+            if not chart_params:
+                print(f"[{request_id}] Failed to parse JSON after retries: {parse_error}")
+                yield 'result', {
+                    'error_type': 'MODEL_OUTPUT_ERROR',
+                    'message': f'Could not parse chart parameters from AI response. {parse_error}',
+                    'suggestions': []
+                }
+                return
     
         table_name = chart_params.get('table_name')
         
         if table_name not in all_table_schemas:
             print(f"[{request_id}] Invalid table: {table_name}")
-            return {
+            yield 'result', {
                 'error_type': 'DATA_ERROR',
                 'message': f"Table '{table_name}' not found in database. Available: {', '.join(all_table_schemas.keys())}",
                 'suggestions': []
             }
+            return
         
         # Normalize and enforce forced_chart_type if present
         if forced_chart_type:
@@ -974,7 +1450,7 @@ User request: {user_message_raw}
 Respond with ONLY valid JSON matching the schema above."""
                         
                         try:
-                            response_retry = model_for_chart_params.generate_content(retry_prompt)
+                            response_retry = await run_llm(model_for_chart_params.generate_content, retry_prompt)
                             chart_params_retry_str = response_retry.text
                             chart_params_retry = extract_json_from_text(chart_params_retry_str)
                             
@@ -998,11 +1474,12 @@ Respond with ONLY valid JSON matching the schema above."""
                                         if suggested_fields_retry:
                                             error_msg += f" Valid numeric fields: {', '.join(suggested_fields_retry[:5])}"
                                         print(f"[{request_id}] Retry validation still failed: {error_msg}")
-                                        return {
+                                        yield 'result', {
                                             'error_type': 'DATA_ERROR',
                                             'message': error_msg,
                                             'suggestions': []
                                         }
+                                        return
                                 else:
                                     print(f"[{request_id}] Retry JSON validation failed: {error_msg_retry}")
                             else:
@@ -1016,16 +1493,92 @@ Respond with ONLY valid JSON matching the schema above."""
                 if suggested_fields:
                     error_msg += f" Valid numeric fields: {', '.join(suggested_fields[:5])}"
                 print(f"[{request_id}] Chart validation failed: {error_msg}")
-                return {
+                yield 'result', {
                     'error_type': 'DATA_ERROR',
                     'message': error_msg,
                     'suggestions': []
                 }
+                return
+        
+        if params_from_gemini:
+            _param_cache.put(user_message_raw, all_table_schemas, user_language, forced_chart_type, schema_version, chart_params)
+        
+        yield 'params', {
+            'table_name': table_name,
+            'chart_type': chart_params['chart_type'],
+            'x_axis': chart_params.get('x_axis'),
+            'y_axis': chart_params.get('y_axis'),
+            'title': chart_params.get('title', ''),
+            'summary': chart_params.get('summary'),
+        }
+        
+        # Follow-up suggestions depend only on chart params and schema, so generate them
+        # concurrently with the data fetch and chart rendering instead of afterwards
+        aggregate_y = chart_params.get('aggregate_y')
+        y_label = chart_params.get('y_axis', 'data')
+        if aggregate_y and str(aggregate_y).upper() != 'NONE':
+            y_label = f"{str(aggregate_y).lower()} of {y_label}"
+        chart_context = f"You just created a {chart_params['chart_type']} showing {y_label} by {chart_params.get('x_axis', 'category')} from the '{table_name}' table."
+        suggestions_task = asyncio.create_task(
+            _generate_follow_up_suggestions(chart_context, schema_info, user_language, request_id)
+        )
+        
+        # Fresh in-process (DuckDB) or local replica copies of the table are read instead of the database
+        read_source = await run_db(_read_source, chart_params)
+        # Table version read before the data: a change while this request runs makes its cache entry stale
+        table_version = await run_db(_source_table_version, chart_params['table_name'], read_source)
+        read_dialect = READ_DIALECTS.get(read_source, SQL_DIALECT)
+        flight_prefix = '' if read_source == 'primary' else f"{read_source}:"
         
-        df = fetch_data_for_chart(chart_params)
+        # Concurrent requests that build identical SQL share one database round trip
+        query_str = None
+        bin_axes = None
+        box_stats = False
+        if chart_params['chart_type'] == 'box_plot':
+            # Quartiles and fences per category are computed in the database
+            query_str = await run_db(build_box_stats_query, chart_params, read_dialect)
+            box_stats = query_str is not None
+        probe_query = None if query_str else await run_db(build_range_probe_query, chart_params, read_dialect)
+        if probe_query:
+            # Probe row count and axis ranges; large tables are counted per bucket in SQL
+            probe = await _query_flights.do(
+                flight_prefix + probe_query, run_db, run_chart_query, chart_params['table_name'], probe_query, 1000, read_source
+            )
+            if probe is not None and not probe.empty:
+                binned = await run_db(build_binned_query, chart_params, probe.iloc[0], read_dialect)
+                if binned:
+                    query_str, bin_axes = binned
+                    print(f"[{request_id}] Binning {chart_params['chart_type']}: {int(probe.iloc[0]['row_count'])} rows into {'x'.join(str(axis.bins) for axis in bin_axes)} buckets")
+        df = None
+        if not query_str:
+            # Aggregates over a rolled-up dimension/measure pair skip the base table
+            df = await run_db(query_rollup, chart_params)
+            if df is None:
+                query_str = await run_db(build_chart_query, chart_params, read_dialect)
+            else:
+                print(f"[{request_id}] Answered from rollup: {table_name}.{chart_params.get('x_axis')}, {len(df)} groups")
+        # Summary rows (bucket counts, box statistics) are bounded by the SQL itself
+        summarized = bool(bin_axes) or box_stats
+        if query_str:
+            df = await _query_flights.do(
+                flight_prefix + query_str, run_db, run_chart_query, chart_params['table_name'], query_str,
+                None if summarized else chart_row_limit(chart_params), read_source
+            )
         if df is not None and not df.empty:
-            # Assess chart suitability (doesn't block, just provides recommendations)
-            suitability = assess_chart_suitability(chart_params['chart_type'], df, chart_params)
+            if box_stats:
+                suitability = {'recommended_chart_type': 'box_plot', 'reason_not_best': None, 'chart_warnings': []}
+            elif bin_axes:
+                # Rows are bucket counts, not table rows; the requested chart type stands
+                suitability = {
+                    'recommended_chart_type': chart_params['chart_type'],
+                    'reason_not_best': None,
+                    'chart_warnings': [] if chart_params['chart_type'] == 'histogram' else [
+                        f"Showing point density: {int(df['bin_count'].sum())} rows grouped into {len(df)} buckets."
+                    ]
+                }
+            else:
+                # Assess chart suitability (doesn't block, just provides recommendations)
+                suitability = assess_chart_suitability(chart_params['chart_type'], df, chart_params)
             recommended_type = suitability['recommended_chart_type']
             
             # Use recommended type if different from requested
@@ -1033,82 +1586,54 @@ Respond with ONLY valid JSON matching the schema above."""
                 print(f"[{request_id}] Chart suitability: requested={chart_params['chart_type']}, recommended={recommended_type}, reason={suitability['reason_not_best']}")
                 chart_params['chart_type'] = recommended_type
             
-            # Check response cache first
-            cache_key = _get_response_cache_key(user_message_raw, user_language, forced_chart_type)
-            _clean_response_cache()
-            
-            cached_response = _response_cache.get(cache_key)
-            if cached_response:
-                response_dict, expires_at = cached_response
-                if expires_at > time.time():
-                    print(f"[{request_id}] Cache hit")
-                    # Convert chart_json to JSON-safe format before returning
-                    if 'chart_json' in response_dict:
-                        response_dict['chart_json'] = to_json_safe_plotly(response_dict['chart_json'])
-                    return response_dict
-                else:
-                    del _response_cache[cache_key]
+            # Long line/area series are reduced to what the plot width can show;
+            # raw_data below lists the same points
+            plot_df = df
+            if chart_params['chart_type'] in DOWNSAMPLE_CHART_TYPES:
+                plot_df = await run_render(
+                    downsample_frame, df, chart_params.get('x_axis'), chart_params.get('y_axis'),
+                    max_points, chart_params.get('color')
+                )
+                if len(plot_df) < len(df):
+                    print(f"[{request_id}] Downsampled {chart_params['chart_type']}: {len(df)} -> {len(plot_df)} points")
             
             # Generate chart
             try:
-                chart_json_result = create_chart_json(df, chart_params)
-                chart_data = ensure_json_dict(chart_json_result)
+                if bin_axes:
+                    chart_data = await run_render(create_binned_chart_json, df, chart_params, bin_axes)
+                    # raw_data lists bin centers and counts
+                    df = await run_render(
+                        binned_frame, df, bin_axes, chart_params.get('size') if chart_params['chart_type'] == 'bubble_chart' else None
+                    )
+                elif box_stats:
+                    chart_data = await run_render(create_box_stats_chart_json, df, chart_params)
+                else:
+                    chart_data = await run_render(create_chart_json, plot_df, chart_params)
                 
-                if chart_data is None or 'error' in chart_data:
-                    error_msg = chart_data.get('error', 'Failed to generate chart') if chart_data else 'Failed to generate chart'
+                if not isinstance(chart_data, RawJSON):
+                    chart_error = ensure_json_dict(chart_data) or {}
+                    error_msg = chart_error.get('error', 'Failed to generate chart')
                     print(f"[{request_id}] Chart generation error: {error_msg}")
-                    return {
+                    suggestions_task.cancel()
+                    yield 'result', {
                         'error_type': 'DATA_ERROR',
                         'message': error_msg,
                         'suggestions': []
                     }
+                    return
             except Exception as e:
                 print(f"[{request_id}] Chart creation exception: {type(e).__name__}: {e}")
-                return {
+                suggestions_task.cancel()
+                yield 'result', {
                     'error_type': 'DATA_ERROR',
                     'message': f'Failed to create chart: {str(e)}',
                     'suggestions': []
                 }
+                return
             
-            # Generate follow-up suggestions
-            chart_context = f"You just created a {chart_params['chart_type']} showing {chart_params.get('y_axis', 'data')} by {chart_params.get('x_axis', 'category')} from the '{table_name}' table."
-            
-            prompt_for_follow_up_suggestions = f"""
-            You are an AI assistant that provides follow-up suggestions for data analysis.
-            The user has just seen a chart based on their previous request.
-            
-            Respond in {user_language}.
-
-            Here is the database schema:
-            {schema_info}
-            
-            Here is the context of the last generated chart:
-            {chart_context}
-            
-            Based on this context and the schema, suggest 3-5 relevant next questions or types of charts for further insights.
-            Focus on logical next steps like drilling down, comparing related metrics, or looking at trends.
-            For example, if the last chart was sales by region, suggest "Show me sales over time" or "Break down sales by product category in a pie chart".
-            
-            Provide 3-5 concise suggestions as a comma-separated list.
-            Example: "Show me sales by product, show me average price by category"
-            """
-            
-            try:
-                response_follow_up_suggestions = model_for_suggestions.generate_content(prompt_for_follow_up_suggestions)
-                follow_up_suggestions_text = response_follow_up_suggestions.text.strip()
-                follow_up_suggestions_list = [s.strip() for s in follow_up_suggestions_text.split(',')] if follow_up_suggestions_text else []
-            except Exception as e:
-                print(f"[{request_id}] Suggestions generation failed: {e}")
-                follow_up_suggestions_list = []
-            
-            # Convert df to JSON once (optimization)
-            raw_data_json = df.to_json(orient='records', date_format='iso')
-        
             # Build response with all fields
             response_data = {
                 'chart_json': chart_data,
-                'raw_data': raw_data_json,
-                'suggestions': follow_up_suggestions_list,
                 'chart_type': chart_params['chart_type'],
                 'title': chart_params.get('title', '')
             }
@@ -1126,22 +1651,37 @@ Respond with ONLY valid JSON matching the schema above."""
             if chart_params.get('chart_reasoning'):
                 response_data['chart_reasoning'] = chart_params['chart_reasoning']
             
-            # Convert chart_json to JSON-safe format (handles numpy arrays, pandas timestamps, etc.)
-            if 'chart_json' in response_data:
-                response_data['chart_json'] = to_json_safe_plotly(response_data['chart_json'])
+            yield 'chart', dict(response_data)
+            
+            # Rows are encoded once, columnar ({"columns": [...], "data": [[...], ...]}) so keys
+            # aren't repeated per row, and spliced into the response as native JSON
+            table_df = plot_df if chart_params['chart_type'] in DOWNSAMPLE_CHART_TYPES and not bin_axes else df
+            table_df = table_df.head(RAW_DATA_MAX_ROWS)
+            raw_data_json = RawJSON(await run_render(table_df.to_json, orient='split', date_format='iso', index=False))
+            response_data['raw_data'] = raw_data_json
+            yield 'raw_data', {'raw_data': raw_data_json}
+            
+            # Collect follow-up suggestions generated alongside the data fetch
+            follow_up_suggestions_list = await suggestions_task
+            response_data['suggestions'] = follow_up_suggestions_list
+            yield 'suggestions', {'suggestions': follow_up_suggestions_list}
             
-            # Cache response
-            _response_cache[cache_key] = (response_data, time.time() + RESPONSE_CACHE_TTL)
-            print(f"[{request_id}] Success: chart_type={chart_params['chart_type']}, cache_size={len(_response_cache)}")
+            # Encode once: the same body is cached and sent to the client
+            response_text = await run_render(encode_json_text, response_data)
+            await run_db(_cache_response, cache_key, chart_params['table_name'], table_version, response_text)
+            print(f"[{request_id}] Success: chart_type={chart_params['chart_type']}")
             
-            return response_data
+            yield 'result', RawJSON(response_text)
+            return
         else:
             print(f"[{request_id}] No data fetched or empty dataframe")
-            return {
+            suggestions_task.cancel()
+            yield 'result', {
                 'error_type': 'DATA_ERROR',
                 'message': 'Could not fetch data for the requested chart. The table might be empty or the columns are incorrect.',
                 'suggestions': []
             }
+            return
         
         # No table_name in params - provide general suggestions
         try:
@@ -1162,7 +1702,7 @@ Respond with ONLY valid JSON matching the schema above."""
             Provide 3-5 concise suggestions as a comma-separated list.
             Example: "Show me sales by product, show me average price by category"
             """
-            response_general_suggestions = model_for_suggestions.generate_content(prompt_for_general_suggestions)
+            response_general_suggestions = await run_llm(model_for_suggestions.generate_content, prompt_for_general_suggestions)
             general_suggestions_text = response_general_suggestions.text.strip()
             general_suggestions_list = [s.strip() for s in general_suggestions_text.split(',')] if general_suggestions_text else []
         except Exception as e:
@@ -1178,27 +1718,233 @@ Respond with ONLY valid JSON matching the schema above."""
                 'ko': "요청을 완전히 이해하지 못했습니다. 다음 중 하나를 시도하거나 더 구체적으로 말씀해 주십시오:",
                 'ar': "لم أفهم طلبك بالكامل. ربما يمكنك تجربة أحد هذه الخيارات، أو كن أكثر تحديدًا:"
             }
-            return {
+            yield 'result', {
                 'response': error_messages.get(user_language, "I didn't fully understand your request. Perhaps you could try one of these, or be more specific:"),
                 'suggestions': general_suggestions_list
             }
+            return
     
     except genai_exceptions.ResourceExhausted as e:
         print(f"[{request_id}] Gemini quota exceeded: {e}")
-        return {
+        yield 'result', {
             'error_type': 'RATE_LIMIT',
             'message': 'AI quota exceeded. Please try again shortly or upgrade billing.',
             'suggestions': []
         }
+        return
     except Exception as e:
         print(f"[{request_id}] Unexpected error: {type(e).__name__}: {e}")
         import traceback
         traceback.print_exc()
-        return {
+        yield 'result', {
             'error_type': 'DATA_ERROR',
             'message': f'An unexpected error occurred: {str(e)}. Please try again.',
             'suggestions': []
         }
+        return
+
+@app.get('/metrics')
+async def metrics():
+    """Expose in-process cache counters as JSON for load testing and monitoring."""
+    return {
+        'response_cache': get_response_cache_stats(),
+        'executors': get_executor_stats(),
+        'intent_parser': _intent_parser.get_stats(),
+        'param_cache': _param_cache.get_stats(),
+        'single_flight': {
+            'chat': _chat_flights.get_stats(),
+            'sql': _query_flights.get_stats(),
+        },
+        'db_pool': _db_pool_metrics.get_stats() if _db_pool_metrics is not None else {'connected': False},
+        'table_versions': _table_versions.get_stats(),
+        'rollups': _rollup_store.get_stats() if _rollup_store is not None else {'enabled': False},
+        'replica': _replica.get_stats() if _replica is not None else {'enabled': False},
+        'columnar': _columnar.get_stats() if _columnar is not None else {'enabled': False},
+    }
+
+# Startup warm-up; /ready answers 503 until the required steps have succeeded (see backend/readiness.py)
+_readiness = Readiness()
+_warm_up_task: Optional[asyncio.Task] = None
+
+async def _warm_db_pool() -> str:
+    # At least one connection, which also checks the database is reachable
+    connections = max(1, _db_backend.pool.warm_connections)
+    opened = await run_db(warm_pool, get_db_engine(), connections)
+    if not opened:
+        raise RuntimeError("No database connection could be opened")
+    return f"{opened}/{connections} connections"
+
+async def _warm_schema_cache() -> str:
+    snapshot = await run_db(_schema_store.get)
+    if not snapshot.tables:
+        raise RuntimeError("No chart tables found")
+    # First fingerprint query, so the first cached response can be validated
+    await run_db(_table_versions.get, next(iter(snapshot.tables)))
+    return f"{len(snapshot.tables)} tables, schema version {snapshot.version}"
+
+def _connect_gemini_clients() -> None:
+    # count_tokens creates each model's client and opens its connection without generating content
+    for model in (model_for_chart_params, model_for_suggestions):
+        model.count_tokens('ping', request_options={'timeout': 10})
+
+async def _warm_gemini_client() -> str:
+    await run_llm(_connect_gemini_clients)
+    return 'connected'
+
+async def _warm_chart_renderer() -> str:
+    # The first figure serialization loads Plotly's validators
+    await run_render(pio.to_json, go.Figure(go.Bar(x=[0], y=[0])))
+    return 'rendered'
+
+@app.on_event('startup')
+async def start_warm_up():
+    """Warm this worker in the background; /ready reports when it can take traffic."""
+    global _warm_up_task
+    _warm_up_task = asyncio.create_task(_readiness.warm_up([
+        ('database_pool', _warm_db_pool, True),
+        ('schema_cache', _warm_schema_cache, True),
+        ('gemini_client', _warm_gemini_client, False),
+        ('chart_renderer', _warm_chart_renderer, False),
+    ]))
+
+@app.get('/ready')
+async def ready():
+    """Readiness probe: 200 once the worker is warm, 503 (with step results) until then."""
+    status = _readiness.get_status()
+    return JSONResponse(status, status_code=200 if status['ready'] else 503)
+
+@app.on_event('startup')
+async def start_rollup_refresh():
+    """Open the rollup store and refresh it in the background every ROLLUP_REFRESH_SECONDS."""
+    global _rollup_store, _rollup_task
+    if _rollup_settings.refresh_seconds <= 0:
+        return
+    _rollup_store = RollupStore(_rollup_settings)
+    _rollup_task = asyncio.create_task(_refresh_rollups_periodically())
+
+@app.on_event('startup')
+async def start_replica_sync():
+    """Open the local replica and sync it in the background every REPLICA_SYNC_SECONDS."""
+    global _replica, _replica_backend, _replica_task
+    if _replica_settings.sync_seconds <= 0:
+        return
+    if SQL_DIALECT == 'sqlite':
+        print("Replica: disabled, charts already read a local SQLite database")
+        return
+    _replica = SnapshotReplica(_replica_settings)
+    _replica_backend = DatabaseBackend('sqlite', _replica.url)
+    _replica_task = asyncio.create_task(_sync_replica_periodically())
+
+@app.on_event('startup')
+async def start_columnar_refresh():
+    """Load the columnar engine and check the tables for changes every COLUMNAR_REFRESH_SECONDS."""
+    global _columnar, _columnar_task
+    if _columnar_settings.refresh_seconds <= 0:
+        return
+    if not duckdb_available():
+        print("Warning: COLUMNAR_REFRESH_SECONDS is set but duckdb is not installed; columnar engine disabled")
+        return
+    _columnar = ColumnarEngine(_columnar_settings)
+    _columnar_task = asyncio.create_task(_refresh_columnar_periodically())
+
+@app.on_event('shutdown')
+async def shutdown_worker_pools():
+    """Release worker threads when the application stops."""
+    if _rollup_task is not None:
+        _rollup_task.cancel()
+    if _replica_task is not None:
+        _replica_task.cancel()
+    if _columnar_task is not None:
+        _columnar_task.cancel()
+    if _warm_up_task is not None:
+        _warm_up_task.cancel()
+    shutdown_executors()
+
+async def _coalesced_chat_events(request_body: ChatRequest):
+    """
+    _chat_events with single-flight coalescing on the response cache key.
+    While one request is computing a response, identical concurrent requests wait
+    for it and receive only the final result (like a cache hit) instead of
+    repeating the Gemini calls and database query.
+    """
+    user_language, forced_chart_type = _resolve_request_options(request_body)
+    schema_version = await run_db(get_schema_version)
+    cache_key = _get_response_cache_key(
+        request_body.message, user_language, forced_chart_type, schema_version, target_points(request_body.plot_width)
+    )
+    
+    is_leader, flight = _chat_flights.join(cache_key)
+    if not is_leader:
+        response = await _chat_flights.wait(flight)
+        if response is not None:
+            yield 'result', response
+            return
+        # Leader aborted (client disconnect or crash) before producing a result
+        async for event in _chat_events(request_body):
+            yield event
+        return
+    
+    response = None
+    try:
+        async for stage, payload in _chat_events(request_body):
+            if stage == 'result':
+                response = payload
+            yield stage, payload
+    finally:
+        _chat_flights.finish(cache_key, response)
+
+@app.post('/chat')
+async def chat(request_body: ChatRequest, request: Request):
+    """
+    Handles chatbot interactions with robust error handling and JSON parsing.
+    Chart responses are sent as Arrow IPC instead of JSON when the client sends
+    `Accept: application/vnd.apache.arrow.stream` (requires pyarrow).
+    """
+    response = None
+    async for stage, payload in _coalesced_chat_events(request_body):
+        if stage == 'result':
+            response = payload
+    headers = {'Vary': 'Accept'}
+    if isinstance(response, RawJSON) and accepts_arrow(request.headers.get('accept')):
+        arrow_body = await run_render(encode_arrow_response, response)
+        if arrow_body is not None:
+            return Response(content=arrow_body, media_type=ARROW_STREAM_MEDIA_TYPE, headers=headers)
+    # Successful responses arrive pre-encoded; write them out without re-serializing
+    return Response(content=encode_json(response), media_type='application/json', headers=headers)
+
+def _format_sse(event: str, payload: Any) -> str:
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {encode_json_text(payload)}\n\n"
+
+@app.post('/chat/stream')
+async def chat_stream(request_body: ChatRequest):
+    """
+    Streaming variant of /chat over Server-Sent Events.
+    Emits 'params' (chart type/title), 'chart' (Plotly figure), 'raw_data' and
+    'suggestions' as each becomes ready, then a final 'done' (or 'error') event
+    carrying the remaining response fields.
+    """
+    async def event_stream():
+        chart_streamed = False
+        streamed_fields = {}
+        async for stage, payload in _coalesced_chat_events(request_body):
+            if stage == 'chart':
+                chart_streamed = True
+            if stage == 'result':
+                stage = 'error' if isinstance(payload, dict) and 'error_type' in payload else 'done'
+                if chart_streamed:
+                    # Figure and rows were already sent; don't repeat the large fields.
+                    # The final (pre-encoded) result is the union of the streamed stages.
+                    payload = {k: v for k, v in streamed_fields.items() if k not in ('chart_json', 'raw_data')}
+            elif stage in ('chart', 'raw_data', 'suggestions'):
+                streamed_fields.update(payload)
+            yield _format_sse(stage, payload)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 # SPA fallback: serve index.html for all non-API routes
 # These routes must come AFTER all API routes (like /chat) so FastAPI matches them first
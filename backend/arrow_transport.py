@@ -0,0 +1,132 @@
+"""
+Opt-in Arrow IPC transport for chart responses.
+Clients that send `Accept: application/vnd.apache.arrow.stream` to /chat get the
+chart data as one Arrow record batch instead of JSON rows. Trace arrays that
+repeat a data column (x/y/z, bubble sizes) are replaced by {"column": name}
+references, so large numeric payloads are sent once as typed buffers and can
+be decoded zero-copy. The remaining response fields (figure layout, title,
+suggestions, ...) travel as JSON in the schema metadata under b'chart'.
+
+pyarrow is optional; without it the endpoint keeps answering in JSON.
+"""
+import base64
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from backend.json_encoding import encode_json_text
+
+ARROW_STREAM_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+# Trace attributes that may be replaced by a column reference ('.'-separated paths)
+COLUMN_ARRAY_PATHS = ('x', 'y', 'z', 'marker.size')
+
+_pyarrow = None
+
+
+def _import_pyarrow():
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.ipc  # noqa: F401
+            _pyarrow = pyarrow
+        except ModuleNotFoundError:
+            _pyarrow = False
+    return _pyarrow or None
+
+
+def arrow_available() -> bool:
+    """True if pyarrow is installed."""
+    return _import_pyarrow() is not None
+
+
+def accepts_arrow(accept: Optional[str]) -> bool:
+    """True if the Accept header asks for Arrow IPC and the server can produce it."""
+    if not accept:
+        return False
+    media_types = {part.split(';')[0].strip().lower() for part in accept.split(',')}
+    return ARROW_STREAM_MEDIA_TYPE in media_types and arrow_available()
+
+
+def _decode_array(value: Any) -> Optional[List]:
+    """Trace array as a list: plain JSON lists or Plotly's base64 typed arrays."""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict) and 'bdata' in value and 'dtype' in value:
+        if ',' in str(value.get('shape', '')):
+            return None  # 2D arrays never mirror a single column
+        return np.frombuffer(base64.b64decode(value['bdata']), dtype=np.dtype(value['dtype'])).tolist()
+    return None
+
+
+def _same_values(a: List, b: List) -> bool:
+    if not a or len(a) != len(b):
+        return False
+    try:
+        # raw_data floats are rounded by pandas' JSON encoder, so compare numerics with a tolerance
+        return bool(np.allclose(np.asarray(a, dtype=float), np.asarray(b, dtype=float), rtol=1e-9, equal_nan=True))
+    except (TypeError, ValueError):
+        return a == b
+
+
+def reference_columns(figure: Dict, columns: Dict[str, List]) -> int:
+    """
+    Replace trace arrays that equal a full data column with {"column": name}.
+
+    Traces holding a subset of the rows (e.g. one trace per color group) are
+    left inline. Modifies figure in place and returns the number of arrays replaced.
+    """
+    replaced = 0
+    for trace in figure.get('data', []):
+        for path in COLUMN_ARRAY_PATHS:
+            *parents, leaf = path.split('.')
+            container = trace
+            for part in parents:
+                container = container.get(part) if isinstance(container, dict) else None
+            if not isinstance(container, dict) or leaf not in container:
+                continue
+            values = _decode_array(container[leaf])
+            if values is None:
+                continue
+            for name, column in columns.items():
+                if _same_values(values, column):
+                    container[leaf] = {'column': name}
+                    replaced += 1
+                    break
+    return replaced
+
+
+def encode_arrow_response(response_text: str) -> Optional[bytes]:
+    """
+    Re-encode a JSON chat response (with columnar raw_data) as an Arrow IPC stream.
+
+    Returns None when the response carries no rows (errors, text replies) or
+    pyarrow is unavailable; callers then send the JSON response unchanged.
+    """
+    pa = _import_pyarrow()
+    if pa is None:
+        return None
+    response = json.loads(response_text)
+    raw_data = response.pop('raw_data', None)
+    if not isinstance(raw_data, dict) or 'columns' not in raw_data or 'data' not in raw_data:
+        return None
+
+    names = [str(name) for name in raw_data['columns']]
+    rows = raw_data['data']
+    columns = {name: [row[i] for row in rows] for i, name in enumerate(names)}
+    if isinstance(response.get('chart_json'), dict):
+        reference_columns(response['chart_json'], columns)
+
+    try:
+        table = pa.Table.from_pydict(columns)
+    except (pa.ArrowException, TypeError, ValueError) as e:
+        # e.g. a column mixing numbers and strings; fall back to JSON
+        print(f"Warning: Could not build Arrow table for response: {e}")
+        return None
+    table = table.replace_schema_metadata({'chart': encode_json_text(response)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
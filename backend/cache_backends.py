@@ -0,0 +1,310 @@
+"""
+Pluggable cache backends shared across gunicorn workers.
+- memory: per-process ResponseCache (LRU + TTL + byte budget)
+- sqlite: one WAL-mode SQLite file shared by every worker on the host
+- redis:  any Redis-protocol server (Redis, Valkey, KeyDB, a local stand-in)
+
+All backends expose the ResponseCache interface (get/put/invalidate/discard/clear/get_stats)
+and the same TTL semantics. Shared backends store JSON, so values must be
+JSON-serializable with the given encoder. Backend errors are logged and treated
+as cache misses; they never fail a request.
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Type
+
+from backend.config import CacheSettings
+from backend.local_sqlite import LocalSQLite
+from backend.response_cache import ResponseCache
+
+
+class SQLiteCache:
+    """
+    LRU + TTL cache in a local SQLite file.
+    Each worker process opens its own connections (one per thread); WAL mode lets
+    readers proceed while another worker writes.
+    """
+
+    def __init__(self, path: str, namespace: str, ttl: float, max_entries: int, max_bytes: int,
+                 encoder: Optional[Type[json.JSONEncoder]] = None):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._encoder = encoder
+        self._sqlite = LocalSQLite(path)
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'rejected': 0, 'errors': 0}
+
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_lru ON cache_entries (namespace, accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._sqlite.connect()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, refreshing its LRU position; expired entries are dropped."""
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, str(key))
+            ).fetchone()
+            if row is None:
+                self._count('misses')
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, str(key)))
+                self._count('expirations')
+                self._count('misses')
+                return None
+            conn.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, str(key))
+            )
+        except sqlite3.Error as e:
+            print(f"Warning: SQLite cache read failed ({self.namespace}): {e}")
+            self._count('errors')
+            self._count('misses')
+            return None
+        self._count('hits')
+        return json.loads(value)
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None) -> bool:
+        """Store a value and evict least recently used entries beyond the limits."""
+        encoded = json.dumps(value, cls=self._encoder)
+        size = len(encoded.encode('utf-8'))
+        if size > self.max_bytes:
+            self._count('rejected')
+            return False
+        now = time.time()
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.namespace, str(key), encoded, size, now + self.ttl, now)
+                )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            print(f"Warning: SQLite cache write failed ({self.namespace}): {e}")
+            self._count('errors')
+            return False
+        return True
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least recently used ones until within limits."""
+        conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?", (self.namespace, now))
+        entries, total_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,)
+        ).fetchone()
+        if entries <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at",
+            (self.namespace,)
+        ):
+            if entries <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            victims.append((self.namespace, key))
+            entries -= 1
+            total_bytes -= size
+        conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims)
+        self._count('evictions', len(victims))
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry if present."""
+        try:
+            self._connect().execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, str(key))
+            )
+        except sqlite3.Error as e:
+            print(f"Warning: SQLite cache invalidate failed ({self.namespace}): {e}")
+
+    def discard(self, key: Hashable) -> None:
+        """Drop an entry get() just returned but the caller found stale; that lookup counts as a miss."""
+        self.invalidate(key)
+        self._count('hits', -1)
+        self._count('misses')
+
+    def clear(self) -> None:
+        """Drop all entries in this namespace (for every worker)."""
+        try:
+            self._connect().execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+        except sqlite3.Error as e:
+            print(f"Warning: SQLite cache clear failed ({self.namespace}): {e}")
+
+    def __len__(self) -> int:
+        try:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-process counters plus shared size and configured limits."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        try:
+            entries, total_bytes = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,)
+            ).fetchone()
+        except sqlite3.Error:
+            entries, total_bytes = None, None
+        lookups = stats['hits'] + stats['misses']
+        return {
+            'backend': 'sqlite',
+            **stats,
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else 0.0,
+            'entries': entries,
+            'bytes': total_bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl,
+        }
+
+
+class RedisCache:
+    """
+    Cache on a Redis-protocol server. TTL is enforced by the server (SET PX);
+    entry/byte limits are the server's job (maxmemory + allkeys-lru).
+    """
+
+    def __init__(self, url: str, namespace: str, ttl: float, max_bytes: int,
+                 encoder: Optional[Type[json.JSONEncoder]] = None, prefix: str = 'charting_ai',
+                 client: Any = None):
+        if client is None:
+            try:
+                import redis
+            except ModuleNotFoundError as e:
+                raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package (pip install redis)") from e
+            client = redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
+        self._client = client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._encoder = encoder
+        self._prefix = f"{prefix}:{namespace}:"
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'rejected': 0, 'errors': 0}
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss or server error."""
+        try:
+            raw = self._client.get(self._prefix + str(key))
+        except Exception as e:
+            print(f"Warning: Redis cache read failed ({self.namespace}): {type(e).__name__}: {e}")
+            self._count('errors')
+            raw = None
+        if raw is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return json.loads(raw)
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None) -> bool:
+        """Store a value with the cache TTL."""
+        encoded = json.dumps(value, cls=self._encoder).encode('utf-8')
+        if len(encoded) > self.max_bytes:
+            self._count('rejected')
+            return False
+        try:
+            self._client.set(self._prefix + str(key), encoded, px=max(1, int(self.ttl * 1000)))
+        except Exception as e:
+            print(f"Warning: Redis cache write failed ({self.namespace}): {type(e).__name__}: {e}")
+            self._count('errors')
+            return False
+        return True
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry if present."""
+        try:
+            self._client.delete(self._prefix + str(key))
+        except Exception as e:
+            print(f"Warning: Redis cache invalidate failed ({self.namespace}): {type(e).__name__}: {e}")
+
+    def discard(self, key: Hashable) -> None:
+        """Drop an entry get() just returned but the caller found stale; that lookup counts as a miss."""
+        self.invalidate(key)
+        self._count('hits', -1)
+        self._count('misses')
+
+    def clear(self) -> None:
+        """Drop all entries in this namespace."""
+        try:
+            keys = list(self._client.scan_iter(match=self._prefix + '*'))
+            if keys:
+                self._client.delete(*keys)
+        except Exception as e:
+            print(f"Warning: Redis cache clear failed ({self.namespace}): {type(e).__name__}: {e}")
+
+    def __len__(self) -> int:
+        # Counts this namespace's keys with SCAN (O(keys on the server)); for monitoring, not per request
+        try:
+            return sum(1 for _ in self._client.scan_iter(match=self._prefix + '*'))
+        except Exception:
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-process counters and configured TTL."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        return {
+            'backend': 'redis',
+            **stats,
+            'hit_rate': round(stats['hits'] / lookups, 4) if lookups else 0.0,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl,
+        }
+
+
+def create_cache(settings: CacheSettings, namespace: str, ttl: float, max_entries: int, max_bytes: int,
+                 encoder: Optional[Type[json.JSONEncoder]] = None,
+                 sizer: Optional[Callable[[Any], int]] = None):
+    """
+    Build the configured cache backend for one namespace.
+    Falls back to the in-process cache if the shared backend cannot be opened.
+    """
+    try:
+        if settings.backend == 'sqlite':
+            return SQLiteCache(settings.sqlite_path, namespace, ttl, max_entries, max_bytes, encoder=encoder)
+        if settings.backend == 'redis':
+            return RedisCache(settings.redis_url, namespace, ttl, max_bytes, encoder=encoder)
+    except Exception as e:
+        print(f"Warning: Cache backend '{settings.backend}' unavailable for {namespace}, using in-process cache: {e}")
+    return ResponseCache(ttl, max_entries, max_bytes, sizer=sizer)
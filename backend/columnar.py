@@ -0,0 +1,163 @@
+"""
+In-process columnar engine for chart queries.
+The target tables are copied into an in-memory DuckDB database, and the SQL
+built by safe_sql (db_type='duckdb': GROUP BY aggregates, bucket counts, box
+plot quartiles) runs there with vectorized execution instead of a round trip
+to the database. Worthwhile for tables that fit in memory; larger tables are
+not loaded and keep reading the database.
+
+A table is reloaded when its version (see backend/table_versions.py) changes,
+and in full every full_reload_seconds regardless, since a version built from
+the row count and max ID/date misses updates. Freshness is the age of the
+loaded copy. Each worker holds its own copy.
+
+duckdb is optional; without it charts keep reading the database.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import text
+
+from backend.config import ColumnarSettings
+from backend.safe_sql import quote_ident
+
+_duckdb = None
+
+
+def _import_duckdb():
+    global _duckdb
+    if _duckdb is None:
+        try:
+            import duckdb
+            _duckdb = duckdb
+        except ModuleNotFoundError:
+            _duckdb = False
+    return _duckdb or None
+
+
+def duckdb_available() -> bool:
+    """True if duckdb is installed."""
+    return _import_duckdb() is not None
+
+
+class ColumnarEngine:
+    """
+    Target tables in an in-memory DuckDB database.
+    Queries use one DuckDB cursor per thread; reloading a table replaces it
+    atomically, so concurrent queries see either the old or the new copy.
+    """
+
+    def __init__(self, settings: ColumnarSettings):
+        duckdb = _import_duckdb()
+        if duckdb is None:
+            raise RuntimeError("duckdb is not installed")
+        self.settings = settings
+        self._db = duckdb.connect(':memory:')
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # {table: {'version', 'columns', 'rows', 'loaded_at'}}
+        self._tables: Dict[str, Dict[str, Any]] = {}
+        self._stats = {'reads': 0, 'fallbacks': 0, 'loads': 0, 'full_reloads': 0, 'errors': 0}
+
+    def _cursor(self):
+        cursor = getattr(self._local, 'cursor', None)
+        if cursor is None:
+            cursor = self._db.cursor()
+            self._local.cursor = cursor
+        return cursor
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def load_table(self, table: str, frame: pd.DataFrame, version: Optional[str] = None) -> None:
+        """Replace a table with the rows of frame."""
+        cursor = self._cursor()
+        cursor.register('incoming_rows', frame)
+        try:
+            cursor.execute(f"CREATE OR REPLACE TABLE {quote_ident(table, 'duckdb')} AS SELECT * FROM incoming_rows")
+        finally:
+            cursor.unregister('incoming_rows')
+        with self._lock:
+            self._tables[table] = {
+                'version': version, 'columns': list(frame.columns), 'rows': len(frame), 'loaded_at': time.time()
+            }
+            self._stats['loads'] += 1
+
+    def drop_table(self, table: str) -> None:
+        with self._lock:
+            self._tables.pop(table, None)
+        self._cursor().execute(f"DROP TABLE IF EXISTS {quote_ident(table, 'duckdb')}")
+
+    def refresh(self, source_conn, column_types: Dict[str, Dict[str, str]],
+                version_of: Callable[[str], Optional[str]], db_type: str = 'sqlserver') -> None:
+        """
+        Load every table in column_types ({table: {column: data_type}}) from
+        source_conn (a SQLAlchemy connection) unless its version is unchanged
+        and it was loaded within full_reload_seconds.
+        Errors are logged per table and never raised.
+        """
+        for table, types in column_types.items():
+            try:
+                self._refresh_table(source_conn, table, list(types), version_of(table), db_type)
+            except Exception as e:
+                print(f"Warning: Columnar load failed for table {table}: {type(e).__name__}: {e}")
+                self._count('errors')
+
+    def _refresh_table(self, source_conn, table: str, columns: Sequence[str], version: Optional[str], db_type: str) -> None:
+        with self._lock:
+            current = self._tables.get(table)
+            unchanged = bool(
+                current and version is not None and current['version'] == version and current['columns'] == list(columns)
+            )
+            if unchanged and time.time() - current['loaded_at'] < self.settings.full_reload_seconds:
+                return
+            if unchanged:
+                self._stats['full_reloads'] += 1
+
+        quoted_table = quote_ident(table, db_type)
+        row_count = source_conn.execute(text(f"SELECT COUNT(*) FROM {quoted_table}")).scalar()
+        if row_count > self.settings.max_rows:
+            if current:
+                self.drop_table(table)
+            print(f"Columnar: skipping {table} ({row_count} rows > {self.settings.max_rows})")
+            return
+        column_list = ", ".join(quote_ident(column, db_type) for column in columns)
+        frame = pd.read_sql(text(f"SELECT {column_list} FROM {quoted_table}"), source_conn)
+        self.load_table(table, frame, version)
+        print(f"Columnar: loaded {table} ({len(frame)} rows)")
+
+    def covers(self, table: str, columns: Sequence[str] = ()) -> bool:
+        """True if the table was loaded within max_staleness_seconds and has every given column."""
+        with self._lock:
+            state = self._tables.get(table)
+            fresh = bool(
+                state
+                and time.time() - state['loaded_at'] <= self.settings.max_staleness_seconds
+                and set(columns) <= set(state['columns'])
+            )
+            self._stats['reads' if fresh else 'fallbacks'] += 1
+        return fresh
+
+    def version(self, table: str) -> Optional[str]:
+        """Version of the source table the loaded copy was read at (None if unknown or not loaded)."""
+        with self._lock:
+            state = self._tables.get(table)
+            return state['version'] if state else None
+
+    def query(self, sql: str) -> pd.DataFrame:
+        """Run a query built for db_type='duckdb'."""
+        return self._cursor().execute(sql).df()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters and loaded tables for monitoring."""
+        now = time.time()
+        with self._lock:
+            stats = dict(self._stats)
+            stats['tables'] = {
+                table: {'rows': state['rows'], 'age_seconds': round(now - state['loaded_at'], 1)}
+                for table, state in self._tables.items()
+            }
+        return stats
@@ -5,8 +5,8 @@ Loads settings from environment variables with safe defaults where appropriate.
 import os
 import secrets
 import logging
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 from datetime import timedelta
 from backend.paths import data_path, DATA_DIR
 
@@ -36,6 +36,329 @@ def get_absolute_sqlite_path(database_url: str) -> str:
     return db_path
 
 
+CACHE_BACKENDS = ('memory', 'sqlite', 'redis')
+
+
+@dataclass
+class CacheSettings:
+    """Result/schema cache backend shared by all workers on a host (see backend/cache_backends.py)."""
+    # memory: per-process (default); sqlite: one file shared by all local workers; redis: Redis-protocol server
+    backend: str = 'memory'
+    sqlite_path: str = str(data_path('cache.db'))
+    redis_url: str = 'redis://localhost:6379/0'
+
+
+def get_cache_settings() -> CacheSettings:
+    """
+    Load cache backend settings from environment variables.
+    Unlike get_settings(), this never raises: an unknown backend falls back to 'memory'.
+    """
+    backend = os.environ.get('CACHE_BACKEND', 'memory').lower()
+    if backend not in CACHE_BACKENDS:
+        logger.warning(
+            f"CACHE_BACKEND '{backend}' is not supported. "
+            f"Falling back to 'memory'. Supported backends: {', '.join(CACHE_BACKENDS)}"
+        )
+        backend = 'memory'
+    return CacheSettings(
+        backend=backend,
+        sqlite_path=os.environ.get('CACHE_SQLITE_PATH') or str(data_path('cache.db')),
+        redis_url=os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0'),
+    )
+
+
+@dataclass
+class RollupSettings:
+    """Pre-aggregated rollup tables kept in a local SQLite file (see backend/rollups.py)."""
+    # Seconds between refreshes; 0 disables rollups (opt-in: every refresh queries the base tables)
+    refresh_seconds: float = 0.0
+    # Seconds between full rebuilds (incremental refreshes only see new keys, not updates)
+    full_refresh_seconds: float = 6 * 3600.0
+    # Rollups older than this are ignored and charts read the base table
+    max_staleness_seconds: float = 900.0
+    # Only low-cardinality dimensions are rolled up: more distinct values than this are skipped
+    max_groups: int = 100
+    sqlite_path: str = str(data_path('rollups.db'))
+
+
+def env_number(name: str, default: float) -> float:
+    """Read a non-negative number from the environment, falling back to default."""
+    try:
+        value = float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        logger.warning(f"{name} must be a number. Falling back to {default}.")
+        return default
+    return value if value >= 0 else default
+
+
+def get_rollup_settings() -> RollupSettings:
+    """Rollup settings from the ROLLUP_* variables; invalid or negative values keep the defaults."""
+    defaults = RollupSettings()
+    return RollupSettings(
+        refresh_seconds=env_number('ROLLUP_REFRESH_SECONDS', defaults.refresh_seconds),
+        full_refresh_seconds=env_number('ROLLUP_FULL_REFRESH_SECONDS', defaults.full_refresh_seconds),
+        max_staleness_seconds=env_number('ROLLUP_MAX_STALENESS_SECONDS', defaults.max_staleness_seconds),
+        max_groups=int(env_number('ROLLUP_MAX_GROUPS', defaults.max_groups)) or defaults.max_groups,
+        sqlite_path=os.environ.get('ROLLUP_SQLITE_PATH') or defaults.sqlite_path,
+    )
+
+
+@dataclass
+class ReplicaSettings:
+    """Local SQLite snapshot of the Azure SQL target tables (see backend/replica.py)."""
+    # Seconds between syncs; 0 disables the replica
+    sync_seconds: float = 0.0
+    # Seconds between full re-copies (incremental syncs only see new keys, not updates)
+    full_sync_seconds: float = 6 * 3600.0
+    # Tables synced longer ago than this are read from Azure SQL instead
+    max_staleness_seconds: float = 900.0
+    # Per-table staleness budgets overriding max_staleness_seconds
+    table_staleness_seconds: Dict[str, float] = field(default_factory=dict)
+    # Rows fetched from Azure SQL per round trip
+    batch_rows: int = 5000
+    sqlite_path: str = str(data_path('replica.db'))
+
+    def staleness_budget(self, table_name: str) -> float:
+        """Seconds a table's snapshot may lag Azure SQL and still serve charts."""
+        return self.table_staleness_seconds.get(table_name, self.max_staleness_seconds)
+
+
+def _parse_table_numbers(name: str) -> Dict[str, float]:
+    """Parse 'Table=seconds,Table=seconds' from the environment, skipping invalid entries."""
+    values = {}
+    for item in os.environ.get(name, '').split(','):
+        table, _, number = item.partition('=')
+        if not item.strip():
+            continue
+        try:
+            value = float(number)
+        except ValueError:
+            value = -1
+        if not table.strip() or value < 0:
+            logger.warning(f"{name}: ignoring '{item.strip()}' (expected Table=seconds).")
+            continue
+        values[table.strip()] = value
+    return values
+
+
+def get_replica_settings() -> ReplicaSettings:
+    """Replica settings from the REPLICA_* variables; malformed per-table budgets are logged and skipped."""
+    defaults = ReplicaSettings()
+    return ReplicaSettings(
+        sync_seconds=env_number('REPLICA_SYNC_SECONDS', defaults.sync_seconds),
+        full_sync_seconds=env_number('REPLICA_FULL_SYNC_SECONDS', defaults.full_sync_seconds),
+        max_staleness_seconds=env_number('REPLICA_MAX_STALENESS_SECONDS', defaults.max_staleness_seconds),
+        table_staleness_seconds=_parse_table_numbers('REPLICA_TABLE_STALENESS_SECONDS'),
+        batch_rows=int(env_number('REPLICA_BATCH_ROWS', defaults.batch_rows)) or defaults.batch_rows,
+        sqlite_path=os.environ.get('REPLICA_SQLITE_PATH') or defaults.sqlite_path,
+    )
+
+
+@dataclass
+class ColumnarSettings:
+    """In-process DuckDB copy of the target tables (see backend/columnar.py)."""
+    # Seconds between change checks (tables are reloaded when their version changes); 0 disables it
+    refresh_seconds: float = 0.0
+    # Seconds between full reloads of unchanged tables (versions don't see every update)
+    full_reload_seconds: float = 600.0
+    # Tables loaded longer ago than this are read from the database instead
+    max_staleness_seconds: float = 900.0
+    # Tables with more rows than this are not loaded
+    max_rows: int = 1_000_000
+
+
+def get_columnar_settings() -> ColumnarSettings:
+    """Columnar engine settings from the COLUMNAR_* variables (disabled unless COLUMNAR_REFRESH_SECONDS is set)."""
+    defaults = ColumnarSettings()
+    return ColumnarSettings(
+        refresh_seconds=env_number('COLUMNAR_REFRESH_SECONDS', defaults.refresh_seconds),
+        full_reload_seconds=env_number('COLUMNAR_FULL_RELOAD_SECONDS', defaults.full_reload_seconds),
+        max_staleness_seconds=env_number('COLUMNAR_MAX_STALENESS_SECONDS', defaults.max_staleness_seconds),
+        max_rows=int(env_number('COLUMNAR_MAX_ROWS', defaults.max_rows)) or defaults.max_rows,
+    )
+
+
+@dataclass
+class PoolSettings:
+    """SQLAlchemy connection pool of the chart database (see DatabaseBackend.create_engine)."""
+    # Connections kept open per worker process
+    size: int = 5
+    # Extra connections opened under load and closed when returned
+    max_overflow: int = 10
+    # Seconds a query waits for a free connection before failing
+    timeout: float = 30.0
+    # Seconds after which a connection is replaced (Azure SQL drops idle connections)
+    recycle: int = 3600
+    # Test each connection with a round trip on checkout and replace it if the server dropped it
+    pre_ping: bool = True
+    # Connections opened at startup so the first requests don't pay the login
+    warm_connections: int = 2
+
+
+def get_pool_settings() -> PoolSettings:
+    """Connection pool settings from the SQL_POOL_* variables; warm connections never exceed size + overflow."""
+    defaults = PoolSettings()
+    size = int(env_number('SQL_POOL_SIZE', defaults.size)) or defaults.size
+    max_overflow = int(env_number('SQL_POOL_MAX_OVERFLOW', defaults.max_overflow))
+    return PoolSettings(
+        size=size,
+        max_overflow=max_overflow,
+        timeout=env_number('SQL_POOL_TIMEOUT', defaults.timeout),
+        recycle=int(env_number('SQL_POOL_RECYCLE', defaults.recycle)),
+        pre_ping=os.environ.get('SQL_POOL_PRE_PING', str(defaults.pre_ping)).lower() in ('1', 'true', 'yes'),
+        warm_connections=min(int(env_number('SQL_POOL_WARM_CONNECTIONS', defaults.warm_connections)), size + max_overflow),
+    )
+
+
+@dataclass
+class ExecutorSettings:
+    """Thread pools for blocking work in /chat (see backend/executors.py); sizes are per worker process."""
+    # Concurrent Gemini calls
+    llm_workers: int = 8
+    # Concurrent database calls; matches the connection pool so DB threads never wait on checkout
+    db_workers: int = PoolSettings().size + PoolSettings().max_overflow
+    # Concurrent chart rendering/serialization (CPU-bound)
+    render_workers: int = min(4, os.cpu_count() or 1)
+
+
+def get_executor_settings() -> ExecutorSettings:
+    """Thread pool sizes from *_POOL_SIZE; DB_POOL_SIZE defaults to SQL_POOL_SIZE + SQL_POOL_MAX_OVERFLOW."""
+    defaults = ExecutorSettings()
+    pool = get_pool_settings()
+    db_workers = pool.size + pool.max_overflow
+    return ExecutorSettings(
+        llm_workers=int(env_number('LLM_POOL_SIZE', defaults.llm_workers)) or defaults.llm_workers,
+        db_workers=int(env_number('DB_POOL_SIZE', db_workers)) or db_workers,
+        render_workers=int(env_number('RENDER_POOL_SIZE', defaults.render_workers)) or defaults.render_workers,
+    )
+
+
+@dataclass
+class DatabaseSettings:
+    """Database connection settings (SQLite file or Azure SQL); see backend/db_backend.py."""
+    database_url: str
+    azure_sql_server: Optional[str]
+    azure_sql_database: Optional[str]
+    azure_sql_username: Optional[str]
+    azure_sql_password: Optional[str]
+    azure_sql_driver: str
+    azure_sql_encrypt: str
+    azure_sql_trust_cert: str
+    azure_sql_timeout: str
+    database_auth_mode: str
+    pool: PoolSettings = field(default_factory=PoolSettings)
+    # False when DATABASE_URL was unset and database_url is the SQLite default
+    database_url_is_explicit: bool = True
+
+    @property
+    def is_azure_sql(self) -> bool:
+        return self.azure_sql_server is not None
+
+
+def get_database_settings() -> DatabaseSettings:
+    """
+    Load database connection settings from environment variables.
+    
+    Raises:
+        ValueError: If Azure SQL is selected but its required variables are missing.
+    """
+    # Database URL (defaults to SQLite for local development)
+    database_url_env = os.environ.get('DATABASE_URL', 'sqlite:///./backend/data/charting_ai.db')
+    
+    # Ensure data directory exists for SQLite (Windows-friendly)
+    if database_url_env.startswith('sqlite:///'):
+        import pathlib
+        # Get absolute path using single source of truth function
+        db_path = get_absolute_sqlite_path(database_url_env)
+        # Ensure data directory exists
+        if not DATA_DIR.exists():
+            DATA_DIR.mkdir(parents=True, exist_ok=True)
+            logger.info(f"Created data directory: {DATA_DIR}")
+        # Always use absolute path in database_url
+        database_url = f'sqlite:///{db_path}'
+    else:
+        database_url = database_url_env
+    
+    # Azure SQL Database settings (optional, only required if using Azure SQL)
+    # Check if DATABASE_URL indicates Azure SQL or if Azure SQL vars are explicitly set
+    is_azure_sql = (
+        database_url.startswith('mssql+pyodbc://') or
+        database_url.startswith('mssql://') or
+        os.environ.get('AZURE_SQL_SERVER') is not None
+    )
+    
+    if is_azure_sql or not database_url.startswith('sqlite:///'):
+        # Azure SQL settings are required
+        azure_sql_server = os.environ.get('AZURE_SQL_SERVER')
+        if not azure_sql_server:
+            raise ValueError(
+                "AZURE_SQL_SERVER is required when using Azure SQL. "
+                "Set DATABASE_URL to sqlite:///./backend/data/charting_ai.db for SQLite, "
+                "or provide AZURE_SQL_SERVER for Azure SQL."
+            )
+        
+        azure_sql_database = os.environ.get('AZURE_SQL_DATABASE')
+        if not azure_sql_database:
+            raise ValueError(
+                "AZURE_SQL_DATABASE is required when using Azure SQL. "
+                "Please set it as an environment variable."
+            )
+        
+        azure_sql_username = os.environ.get('AZURE_SQL_USERNAME')
+        if not azure_sql_username:
+            raise ValueError(
+                "AZURE_SQL_USERNAME is required when using Azure SQL. "
+                "Please set it as an environment variable."
+            )
+        
+        azure_sql_password = os.environ.get('AZURE_SQL_PASSWORD')
+        if not azure_sql_password:
+            raise ValueError(
+                "AZURE_SQL_PASSWORD is required when using Azure SQL. "
+                "Please set it as an environment variable."
+            )
+    else:
+        # SQLite mode - Azure SQL settings not required
+        azure_sql_server = None
+        azure_sql_database = None
+        azure_sql_username = None
+        azure_sql_password = None
+    
+    # Azure SQL optional settings with defaults
+    azure_sql_driver = os.environ.get('AZURE_SQL_DRIVER', '{ODBC Driver 17 for SQL Server}')
+    azure_sql_encrypt = os.environ.get('AZURE_SQL_ENCRYPT', 'yes')
+    azure_sql_trust_cert = os.environ.get('AZURE_SQL_TRUST_CERT', 'no')
+    azure_sql_timeout = os.environ.get('AZURE_SQL_TIMEOUT', '30')
+    
+    # Database authentication mode (for future managed identity/AAD support)
+    # Current default: "sql_password" (SQL username/password authentication)
+    # TODO: Future support for "managed_identity" and "aad" authentication modes
+    database_auth_mode = os.environ.get('DATABASE_AUTH_MODE', 'sql_password')
+    if database_auth_mode not in ('sql_password',):
+        # Placeholder for future modes: 'managed_identity', 'aad'
+        logger.warning(
+            f"DATABASE_AUTH_MODE '{database_auth_mode}' is not yet implemented. "
+            f"Falling back to 'sql_password'. "
+            f"Supported modes: 'sql_password'"
+        )
+        database_auth_mode = 'sql_password'
+    
+    return DatabaseSettings(
+        database_url=database_url,
+        azure_sql_server=azure_sql_server,
+        azure_sql_database=azure_sql_database,
+        azure_sql_username=azure_sql_username,
+        azure_sql_password=azure_sql_password,
+        azure_sql_driver=azure_sql_driver,
+        azure_sql_encrypt=azure_sql_encrypt,
+        azure_sql_trust_cert=azure_sql_trust_cert,
+        azure_sql_timeout=azure_sql_timeout,
+        database_auth_mode=database_auth_mode,
+        pool=get_pool_settings(),
+        database_url_is_explicit=bool(os.environ.get('DATABASE_URL')),
+    )
+
+
 @dataclass
 class Settings:
     """Application settings loaded from environment variables."""
@@ -70,6 +393,12 @@ class Settings:
     
     # Frontend serving (default: false in dev, true in prod)
     serve_frontend: bool
+    
+    # Shared cache backend
+    cache: CacheSettings = field(default_factory=CacheSettings)
+    
+    # Database connection pool
+    pool: PoolSettings = field(default_factory=PoolSettings)
 
 
 def get_settings() -> Settings:
@@ -120,68 +449,9 @@ def get_settings() -> Settings:
     # Gemini enabled toggle (default: true)
     gemini_enabled = os.environ.get('GEMINI_ENABLED', 'true').lower() in ('1', 'true', 'yes')
     
-    # Database URL (defaults to SQLite for local development)
-    database_url_env = os.environ.get('DATABASE_URL', 'sqlite:///./backend/data/charting_ai.db')
-    
-    # Ensure data directory exists for SQLite (Windows-friendly)
-    if database_url_env.startswith('sqlite:///'):
-        import pathlib
-        # Get absolute path using single source of truth function
-        db_path = get_absolute_sqlite_path(database_url_env)
-        # Ensure data directory exists
-        if not DATA_DIR.exists():
-            DATA_DIR.mkdir(parents=True, exist_ok=True)
-            logger.info(f"Created data directory: {DATA_DIR}")
-        # Always use absolute path in database_url
-        database_url = f'sqlite:///{db_path}'
-    else:
-        database_url = database_url_env
-    
-    # Azure SQL Database settings (optional, only required if using Azure SQL)
-    # Check if DATABASE_URL indicates Azure SQL or if Azure SQL vars are explicitly set
-    is_azure_sql = (
-        database_url.startswith('mssql+pyodbc://') or
-        database_url.startswith('mssql://') or
-        os.environ.get('AZURE_SQL_SERVER') is not None
-    )
-    
-    if is_azure_sql or not database_url.startswith('sqlite:///'):
-        # Azure SQL settings are required
-        azure_sql_server = os.environ.get('AZURE_SQL_SERVER')
-        if not azure_sql_server:
-            raise ValueError(
-                "AZURE_SQL_SERVER is required when using Azure SQL. "
-                "Set DATABASE_URL to sqlite:///./backend/data/charting_ai.db for SQLite, "
-                "or provide AZURE_SQL_SERVER for Azure SQL."
-            )
-        
-        azure_sql_database = os.environ.get('AZURE_SQL_DATABASE')
-        if not azure_sql_database:
-            raise ValueError(
-                "AZURE_SQL_DATABASE is required when using Azure SQL. "
-                "Please set it as an environment variable."
-            )
-        
-        azure_sql_username = os.environ.get('AZURE_SQL_USERNAME')
-        if not azure_sql_username:
-            raise ValueError(
-                "AZURE_SQL_USERNAME is required when using Azure SQL. "
-                "Please set it as an environment variable."
-            )
-        
-        azure_sql_password = os.environ.get('AZURE_SQL_PASSWORD')
-        if not azure_sql_password:
-            raise ValueError(
-                "AZURE_SQL_PASSWORD is required when using Azure SQL. "
-                "Please set it as an environment variable."
-            )
-    else:
-        # SQLite mode - Azure SQL settings not required
-        azure_sql_server = None
-        azure_sql_database = None
-        azure_sql_username = None
-        azure_sql_password = None
-    
+    # Database connection settings (shared with backend/db_backend.py)
+    database = get_database_settings()
+
     # Flask session security settings
     # SESSION_COOKIE_SECURE: True in production (HTTPS only), False in development
     session_cookie_secure = (flask_env == 'production')
@@ -208,25 +478,6 @@ def get_settings() -> Settings:
             f"PERMANENT_SESSION_DAYS must be a valid integer (>= 1). Got: {env_value}"
         ) from e
     
-    # Azure SQL optional settings with defaults
-    azure_sql_driver = os.environ.get('AZURE_SQL_DRIVER', '{ODBC Driver 17 for SQL Server}')
-    azure_sql_encrypt = os.environ.get('AZURE_SQL_ENCRYPT', 'yes')
-    azure_sql_trust_cert = os.environ.get('AZURE_SQL_TRUST_CERT', 'no')
-    azure_sql_timeout = os.environ.get('AZURE_SQL_TIMEOUT', '30')
-    
-    # Database authentication mode (for future managed identity/AAD support)
-    # Current default: "sql_password" (SQL username/password authentication)
-    # TODO: Future support for "managed_identity" and "aad" authentication modes
-    database_auth_mode = os.environ.get('DATABASE_AUTH_MODE', 'sql_password')
-    if database_auth_mode not in ('sql_password',):
-        # Placeholder for future modes: 'managed_identity', 'aad'
-        logger.warning(
-            f"DATABASE_AUTH_MODE '{database_auth_mode}' is not yet implemented. "
-            f"Falling back to 'sql_password'. "
-            f"Supported modes: 'sql_password'"
-        )
-        database_auth_mode = 'sql_password'
-    
     # Frontend serving: default false in dev, true in prod
     # In dev mode, frontend should run separately (npm run dev)
     # In prod mode, Flask serves the built frontend from dist/
@@ -249,17 +500,19 @@ def get_settings() -> Settings:
         permanent_session_lifetime_days=permanent_session_lifetime_days,
         gemini_api_key=gemini_api_key,
         gemini_enabled=gemini_enabled,
-        database_url=database_url,
-        azure_sql_server=azure_sql_server,
-        azure_sql_database=azure_sql_database,
-        azure_sql_username=azure_sql_username,
-        azure_sql_password=azure_sql_password,
-        azure_sql_driver=azure_sql_driver,
-        azure_sql_encrypt=azure_sql_encrypt,
-        azure_sql_trust_cert=azure_sql_trust_cert,
-        azure_sql_timeout=azure_sql_timeout,
-        database_auth_mode=database_auth_mode,
-        serve_frontend=serve_frontend
+        database_url=database.database_url,
+        azure_sql_server=database.azure_sql_server,
+        azure_sql_database=database.azure_sql_database,
+        azure_sql_username=database.azure_sql_username,
+        azure_sql_password=database.azure_sql_password,
+        azure_sql_driver=database.azure_sql_driver,
+        azure_sql_encrypt=database.azure_sql_encrypt,
+        azure_sql_trust_cert=database.azure_sql_trust_cert,
+        azure_sql_timeout=database.azure_sql_timeout,
+        database_auth_mode=database.database_auth_mode,
+        serve_frontend=serve_frontend,
+        cache=get_cache_settings(),
+        pool=database.pool
     )
 
 
@@ -352,7 +605,9 @@ def get_safe_log_summary(settings: Settings) -> str:
         f"session_secure={settings.session_cookie_secure}, "
         f"session_samesite={settings.session_cookie_samesite}, "
         f"session_lifetime_days={settings.permanent_session_lifetime_days}, "
-        f"gemini_enabled={settings.gemini_enabled}"
+        f"gemini_enabled={settings.gemini_enabled}, "
+        f"cache_backend={settings.cache.backend}, "
+        f"db_pool={settings.pool.size}+{settings.pool.max_overflow}"
         # Note: username, password, API keys, and secret keys are intentionally omitted
     )
 
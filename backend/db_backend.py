@@ -0,0 +1,127 @@
+"""
+Database backend selection: engine, connection pool and SQL dialect are chosen
+from the database settings (config.get_database_settings()), so the /chat
+pipeline runs unchanged against either database:
+- sqlserver: Azure SQL over mssql+pyodbc (TOP, bracket quoting, PERCENTILE_CONT)
+- sqlite:    a local SQLite file, e.g. a replica for read-heavy dashboards or
+             benchmarks (LIMIT, double-quote quoting, ROW_NUMBER percentiles)
+
+The dialect name is the db_type passed to the safe_sql builders.
+"""
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from backend.config import DatabaseSettings, PoolSettings, get_database_settings
+from backend.db_init import init_sqlite_schema
+from backend.schema_metadata import (
+    TARGET_TABLES,
+    ColumnRow,
+    load_information_schema_columns,
+    load_sqlite_columns,
+)
+
+
+def azure_sql_url(settings: DatabaseSettings) -> str:
+    """SQLAlchemy URL for Azure SQL with URL-encoded driver name and credentials."""
+    driver = urllib.parse.quote_plus(settings.azure_sql_driver)
+    username = urllib.parse.quote_plus(settings.azure_sql_username)
+    password = urllib.parse.quote_plus(settings.azure_sql_password)
+    return (
+        f"mssql+pyodbc://{username}:{password}@"
+        f"{settings.azure_sql_server}/{settings.azure_sql_database}?"
+        f"driver={driver}&"
+        f"Encrypt={settings.azure_sql_encrypt}&TrustServerCertificate={settings.azure_sql_trust_cert}&"
+        f"Connection+Timeout={settings.azure_sql_timeout}"
+    )
+
+
+@dataclass
+class DatabaseBackend:
+    """Connection URL and SQL dialect of the chart database."""
+    dialect: str
+    url: str
+    # INFORMATION_SCHEMA catalog (Azure SQL only)
+    catalog: Optional[str] = None
+    pool: PoolSettings = field(default_factory=PoolSettings)
+
+    @property
+    def name(self) -> str:
+        """Identifies the database in keys shared between workers."""
+        return self.catalog or self.url
+
+    def create_engine(self) -> Engine:
+        """
+        Create the SQLAlchemy engine with a QueuePool sized by the pool settings.
+        Azure SQL connections are expensive to open (TLS + login), so the pool
+        keeps them open, recycles them before the server drops them and, with
+        pre_ping, replaces connections that died while idle. SQLite connections are
+        local file handles; they are pooled the same way but shared across worker threads.
+        A new SQLite file gets the chart tables (empty) so schema discovery succeeds.
+        """
+        pool_args = {
+            'poolclass': QueuePool,
+            'pool_size': self.pool.size,
+            'max_overflow': self.pool.max_overflow,
+            'pool_timeout': self.pool.timeout,
+            'pool_pre_ping': self.pool.pre_ping,
+        }
+        if self.dialect == 'sqlite':
+            init_sqlite_schema(self.url[len('sqlite:///'):])
+            engine = create_engine(
+                self.url,
+                connect_args={'check_same_thread': False},
+                **pool_args,
+            )
+
+            @event.listens_for(engine, 'connect')
+            def _configure_sqlite(dbapi_connection, connection_record):
+                # WAL lets chart reads proceed while a replica refresh writes
+                dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+            return engine
+        return create_engine(
+            self.url,
+            pool_recycle=self.pool.recycle,
+            echo=False,  # Set to True for SQL query logging
+            **pool_args,
+        )
+
+    def load_columns(self, conn, tables: Sequence[str] = TARGET_TABLES) -> List[ColumnRow]:
+        """Column metadata for the given tables, with SQL Server type names on both backends."""
+        if self.dialect == 'sqlite':
+            return load_sqlite_columns(conn, tables)
+        return load_information_schema_columns(conn, self.catalog, tables)
+
+
+def get_database_backend(settings: Optional[DatabaseSettings] = None) -> DatabaseBackend:
+    """
+    Select the backend from the database settings.
+    Azure SQL is used when DATABASE_URL is an mssql URL or AZURE_SQL_SERVER is set;
+    SQLite only when DATABASE_URL explicitly names a SQLite file.
+
+    Raises:
+        ValueError: If Azure SQL is selected but its required variables are missing,
+            or if neither Azure SQL nor DATABASE_URL is configured.
+    """
+    settings = settings or get_database_settings()
+    if settings.database_url.startswith(('mssql+pyodbc://', 'mssql://')):
+        return DatabaseBackend('sqlserver', settings.database_url, settings.azure_sql_database, settings.pool)
+    if settings.is_azure_sql:
+        return DatabaseBackend('sqlserver', azure_sql_url(settings), settings.azure_sql_database, settings.pool)
+    if not settings.database_url_is_explicit:
+        # Never fall back silently to an empty local database
+        raise ValueError(
+            "Missing required Azure SQL environment variables. Please set:\n"
+            "  - AZURE_SQL_SERVER\n"
+            "  - AZURE_SQL_DATABASE\n"
+            "  - AZURE_SQL_USERNAME\n"
+            "  - AZURE_SQL_PASSWORD\n"
+            "or set DATABASE_URL=sqlite:///<path> to use a local SQLite file.\n"
+            "See .env.example for template."
+        )
+    return DatabaseBackend('sqlite', settings.database_url, pool=settings.pool)
@@ -0,0 +1,130 @@
+"""
+Connection pool health metrics and warm-up for the chart database engine.
+PoolMetrics listens to SQLAlchemy pool events and times every checkout, so
+/metrics shows whether queries wait for connections (and for how long), how
+slow new connections are to open (driver load, TLS, Azure SQL login), and how
+often connections are invalidated (dropped by the server, failed pre-ping).
+Together with the pool size and overflow this is what's needed to size the
+pool per gunicorn worker.
+"""
+import bisect
+import threading
+import time
+from typing import Any, Dict, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LatencyHistogram:
+    """Counts of observed durations per bucket (cumulative, Prometheus-style)."""
+
+    def __init__(self, bounds_ms: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.bounds_ms = tuple(bounds_ms)
+        self._counts = [0] * (len(self.bounds_ms) + 1)
+        self._sum_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self.bounds_ms, ms)] += 1
+            self._sum_ms += ms
+            self._max_ms = max(self._max_ms, ms)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts, total_ms, max_ms = list(self._counts), self._sum_ms, self._max_ms
+        buckets, running = {}, 0
+        for bound, count in zip(self.bounds_ms + ('+Inf',), counts):
+            running += count
+            buckets[str(bound)] = running
+        return {'count': running, 'sum_ms': round(total_ms, 1), 'max_ms': round(max_ms, 1), 'buckets_ms': buckets}
+
+
+class PoolMetrics:
+    """Event counters and latency histograms for one engine's connection pool."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.checkout_wait = LatencyHistogram()
+        self.connect_latency = LatencyHistogram()
+        self._lock = threading.Lock()
+        self._counts = {'checkouts': 0, 'connects': 0, 'invalidations': 0, 'timeouts': 0, 'errors': 0}
+
+        event.listen(engine, 'do_connect', self._on_do_connect)
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+        event.listen(engine, 'soft_invalidate', self._on_invalidate)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _on_do_connect(self, dialect, connection_record, cargs, cparams):
+        connection_record.info['connect_started'] = time.perf_counter()
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        started = connection_record.info.pop('connect_started', None)
+        if started is not None:
+            self.connect_latency.observe((time.perf_counter() - started) * 1000)
+        self._count('connects')
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self._count('checkouts')
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self._count('invalidations')
+
+    def connect(self):
+        """
+        engine.connect(), timing the wait for a pooled connection (including
+        opening a new one). Raises like engine.connect(); pool timeouts are counted.
+        """
+        started = time.perf_counter()
+        try:
+            return self.engine.connect()
+        except PoolTimeoutError:
+            self._count('timeouts')
+            raise
+        except Exception:
+            self._count('errors')
+            raise
+        finally:
+            self.checkout_wait.observe((time.perf_counter() - started) * 1000)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool occupancy, event counters and latency histograms for monitoring."""
+        pool = self.engine.pool
+        with self._lock:
+            stats = dict(self._counts)
+        for name in ('size', 'checkedout', 'checkedin', 'overflow'):
+            method = getattr(pool, name, None)
+            if callable(method):
+                stats[name] = method()
+        stats['checkout_wait'] = self.checkout_wait.snapshot()
+        stats['connect_latency'] = self.connect_latency.snapshot()
+        return stats
+
+
+def warm_pool(engine: Engine, connections: int) -> int:
+    """
+    Open up to `connections` pooled connections at once and return them to the
+    pool, so the first requests find logged-in connections.
+    Returns the number of connections opened; failures are logged, never raised.
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    except Exception as e:
+        print(f"Warning: Connection pool warm-up stopped after {len(opened)} connections: {type(e).__name__}: {e}")
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
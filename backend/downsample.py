@@ -0,0 +1,140 @@
+"""
+Server-side downsampling for line and area charts.
+Series longer than the point budget for the plot width are reduced before
+they reach Plotly, keeping the visual shape:
+- lttb:   Largest-Triangle-Three-Buckets (default; best shape for smooth series)
+- minmax: per-bucket minimum and maximum (keeps every spike; fully vectorized)
+"""
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.config import env_number
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+DOWNSAMPLE_METHOD = os.getenv('DOWNSAMPLE_METHOD', 'lttb').strip().lower()
+if DOWNSAMPLE_METHOD not in DOWNSAMPLE_METHODS:
+    print(f"Warning: DOWNSAMPLE_METHOD must be one of {DOWNSAMPLE_METHODS}; using lttb")
+    DOWNSAMPLE_METHOD = 'lttb'
+
+# Points kept per horizontal pixel of the plot
+DOWNSAMPLE_POINTS_PER_PIXEL = env_number('DOWNSAMPLE_POINTS_PER_PIXEL', 1.0) or 1.0
+# Line/area charts fetch up to this many rows (ordered by x) before downsampling
+DOWNSAMPLE_MAX_ROWS = int(env_number('DOWNSAMPLE_MAX_ROWS', 50000)) or 50000
+# Plot width assumed when the client does not send one
+DEFAULT_PLOT_WIDTH = 1000
+MIN_TARGET_POINTS = 100
+MAX_TARGET_POINTS = 10000
+
+
+def target_points(plot_width: Optional[int] = None) -> int:
+    """
+    Point budget for a plot width in pixels.
+    Rounded up to a multiple of 100 so nearby widths share cached responses.
+    """
+    width = plot_width if plot_width and plot_width > 0 else DEFAULT_PLOT_WIDTH
+    points = int(np.ceil(width * DOWNSAMPLE_POINTS_PER_PIXEL / 100.0)) * 100
+    return max(MIN_TARGET_POINTS, min(MAX_TARGET_POINTS, points))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    x must be sorted ascending. The first and last points are always kept;
+    each bucket in between contributes the point forming the largest triangle
+    with the previously kept point and the next bucket's average.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        kept[i + 1] = a
+    return kept
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of each bucket's minimum and maximum (plus first and last point).
+    Buckets are equal-width slices of the series, so no Python-level loop is needed.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    buckets = (n_out - 2) // 2
+    width = int(np.ceil(n / buckets))
+    padded = np.full(buckets * width, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, width)
+    offsets = np.arange(buckets) * width
+    lows = offsets + np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1)
+    highs = offsets + np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1)
+    kept = np.concatenate(([0, n - 1], lows, highs))
+    return np.unique(kept[kept < n])
+
+
+def _axis_values(values: pd.Series) -> Optional[np.ndarray]:
+    """x values as floats (datetimes as epoch nanoseconds), or None for categorical axes."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('int64').to_numpy(dtype=float)
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=float)
+    return None
+
+
+def _series_indices(x: pd.Series, y: np.ndarray, n_out: int, method: str) -> np.ndarray:
+    """Kept positions within one series, in the series' original order."""
+    x_values = _axis_values(x)
+    if x_values is None:
+        # Categorical x: points are evenly spaced in their given order
+        x_values = np.arange(len(y), dtype=float)
+        order = np.arange(len(y))
+    else:
+        order = np.argsort(x_values, kind='stable')
+    if method == 'minmax':
+        kept = minmax_indices(y[order], n_out)
+    else:
+        kept = lttb_indices(x_values[order], y[order], n_out)
+    return np.sort(order[kept])
+
+
+def downsample_frame(df: pd.DataFrame, x_col: str, y_col: str, max_points: int,
+                     color_col: Optional[str] = None, method: str = DOWNSAMPLE_METHOD) -> pd.DataFrame:
+    """
+    Reduce a line/area chart's rows to about max_points, preserving visual shape.
+
+    Each color group is downsampled separately with a share of the budget
+    proportional to its size. Kept rows stay in their original order. Frames
+    that already fit, or whose y column is not numeric, are returned unchanged.
+    """
+    if len(df) <= max_points or x_col not in df.columns or y_col not in df.columns:
+        return df
+    if not pd.api.types.is_numeric_dtype(df[y_col]) or pd.api.types.is_bool_dtype(df[y_col]):
+        return df
+
+    if color_col and color_col in df.columns:
+        groups = df.groupby(color_col, sort=False, dropna=False).indices.values()
+    else:
+        groups = [np.arange(len(df))]
+
+    y_values = df[y_col].to_numpy(dtype=float)
+    kept = []
+    for positions in groups:
+        share = max(3, int(round(max_points * len(positions) / len(df))))
+        kept.append(positions[_series_indices(df[x_col].iloc[positions], y_values[positions], share, method)])
+    return df.iloc[np.sort(np.concatenate(kept))]
@@ -0,0 +1,64 @@
+"""
+Bounded thread pools for blocking work in async request handlers.
+Gemini calls, database queries and Plotly rendering each get their own pool
+so a slow dependency cannot starve the others or block the event loop.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from backend.config import get_executor_settings
+
+# Pool sizes (LLM_POOL_SIZE, DB_POOL_SIZE, RENDER_POOL_SIZE; see config.ExecutorSettings)
+_settings = get_executor_settings()
+LLM_POOL_SIZE = _settings.llm_workers
+DB_POOL_SIZE = _settings.db_workers
+RENDER_POOL_SIZE = _settings.render_workers
+
+llm_executor = ThreadPoolExecutor(max_workers=LLM_POOL_SIZE, thread_name_prefix='llm')
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix='db')
+render_executor = ThreadPoolExecutor(max_workers=RENDER_POOL_SIZE, thread_name_prefix='render')
+
+
+async def run_in_executor(executor: ThreadPoolExecutor, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking callable on the given pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_llm(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking Gemini call on the LLM pool."""
+    return await run_in_executor(llm_executor, func, *args, **kwargs)
+
+
+async def run_db(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking database call on the DB pool."""
+    return await run_in_executor(db_executor, func, *args, **kwargs)
+
+
+async def run_render(func: Callable, *args, **kwargs) -> Any:
+    """Run CPU-bound chart building/serialization on the render pool."""
+    return await run_in_executor(render_executor, func, *args, **kwargs)
+
+
+def get_executor_stats() -> Dict[str, Dict[str, int]]:
+    """Return configured size and queued work items for each pool."""
+    return {
+        name: {
+            'max_workers': executor._max_workers,
+            'threads': len(executor._threads),
+            'queued': executor._work_queue.qsize(),
+        }
+        for name, executor in (
+            ('llm', llm_executor),
+            ('db', db_executor),
+            ('render', render_executor),
+        )
+    }
+
+
+def shutdown_executors(wait: bool = False) -> None:
+    """Shut down all pools (called on application shutdown)."""
+    for executor in (llm_executor, db_executor, render_executor):
+        executor.shutdown(wait=wait, cancel_futures=True)
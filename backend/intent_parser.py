@@ -0,0 +1,358 @@
+"""
+Rule-based intent parser for simple chart requests.
+Resolves "<measure> by <dimension>" questions such as "total revenue by region"
+against the live schema, so unambiguous requests get chart parameters without
+a Gemini round trip. Anything it cannot resolve with confidence returns None
+and goes to Gemini as before.
+"""
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from backend.config import env_number
+
+# Share of meaningful words that must be explained by the schema/vocabulary
+# (unexplained words that look like filter values always go to Gemini, see FILTER_WORDS)
+INTENT_MIN_CONFIDENCE = env_number('INTENT_MIN_CONFIDENCE', 0.75)
+
+# Chart types the fast path can fill in completely (category/date on X, one measure on Y)
+SUPPORTED_CHART_TYPES: Set[str] = {
+    'bar_chart', 'line_chart', 'area_chart', 'pie_chart', 'donut_chart'
+}
+
+# Synonyms not covered by the app's chart type mapping
+EXTRA_CHART_SYNONYMS: Dict[str, str] = {
+    'column': 'bar_chart',
+    'trend': 'line_chart',
+    'doughnut': 'donut_chart',
+}
+
+AGGREGATION_KEYWORDS: Dict[str, str] = {
+    'total': 'SUM', 'sum': 'SUM',
+    'average': 'AVG', 'avg': 'AVG', 'mean': 'AVG',
+    'count': 'COUNT', 'number': 'COUNT', 'many': 'COUNT',
+    'minimum': 'MIN', 'min': 'MIN', 'lowest': 'MIN', 'smallest': 'MIN',
+    'maximum': 'MAX', 'max': 'MAX', 'highest': 'MAX', 'largest': 'MAX',
+}
+
+AGGREGATION_LABELS: Dict[str, str] = {
+    'SUM': 'Total', 'AVG': 'Average', 'COUNT': 'Count of', 'MIN': 'Minimum', 'MAX': 'Maximum'
+}
+
+# Words that split the measure (before) from the dimension (after)
+SEPARATOR_WORDS: Set[str] = {'by', 'per', 'across', 'over', 'each'}
+
+# Dimension words that mean "the table's date column"
+TIME_WORDS: Set[str] = {
+    'time', 'date', 'day', 'daily', 'week', 'weekly', 'month', 'monthly',
+    'quarter', 'quarterly', 'year', 'yearly'
+}
+
+STOPWORDS: Set[str] = {
+    'a', 'an', 'the', 'of', 'for', 'in', 'on', 'to', 'and', 'all', 'every', 'my', 'our',
+    'show', 'me', 'give', 'get', 'display', 'draw', 'plot', 'visualize', 'visualise',
+    'chart', 'graph', 'diagram', 'what', 'is', 'are', 'how', 'i', 'want', 'see',
+    'can', 'you', 'please', 'with', 'as', 'breakdown', 'broken', 'down', 'split',
+    'grouped', 'group', 'distribution', 'compare', 'comparison',
+}
+
+
+# Words that introduce a filter ("revenue by region for EMEA"): unexplained words after
+# them are filter values the fast path can't apply
+FILTER_WORDS: Set[str] = {
+    'for', 'in', 'on', 'at', 'from', 'where', 'only', 'during', 'since', 'after', 'before',
+    'between', 'within', 'excluding', 'except', 'without', 'last', 'this', 'next', 'past',
+}
+
+
+def _singularize(word: str) -> str:
+    """Crude English singular form, applied identically to messages and column names."""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics and singularize."""
+    return [_singularize(w) for w in re.findall(r'[a-z0-9]+', (text or '').lower())]
+
+
+def split_identifier(name: str) -> List[str]:
+    """Split a CamelCase/snake_case identifier into words ("LeadSource" -> ["Lead", "Source"])."""
+    return re.findall(r'[A-Z]+(?=[A-Z][a-z]|[^A-Za-z]|$)|[A-Z]?[a-z]+|\d+', name or '')
+
+
+def _singular_set(words: Iterable[str]) -> Set[str]:
+    return {_singularize(w) for w in words}
+
+
+_STOPWORDS = _singular_set(STOPWORDS)
+_TIME_WORDS = _singular_set(TIME_WORDS)
+_SEPARATORS = _singular_set(SEPARATOR_WORDS)
+_FILTER_WORDS = _singular_set(FILTER_WORDS)
+_AGGREGATIONS = {_singularize(k): v for k, v in AGGREGATION_KEYWORDS.items()}
+
+
+def looks_like_filter_value(message: str, tokens: Sequence[str], index: int) -> bool:
+    """
+    True if tokens[index] (from tokenize(message)) reads as a filter value: it contains
+    a digit ("Q1", "2024"), is written in capitals ("EMEA", "Europe") or follows a filter word.
+    """
+    token = tokens[index]
+    if any(ch.isdigit() for ch in token):
+        return True
+    words = re.findall(r'[A-Za-z0-9]+', message or '')
+    # Sentence-initial capitals are not a signal
+    if len(words) == len(tokens) and index > 0 and words[index][:1].isupper():
+        return True
+    return any(t in _FILTER_WORDS for t in tokens[:index])
+
+
+def _pluralize(word: str) -> str:
+    if word.endswith('y') and word[-2:-1] not in 'aeiou':
+        return word[:-1] + 'ies'
+    return word + 's'
+
+
+def _label(column: str) -> str:
+    return ' '.join(split_identifier(column)) or column
+
+
+def column_aliases(column: str, table_word: str = '') -> List[Tuple[str, ...]]:
+    """Word sequences that refer to a column ("LeadSource" -> ("lead", "source"), ("source",))."""
+    words = tuple(tokenize(' '.join(split_identifier(column))))
+    if not words or words[-1] == 'id':
+        return []
+    aliases = [words]
+    if len(words) > 1 and words[0] == table_word:
+        aliases.append(words[1:])
+    return aliases
+
+
+def chart_type_phrases(chart_type_mapping: Optional[Dict[str, str]] = None) -> List[Tuple[Tuple[str, ...], str]]:
+    """Token sequences for each chart type synonym, longest first so "stacked bar" beats "bar"."""
+    synonyms = dict(chart_type_mapping or {})
+    synonyms.update(EXTRA_CHART_SYNONYMS)
+    return sorted(
+        {(tuple(tokenize(k.replace('_', ' '))), v) for k, v in synonyms.items() if tokenize(k)},
+        key=lambda item: -len(item[0])
+    )
+
+
+class IntentParser:
+    """
+    Deterministic chart-parameter extraction with hit/miss counters.
+
+    parse() returns chart_params in the same shape Gemini produces, or None
+    when the request is ambiguous, unsupported or not in English.
+    """
+
+    def __init__(self, chart_type_mapping: Optional[Dict[str, str]] = None,
+                 min_confidence: float = INTENT_MIN_CONFIDENCE):
+        self._min_confidence = min_confidence
+        self._chart_phrases = chart_type_phrases(chart_type_mapping)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def parse(self, message: str, table_schemas: Dict[str, Dict[str, List[str]]],
+              language: str = 'en', forced_chart_type: Optional[str] = None) -> Optional[Dict]:
+        """Return chart_params for a confidently understood request, else None."""
+        chart_params = None
+        if language == 'en' and table_schemas:
+            chart_params = self._resolve(message, table_schemas, forced_chart_type)
+        with self._lock:
+            if chart_params:
+                self._hits += 1
+            else:
+                self._misses += 1
+        return chart_params
+
+    def get_stats(self) -> Dict[str, float]:
+        """Hit/miss counters for the fast path."""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / total, 4) if total else 0.0,
+            }
+
+    def _resolve(self, message: str, table_schemas: Dict[str, Dict[str, List[str]]],
+                 forced_chart_type: Optional[str]) -> Optional[Dict]:
+        tokens = tokenize(message)
+        used: Set[int] = set()
+
+        chart_type = self._match_chart_type(tokens, used)
+        if forced_chart_type:
+            chart_type = forced_chart_type
+        if chart_type and chart_type not in SUPPORTED_CHART_TYPES:
+            return None
+
+        aggregations = set()
+        for i, token in enumerate(tokens):
+            if token in _AGGREGATIONS:
+                aggregations.add(_AGGREGATIONS[token])
+                used.add(i)
+        if len(aggregations) > 1:
+            return None
+        aggregate_y = aggregations.pop() if aggregations else None
+
+        separator = next((i for i, t in enumerate(tokens) if t in _SEPARATORS and i not in used), None)
+        if separator is None:
+            return None
+        used.add(separator)
+        measure_idx = [i for i in range(separator) if i not in used]
+        dimension_idx = [i for i in range(separator + 1, len(tokens)) if i not in used]
+
+        table_words = {table: tokenize(' '.join(split_identifier(table))) for table in table_schemas}
+        mentioned = [t for t, words in table_words.items() if words and set(words) <= set(tokens)]
+        candidates = mentioned or list(table_schemas)
+
+        resolutions = []
+        for table in candidates:
+            resolved = self._resolve_table(
+                table, table_schemas[table], table_words[table], tokens,
+                measure_idx, dimension_idx, aggregate_y
+            )
+            if resolved:
+                resolutions.append(resolved)
+        if not resolutions:
+            return None
+
+        best_score = max(r['score'] for r in resolutions)
+        best = [r for r in resolutions if r['score'] == best_score]
+        if len(best) != 1:
+            return None
+        resolved = best[0]
+
+        used |= resolved['used']
+        content = [i for i, t in enumerate(tokens) if t not in _STOPWORDS]
+        if not content:
+            return None
+        confidence = sum(1 for i in content if i in used) / len(content)
+        if confidence < self._min_confidence:
+            return None
+        if any(looks_like_filter_value(message, tokens, i) for i in content if i not in used):
+            # "revenue by region for EMEA": a filter would be silently dropped
+            return None
+
+        table, x_axis, y_axis = resolved['table'], resolved['x_axis'], resolved['y_axis']
+        aggregate_y = resolved['aggregate_y']
+        if not chart_type:
+            chart_type = 'line_chart' if x_axis in table_schemas[table].get('date_columns', []) else 'bar_chart'
+
+        if resolved['count_rows']:
+            measure_label = _pluralize(table)
+            title = f"Number of {measure_label} by {_label(x_axis)}"
+        else:
+            measure_label = _label(y_axis)
+            title = f"{AGGREGATION_LABELS[aggregate_y]} {measure_label} by {_label(x_axis)}"
+
+        return {
+            'table_name': table,
+            'chart_type': chart_type,
+            'x_axis': x_axis,
+            'y_axis': y_axis,
+            'title': title,
+            'summary': f"This chart shows {title[0].lower() + title[1:]} from the {table} table.",
+            'aggregate_y': aggregate_y,
+            'color': None,
+            'z_axis': None,
+            'size': None,
+            'chart_reasoning': None,
+            'chart_warnings': None,
+        }
+
+    def _match_chart_type(self, tokens: Sequence[str], used: Set[int]) -> Optional[str]:
+        """Find the first chart type synonym in the message and mark its tokens used."""
+        found = None
+        for phrase, chart_type in self._chart_phrases:
+            n = len(phrase)
+            for start in range(len(tokens) - n + 1):
+                span = set(range(start, start + n))
+                if tuple(tokens[start:start + n]) == phrase and not span & used:
+                    if found and found != chart_type:
+                        # Two different chart types named: leave it to Gemini
+                        return 'ambiguous'
+                    found = chart_type
+                    used |= span
+        return found
+
+    def _best_column(self, columns: Sequence[str], table_word: str, tokens: Sequence[str],
+                     positions: Sequence[int]) -> Optional[Tuple[str, Set[int]]]:
+        """Return the uniquely best matching column and the token positions it explains."""
+        scored = []
+        for column in columns:
+            best = None
+            for alias in column_aliases(column, table_word):
+                matched = set()
+                for word in alias:
+                    idx = next((i for i in positions if tokens[i] == word and i not in matched), None)
+                    if idx is None:
+                        break
+                    matched.add(idx)
+                else:
+                    if best is None or len(matched) > len(best):
+                        best = matched
+            if best:
+                scored.append((len(best), column, best))
+        if not scored:
+            return None
+        top = max(s[0] for s in scored)
+        winners = [s for s in scored if s[0] == top]
+        if len(winners) != 1:
+            return None
+        return winners[0][1], winners[0][2]
+
+    def _resolve_table(self, table: str, schema: Dict[str, List[str]], table_words: List[str],
+                       tokens: Sequence[str], measure_idx: List[int], dimension_idx: List[int],
+                       aggregate_y: Optional[str]) -> Optional[Dict]:
+        """Resolve x/y columns within one table, or None if the table doesn't fit."""
+        table_word = table_words[0] if len(table_words) == 1 else ''
+        table_positions = {i for i, t in enumerate(tokens) if t in table_words}
+        score = 1 if table_positions else 0
+
+        dimension_columns = schema.get('categorical_columns', []) + schema.get('date_columns', [])
+        dimension = self._best_column(dimension_columns, table_word, tokens, dimension_idx)
+        if dimension:
+            x_axis, used = dimension
+        else:
+            # "over time" / "by month" -> the table's only date column
+            date_columns = schema.get('date_columns', [])
+            time_positions = {i for i in dimension_idx if tokens[i] in _TIME_WORDS}
+            if len(date_columns) != 1 or not time_positions:
+                return None
+            x_axis, used = date_columns[0], time_positions
+        score += len(used)
+
+        numeric_columns = [c for c in schema.get('numerical_columns', []) if c not in dimension_columns]
+        measure = self._best_column(numeric_columns, table_word, tokens, measure_idx)
+        count_rows = False
+        if measure:
+            y_axis, measure_used = measure
+            used = used | measure_used
+            score += len(measure_used)
+            aggregate_y = aggregate_y or 'SUM'
+        else:
+            # "number of leads by status": count rows of the mentioned table
+            if aggregate_y not in (None, 'COUNT') or not (table_positions & set(measure_idx)):
+                return None
+            id_columns = [c for c in schema.get('all_columns', []) if c.lower() == f'{table.lower()}id']
+            y_axis = (id_columns or schema.get('numerical_columns') or [None])[0]
+            if not y_axis:
+                return None
+            aggregate_y = 'COUNT'
+            count_rows = True
+
+        return {
+            'table': table,
+            'x_axis': x_axis,
+            'y_axis': y_axis,
+            'aggregate_y': aggregate_y,
+            'count_rows': count_rows,
+            'used': used | table_positions,
+            'score': score,
+        }
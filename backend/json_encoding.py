@@ -0,0 +1,39 @@
+"""
+Single-pass JSON encoding for chat responses.
+Plotly figures are serialized once (plotly.io.to_json) and carried through the
+pipeline as pre-encoded text, so responses are written straight to bytes
+instead of being dumped, parsed back and dumped again.
+"""
+import json
+from typing import Any
+
+from plotly.utils import PlotlyJSONEncoder
+
+
+class RawJSON(str):
+    """Already-encoded JSON text, spliced into the output verbatim."""
+    __slots__ = ()
+
+
+def encode_json_text(payload: Any) -> str:
+    """
+    Encode a payload as JSON text.
+
+    RawJSON payloads are returned as-is; RawJSON values at the top level of a
+    dict are spliced in without re-encoding. Everything else goes through
+    PlotlyJSONEncoder (numpy arrays, pandas timestamps, ...).
+    """
+    if isinstance(payload, RawJSON):
+        return str(payload)
+    if isinstance(payload, dict) and any(isinstance(v, RawJSON) for v in payload.values()):
+        parts = []
+        for key, value in payload.items():
+            encoded = str(value) if isinstance(value, RawJSON) else json.dumps(value, cls=PlotlyJSONEncoder)
+            parts.append(f"{json.dumps(str(key))}: {encoded}")
+        return '{' + ', '.join(parts) + '}'
+    return json.dumps(payload, cls=PlotlyJSONEncoder)
+
+
+def encode_json(payload: Any) -> bytes:
+    """Encode a payload as UTF-8 JSON bytes (see encode_json_text)."""
+    return encode_json_text(payload).encode('utf-8')
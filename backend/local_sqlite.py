@@ -0,0 +1,29 @@
+"""
+Thread-local connections to a local SQLite file shared by every worker on the host
+(response cache, rollups, replica). WAL mode lets readers proceed while one
+worker writes; statements autocommit unless a transaction is opened explicitly.
+"""
+import os
+import sqlite3
+import threading
+
+
+class LocalSQLite:
+    """One WAL-mode connection per thread to the SQLite file at path."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def connect(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
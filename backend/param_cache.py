@@ -0,0 +1,184 @@
+"""
+Chart parameter cache keyed on a canonicalized form of the request.
+Paraphrases such as "show revenue by region", "revenue per region" and
+"Revenue by Region please" map to the same previously validated chart_params,
+so Gemini is only asked once while the SQL still runs fresh for every request.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from backend.intent_parser import (
+    AGGREGATION_KEYWORDS,
+    SEPARATOR_WORDS,
+    STOPWORDS,
+    chart_type_phrases,
+    column_aliases,
+    split_identifier,
+    tokenize,
+)
+
+
+# Minimum Jaccard similarity between token sets for a non-exact hit
+PARAM_CACHE_MIN_SIMILARITY = 0.75
+
+# Words that change the meaning of a query and so must match exactly
+MODIFIER_WORDS = {'top', 'bottom', 'not', 'no', 'without', 'excluding', 'except', 'only'}
+
+_STOPWORDS = {t for w in STOPWORDS for t in tokenize(w)}
+_SEPARATORS = {t for w in SEPARATOR_WORDS for t in tokenize(w)}
+_AGGREGATIONS = {tokenize(k)[0]: v for k, v in AGGREGATION_KEYWORDS.items()}
+_MODIFIERS = {t for w in MODIFIER_WORDS for t in tokenize(w)}
+
+# (signature, tokens): signature holds the meaning-bearing tokens in order
+CanonicalRequest = Tuple[Tuple[str, ...], FrozenSet[str]]
+
+
+def _column_phrases(table_schemas: Dict[str, Dict[str, List[str]]]) -> List[Tuple[Tuple[str, ...], str]]:
+    """(alias words, canonical token) for every column and table, longest alias first."""
+    targets: Dict[Tuple[str, ...], set] = {}
+    for table, schema in table_schemas.items():
+        table_tokens = tokenize(' '.join(split_identifier(table)))
+        table_word = table_tokens[0] if len(table_tokens) == 1 else ''
+        for column in schema.get('all_columns', []):
+            for alias in column_aliases(column, table_word):
+                targets.setdefault(alias, set()).add(f'col:{column.lower()}')
+        if table_tokens:
+            targets.setdefault(tuple(table_tokens), set()).add(f'table:{table.lower()}')
+    phrases = [(alias, '|'.join(sorted(names))) for alias, names in targets.items()]
+    return sorted(phrases, key=lambda item: -len(item[0]))
+
+
+def canonicalize(message: str, table_schemas: Dict[str, Dict[str, List[str]]],
+                 chart_phrases: List[Tuple[Tuple[str, ...], str]]) -> CanonicalRequest:
+    """
+    Reduce a request to its meaning-bearing tokens.
+
+    Chart type synonyms, column/table names and aggregation keywords are
+    resolved to canonical tokens, "per"/"across"/... become "by", and
+    stopwords are dropped. Tokens are stemmed by the intent parser's tokenizer.
+    """
+    tokens: List[Optional[str]] = list(tokenize(message))
+
+    def replace_phrases(phrases):
+        for phrase, canonical in phrases:
+            n = len(phrase)
+            for start in range(len(tokens) - n + 1):
+                if tuple(tokens[start:start + n]) == phrase:
+                    tokens[start] = canonical
+                    for i in range(start + 1, start + n):
+                        tokens[i] = None
+
+    replace_phrases([(phrase, f'chart:{chart_type}') for phrase, chart_type in chart_phrases])
+    replace_phrases(_column_phrases(table_schemas))
+
+    canonical: List[str] = []
+    for token in tokens:
+        if token is None or token in _STOPWORDS:
+            continue
+        if token in _AGGREGATIONS:
+            token = f'agg:{_AGGREGATIONS[token].lower()}'
+        elif token in _SEPARATORS:
+            token = 'by'
+        canonical.append(token)
+
+    signature = []
+    for token in canonical:
+        if ':' in token or token == 'by' or token.isdigit() or token in _MODIFIERS:
+            if not signature or signature[-1] != token:
+                signature.append(token)
+    return tuple(signature), frozenset(canonical)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two token sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ParamCache:
+    """
+    Thread-safe LRU + TTL cache of validated chart_params.
+
+    Entries only match when language, forced chart type, schema version and
+    the ordered signature (columns, tables, aggregation, chart type, numbers,
+    modifiers) are identical; remaining wording may differ up to the
+    similarity threshold.
+    """
+
+    def __init__(self, chart_type_mapping: Optional[Dict[str, str]] = None, ttl: float = 3600,
+                 max_entries: int = 500, min_similarity: float = PARAM_CACHE_MIN_SIMILARITY):
+        self._chart_phrases = chart_type_phrases(chart_type_mapping)
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._min_similarity = min_similarity
+        # {(language, forced_chart_type, schema_version, signature): OrderedDict{tokens: (params, expires_at)}}
+        self._buckets: Dict[Tuple, "OrderedDict[FrozenSet[str], Tuple[Dict, float]]"] = {}
+        self._lru: "OrderedDict[Tuple, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'similar_hits': 0, 'misses': 0}
+
+    def _bucket_key(self, message, table_schemas, language, forced_chart_type, schema_version):
+        signature, tokens = canonicalize(message, table_schemas, self._chart_phrases)
+        return (language or '', forced_chart_type or '', schema_version or '', signature), tokens
+
+    def get(self, message: str, table_schemas: Dict[str, Dict[str, List[str]]], language: str,
+            forced_chart_type: Optional[str], schema_version: str) -> Optional[Dict]:
+        """Return a copy of cached chart_params for this request or a close paraphrase."""
+        bucket_key, tokens = self._bucket_key(message, table_schemas, language, forced_chart_type, schema_version)
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(bucket_key, {})
+            best, best_score = None, 0.0
+            for cached_tokens, (params, expires_at) in list(bucket.items()):
+                if expires_at < now:
+                    self._remove(bucket_key, cached_tokens)
+                    continue
+                score = jaccard(tokens, cached_tokens)
+                if score > best_score:
+                    best, best_score = cached_tokens, score
+
+            if best is None or best_score < self._min_similarity:
+                self._stats['misses'] += 1
+                return None
+
+            self._stats['hits'] += 1
+            if best != tokens:
+                self._stats['similar_hits'] += 1
+            self._lru.move_to_end((bucket_key, best))
+            return copy.deepcopy(self._buckets[bucket_key][best][0])
+
+    def put(self, message: str, table_schemas: Dict[str, Dict[str, List[str]]], language: str,
+            forced_chart_type: Optional[str], schema_version: str, chart_params: Dict) -> None:
+        """Store validated chart_params for this request."""
+        bucket_key, tokens = self._bucket_key(message, table_schemas, language, forced_chart_type, schema_version)
+        with self._lock:
+            self._buckets.setdefault(bucket_key, OrderedDict())[tokens] = (
+                copy.deepcopy(chart_params), time.time() + self._ttl
+            )
+            self._lru[(bucket_key, tokens)] = None
+            self._lru.move_to_end((bucket_key, tokens))
+            while len(self._lru) > self._max_entries:
+                old_bucket, old_tokens = next(iter(self._lru))
+                self._remove(old_bucket, old_tokens)
+
+    def _remove(self, bucket_key, tokens) -> None:
+        bucket = self._buckets.get(bucket_key)
+        if bucket is not None:
+            bucket.pop(tokens, None)
+            if not bucket:
+                del self._buckets[bucket_key]
+        self._lru.pop((bucket_key, tokens), None)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            total = self._stats['hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'entries': len(self._lru),
+                'hit_rate': round(self._stats['hits'] / total, 4) if total else 0.0,
+            }
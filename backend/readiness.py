@@ -0,0 +1,62 @@
+"""
+Worker readiness for rolling deploys.
+A new worker warms up in the background at startup (connection pool, schema
+cache, Gemini client, chart renderer) and only reports ready on /ready once the
+required steps have succeeded, so a load balancer keeps traffic on warm workers
+until then. Required steps are retried until they succeed; optional steps are
+attempted once and never hold back readiness.
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# (name, step, required): step is an async callable returning a short detail string
+WarmUpStep = Tuple[str, Callable[[], Awaitable[Any]], bool]
+
+
+class Readiness:
+    """Outcome of each warm-up step and whether the worker is ready for traffic."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self._steps: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    async def run_step(self, name: str, step: Callable[[], Awaitable[Any]]) -> bool:
+        """Run one step and record its duration and result (or error). Never raises."""
+        started = time.perf_counter()
+        record = self._steps.setdefault(name, {'attempts': 0})
+        record['attempts'] += 1
+        try:
+            detail = await step()
+        except Exception as e:
+            record.update(ok=False, seconds=round(time.perf_counter() - started, 3), error=f"{type(e).__name__}: {e}")
+            print(f"Warm-up: {name} failed: {type(e).__name__}: {e}")
+            return False
+        record.update(ok=True, seconds=round(time.perf_counter() - started, 3), detail=detail)
+        record.pop('error', None)
+        return True
+
+    async def warm_up(self, steps: List[WarmUpStep], retry_seconds: float = 5.0, max_retry_seconds: float = 60.0) -> None:
+        """
+        Run the steps in order, retrying failed required steps with exponential
+        backoff (up to max_retry_seconds between attempts), then mark the worker ready.
+        """
+        for name, step, required in steps:
+            delay = retry_seconds
+            while not await self.run_step(name, step) and required:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_retry_seconds)
+        self.ready_at = time.time()
+        print(f"Worker ready after {self.ready_at - self.started_at:.2f}s")
+
+    def get_status(self) -> Dict[str, Any]:
+        """Readiness and per-step results for /ready."""
+        status = {'ready': self.ready, 'steps': {name: dict(record) for name, record in self._steps.items()}}
+        if self.ready_at is not None:
+            status['startup_seconds'] = round(self.ready_at - self.started_at, 3)
+        return status
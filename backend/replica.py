@@ -0,0 +1,251 @@
+"""
+Local read replica of the Azure SQL target tables.
+Account, Contact, Lead and Opportunity are copied into a SQLite file with the
+schema from db_init.init_sqlite_schema, so chart queries for tables whose last
+sync is within their staleness budget run locally (sqlite dialect) instead of
+over the network.
+
+Syncs are incremental: rows whose '<Table>ID' key is above the stored watermark
+are fetched in batches and appended. Deleted rows trigger a full re-copy;
+updated rows are picked up by the periodic full re-copy, so the replica may lag
+Azure SQL by up to full_sync_seconds for updates (and sync_seconds for inserts).
+Every worker on the host shares the file; a sync holds the SQLite write lock,
+so only one worker copies a table at a time and readers (WAL) never wait.
+"""
+import datetime
+import decimal
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+
+from backend.config import ReplicaSettings
+from backend.db_init import init_sqlite_schema
+from backend.local_sqlite import LocalSQLite
+from backend.safe_sql import quote_ident
+
+
+def build_probe_sql(table: str, key: Optional[str], db_type: str = 'sqlite') -> str:
+    """Row count and highest key of the source table, plus the number of rows at or below :low."""
+    quoted_table = quote_ident(table, db_type)
+    if not key:
+        return f"SELECT COUNT(*) AS row_count, NULL AS max_key, COUNT(*) AS old_rows FROM {quoted_table}"
+    quoted_key = quote_ident(key, db_type)
+    return (
+        f"SELECT COUNT(*) AS row_count, MAX({quoted_key}) AS max_key, "
+        f"SUM(CASE WHEN {quoted_key} <= :low THEN 1 ELSE 0 END) AS old_rows FROM {quoted_table}"
+    )
+
+
+def build_copy_sql(table: str, columns: Sequence[str], key: Optional[str], db_type: str = 'sqlite', incremental: bool = False) -> str:
+    """
+    Rows to copy from the source table. With a key column, rows are restricted to
+    keys <= :high (the probed watermark), and incremental copies further to keys > :low.
+    """
+    column_list = ", ".join(quote_ident(column, db_type) for column in columns)
+    sql = f"SELECT {column_list} FROM {quote_ident(table, db_type)}"
+    if key:
+        quoted_key = quote_ident(key, db_type)
+        sql += f" WHERE {quoted_key} <= :high"
+        if incremental:
+            sql += f" AND {quoted_key} > :low"
+        sql += f" ORDER BY {quoted_key}"
+    return sql
+
+
+def _sqlite_value(value: Any) -> Any:
+    """Convert driver values SQLite can't store (Decimal, datetime) to their SQLite equivalents."""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+class SnapshotReplica:
+    """
+    Snapshot of the target tables in a local SQLite file.
+    Each worker opens its own connections (one per thread).
+    """
+
+    def __init__(self, settings: ReplicaSettings):
+        self.settings = settings
+        self.path = settings.sqlite_path
+        self._sqlite = LocalSQLite(self.path)
+        self._stats_lock = threading.Lock()
+        self._stats = {'reads': 0, 'fallbacks': 0, 'syncs': 0, 'full_syncs': 0, 'rows_copied': 0, 'errors': 0}
+
+        if not init_sqlite_schema(self.path):
+            raise RuntimeError(f"Cannot initialize replica schema at {self.path}")
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS replica_state (
+                table_name TEXT PRIMARY KEY,
+                columns TEXT NOT NULL,
+                watermark REAL,
+                row_count INTEGER NOT NULL,
+                synced_at REAL NOT NULL,
+                full_synced_at REAL NOT NULL
+            )
+        """)
+
+    @property
+    def url(self) -> str:
+        """SQLAlchemy URL for reading the replica."""
+        return f"sqlite:///{self.path}"
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._sqlite.connect()
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _load_state(self, table: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT columns, watermark, row_count, synced_at, full_synced_at FROM replica_state WHERE table_name = ?",
+            (table,)
+        ).fetchone()
+        if row is None:
+            return None
+        state = dict(zip(('columns', 'watermark', 'row_count', 'synced_at', 'full_synced_at'), row))
+        state['columns'] = json.loads(state['columns'])
+        return state
+
+    def _replica_columns(self, table: str) -> List[str]:
+        return [row[1] for row in self._connect().execute(f"PRAGMA table_info({quote_ident(table, 'sqlite')})")]
+
+    def sync(self, source_conn, column_types: Dict[str, Dict[str, str]], db_type: str = 'sqlserver') -> None:
+        """
+        Bring every table in column_types ({table: {column: data_type}}, from the
+        source schema) up to date from source_conn (a SQLAlchemy connection).
+        Errors are logged per table and never raised.
+        """
+        for table, source_types in column_types.items():
+            try:
+                self._sync_table(source_conn, table, source_types, db_type)
+            except Exception as e:
+                print(f"Warning: Replica sync failed for table {table}: {type(e).__name__}: {e}")
+                self._count('errors')
+
+    def _sync_table(self, source_conn, table: str, source_types: Dict[str, str], db_type: str) -> None:
+        # Columns present in both the source and the replica schema
+        columns = [column for column in self._replica_columns(table) if column in source_types]
+        if not columns:
+            return
+        key = f"{table}ID" if f"{table}ID" in columns else None
+
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            return  # Another worker is syncing the replica
+        try:
+            now = time.time()
+            state = self._load_state(table)
+            if state and now - state['synced_at'] < self.settings.sync_seconds / 2:
+                conn.execute("ROLLBACK")
+                return  # Another worker synced it moments ago
+
+            low = state['watermark'] if state and state['watermark'] is not None else 0
+            probe = source_conn.execute(text(build_probe_sql(table, key, db_type)), {'low': low}).mappings().one()
+            row_count = int(probe['row_count'])
+            max_key = None if probe['max_key'] is None else float(probe['max_key'])
+
+            incremental = bool(
+                state and key
+                and state['columns'] == columns
+                and state['watermark'] is not None
+                and now - state['full_synced_at'] < self.settings.full_sync_seconds
+                # Rows at or below the watermark unchanged in number: nothing was deleted
+                and int(probe['old_rows'] or 0) == state['row_count']
+            )
+            if incremental:
+                copied = 0
+                if max_key is not None and max_key > state['watermark']:
+                    copied = self._copy_rows(
+                        source_conn, table, columns, key, db_type, {'low': state['watermark'], 'high': max_key}, incremental=True
+                    )
+                conn.execute(
+                    "UPDATE replica_state SET watermark = ?, row_count = row_count + ?, synced_at = ? WHERE table_name = ?",
+                    (max(max_key or 0, state['watermark']), copied, now, table)
+                )
+            else:
+                conn.execute(f"DELETE FROM {quote_ident(table, 'sqlite')}")
+                # A full copy takes rows up to the key probed above; later rows arrive incrementally
+                copied = self._copy_rows(source_conn, table, columns, key, db_type, {'high': max_key} if key else {})
+                conn.execute(
+                    "INSERT OR REPLACE INTO replica_state "
+                    "(table_name, columns, watermark, row_count, synced_at, full_synced_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (table, json.dumps(columns), max_key if key else None, copied, now, now)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self._count('rows_copied', copied)
+        if incremental:
+            self._count('syncs')
+        else:
+            self._count('full_syncs')
+            print(f"Replica: copied {table} ({copied} rows)")
+
+    def _copy_rows(self, source_conn, table, columns, key, db_type, params, incremental=False) -> int:
+        """Stream rows from the source in batches of batch_rows into the open replica transaction."""
+        result = source_conn.execute(text(build_copy_sql(table, columns, key, db_type, incremental)), params)
+        placeholders = ", ".join('?' for _ in columns)
+        insert_sql = (
+            f"INSERT OR REPLACE INTO {quote_ident(table, 'sqlite')} "
+            f"({', '.join(quote_ident(column, 'sqlite') for column in columns)}) VALUES ({placeholders})"
+        )
+        conn = self._connect()
+        copied = 0
+        while True:
+            rows = result.fetchmany(self.settings.batch_rows)
+            if not rows:
+                break
+            conn.executemany(insert_sql, [tuple(_sqlite_value(value) for value in row) for row in rows])
+            copied += len(rows)
+        return copied
+
+    def is_fresh(self, table: str, columns: Sequence[str] = ()) -> bool:
+        """
+        True if the table was synced within its staleness budget and the replica
+        holds every given column; otherwise charts must read the source database.
+        """
+        try:
+            state = self._load_state(table)
+        except sqlite3.Error as e:
+            print(f"Warning: Replica read failed ({table}): {e}")
+            state = None
+        fresh = bool(
+            state
+            and time.time() - state['synced_at'] <= self.settings.staleness_budget(table)
+            and set(columns) <= set(state['columns'])
+        )
+        self._count('reads' if fresh else 'fallbacks')
+        return fresh
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters and per-table sync state for monitoring."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        try:
+            rows = self._connect().execute("SELECT table_name, row_count, synced_at FROM replica_state").fetchall()
+        except sqlite3.Error:
+            rows = []
+        now = time.time()
+        stats['tables'] = {
+            table: {
+                'rows': count,
+                'age_seconds': round(now - synced_at, 1),
+                'staleness_budget_seconds': self.settings.staleness_budget(table),
+            }
+            for table, count, synced_at in rows
+        }
+        return stats
@@ -0,0 +1,120 @@
+"""
+Bounded in-memory response cache.
+O(1) get/put with true LRU eviction, per-entry TTL and a memory budget in bytes
+(entries hold full Plotly figures plus raw_data, so an entry count alone says
+little about memory use).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU + TTL cache with entry and byte limits.
+
+    The lock is never held across an await, so the cache is safe to use from
+    async handlers and worker threads alike. Values are returned as stored
+    (not copied).
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_bytes: int,
+                 sizer: Optional[Callable[[Any], int]] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizer = sizer or (lambda value: len(repr(value)))
+        # {key: (value, expires_at, size_bytes)}, least recently used first
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'rejected': 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value and mark it recently used; expired entries are dropped."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            value, expires_at, _ = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None) -> bool:
+        """
+        Store a value, evicting least recently used entries to stay within limits.
+
+        Args:
+            size: Size in bytes if already known (e.g. length of the encoded response)
+
+        Returns:
+            False if the value alone exceeds the byte budget and was not cached
+        """
+        if size is None:
+            size = self._sizer(value)
+        with self._lock:
+            if size > self.max_bytes:
+                self._stats['rejected'] += 1
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.time() + self.ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+            return True
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def discard(self, key: Hashable) -> None:
+        """
+        Drop an entry that get() just returned but the caller found stale (e.g.
+        computed from an older table version); that lookup counts as a miss.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._stats['hits'] -= 1
+            self._stats['misses'] += 1
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters, current size and configured limits."""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return {
+                'backend': 'memory',
+                **self._stats,
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+            }
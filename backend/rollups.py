@@ -0,0 +1,377 @@
+"""
+Pre-aggregated rollups for categorical × numeric column pairs.
+For every rolled-up table, each low-cardinality categorical column (the
+dimension; at most max_groups distinct values, counted in SQL first) is grouped
+once and per-group COUNT(*), and COUNT/SUM/MIN/MAX of every numeric column (the
+measures), are stored in a local SQLite file. Aggregated chart requests over a
+dimension/measure pair (SUM, COUNT, AVG as sum/count, MIN, MAX) are then
+answered from the rollup instead of scanning the base table.
+
+Refreshes are incremental: rows whose key column (e.g. AccountID) is above the
+stored watermark are aggregated and merged into the existing groups. Deleted
+rows trigger a full rebuild; updated rows are picked up by the periodic full
+rebuild, so rollups may lag the base table by up to full_refresh_seconds for
+updates (and refresh_seconds for inserts).
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+
+from backend.config import RollupSettings
+from backend.local_sqlite import LocalSQLite
+from backend.safe_sql import (
+    MAX_GROUPS,
+    MAX_ROWS,
+    ChartRequest,
+    _as_float,
+    get_aggregated_y_axis_name,
+    is_pii_column,
+    orders_by_x,
+    quote_ident,
+)
+
+# measure name for the per-group row count (COUNT(*))
+ROW_COUNT_MEASURE = '*'
+
+
+@dataclass(frozen=True)
+class RollupSpec:
+    """Dimensions and measures rolled up for one table."""
+    table: str
+    dimensions: Tuple[str, ...]
+    measures: Tuple[str, ...]
+    # Monotonically increasing column used as the refresh watermark (None: always rebuild)
+    key: Optional[str] = None
+
+    @property
+    def signature(self) -> str:
+        """Changes whenever the rolled-up columns change, forcing a rebuild."""
+        return hashlib.sha256(json.dumps([self.dimensions, self.measures, self.key]).encode()).hexdigest()[:16]
+
+
+def rollup_specs_from_schema(schema_map: Dict[str, Dict], tables: Optional[Sequence[str]] = None) -> List[RollupSpec]:
+    """
+    Derive rollup specs from the schema: every non-PII categorical column is a
+    dimension and every numeric column except ID columns is a measure.
+    The table's own '<Table>ID' column, if numeric, is the watermark key.
+    """
+    specs = []
+    for table, info in schema_map.items():
+        if tables is not None and table not in tables:
+            continue
+        numerical = info.get('numerical_columns', [])
+        dimensions = tuple(c for c in info.get('categorical_columns', []) if not is_pii_column(c))
+        measures = tuple(c for c in numerical if not c.endswith('ID') and not is_pii_column(c))
+        if not dimensions:
+            continue
+        key = f"{table}ID" if f"{table}ID" in numerical else None
+        specs.append(RollupSpec(table, dimensions, measures, key))
+    return specs
+
+
+def build_rollup_sql(spec: RollupSpec, dimension: str, db_type: str = 'sqlite', incremental: bool = False) -> str:
+    """
+    Per-group aggregates of every measure for one dimension of the base table.
+    With a key column, rows are restricted to keys <= :high (the probed watermark),
+    and incremental queries further to keys > :low.
+    Result columns: dim_value, row_count, then count_i, sum_i, min_i, max_i per measure.
+    """
+    dim = quote_ident(dimension, db_type)
+    parts = [f"{dim} AS dim_value", "COUNT(*) AS row_count"]
+    for i, measure in enumerate(spec.measures):
+        value = _as_float(quote_ident(measure, db_type), db_type)
+        parts += [
+            f"COUNT({value}) AS count_{i}", f"SUM({value}) AS sum_{i}",
+            f"MIN({value}) AS min_{i}", f"MAX({value}) AS max_{i}",
+        ]
+    where = f"{dim} IS NOT NULL"
+    if spec.key:
+        key = quote_ident(spec.key, db_type)
+        where += f" AND {key} <= :high"
+        if incremental:
+            where += f" AND {key} > :low"
+    return f"SELECT {', '.join(parts)} FROM {quote_ident(spec.table, db_type)} WHERE {where} GROUP BY {dim}"
+
+
+def build_cardinality_sql(spec: RollupSpec, db_type: str = 'sqlite') -> str:
+    """Distinct non-NULL values of every dimension (distinct_i), in one scan of the base table."""
+    parts = [
+        f"COUNT(DISTINCT {quote_ident(dimension, db_type)}) AS distinct_{i}"
+        for i, dimension in enumerate(spec.dimensions)
+    ]
+    return f"SELECT {', '.join(parts)} FROM {quote_ident(spec.table, db_type)}"
+
+
+def build_watermark_sql(spec: RollupSpec, db_type: str = 'sqlite') -> str:
+    """Row count and highest key of the base table, plus the number of rows at or below :low."""
+    table = quote_ident(spec.table, db_type)
+    if not spec.key:
+        return f"SELECT COUNT(*) AS row_count, NULL AS max_key, COUNT(*) AS old_rows FROM {table}"
+    key = quote_ident(spec.key, db_type)
+    return (
+        f"SELECT COUNT(*) AS row_count, MAX({key}) AS max_key, "
+        f"SUM(CASE WHEN {key} <= :low THEN 1 ELSE 0 END) AS old_rows FROM {table}"
+    )
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    return None if value is None or pd.isna(value) else float(value)
+
+
+def _cell_rows(spec: RollupSpec, dimension: str, groups: pd.DataFrame) -> List[Tuple]:
+    """Rows for rollup_cells from one aggregate query (one per group and measure)."""
+    rows = []
+    for record in groups.to_dict('records'):
+        dim_value = str(record['dim_value'])
+        row_count = int(record['row_count'])
+        rows.append((spec.table, dimension, dim_value, ROW_COUNT_MEASURE, row_count, row_count, None, None, None))
+        for i, measure in enumerate(spec.measures):
+            rows.append((
+                spec.table, dimension, dim_value, measure, row_count, int(record[f'count_{i}'] or 0),
+                _float_or_none(record[f'sum_{i}']), _float_or_none(record[f'min_{i}']), _float_or_none(record[f'max_{i}'])
+            ))
+    return rows
+
+
+# Merging adds counts and sums and keeps the extremes; NULL means "no values yet"
+_MERGE_SQL = """
+    INSERT INTO rollup_cells (table_name, dimension, dim_value, measure, row_count, value_count, value_sum, value_min, value_max)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (table_name, dimension, dim_value, measure) DO UPDATE SET
+        row_count = row_count + excluded.row_count,
+        value_count = value_count + excluded.value_count,
+        value_sum = CASE WHEN value_sum IS NULL THEN excluded.value_sum
+                         WHEN excluded.value_sum IS NULL THEN value_sum
+                         ELSE value_sum + excluded.value_sum END,
+        value_min = MIN(COALESCE(value_min, excluded.value_min), COALESCE(excluded.value_min, value_min)),
+        value_max = MAX(COALESCE(value_max, excluded.value_max), COALESCE(excluded.value_max, value_max))
+"""
+
+# Value expression per aggregation over rollup_cells
+_AGGREGATE_EXPRESSIONS = {
+    'COUNT': 'row_count',
+    'SUM': 'value_sum',
+    'AVG': 'CASE WHEN value_count > 0 THEN value_sum / value_count END',
+    'MIN': 'value_min',
+    'MAX': 'value_max',
+}
+
+
+class RollupStore:
+    """
+    Rollup tables in a local SQLite file, shared by every worker on the host.
+    Each worker opens its own connections (one per thread); WAL mode lets
+    charts read rollups while a refresh writes them.
+    """
+
+    def __init__(self, settings: RollupSettings):
+        self.settings = settings
+        self.path = settings.sqlite_path
+        self._sqlite = LocalSQLite(self.path)
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'full_refreshes': 0, 'errors': 0}
+
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_cells (
+                table_name TEXT NOT NULL,
+                dimension TEXT NOT NULL,
+                dim_value TEXT NOT NULL,
+                measure TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                value_count INTEGER NOT NULL,
+                value_sum REAL,
+                value_min REAL,
+                value_max REAL,
+                PRIMARY KEY (table_name, dimension, measure, dim_value)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_state (
+                table_name TEXT PRIMARY KEY,
+                signature TEXT NOT NULL,
+                dimensions TEXT NOT NULL,
+                measures TEXT NOT NULL,
+                watermark REAL,
+                row_count INTEGER NOT NULL,
+                refreshed_at REAL NOT NULL,
+                full_refreshed_at REAL NOT NULL
+            )
+        """)
+
+    def _connect(self) -> sqlite3.Connection:
+        return self._sqlite.connect()
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _load_state(self, table: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT signature, dimensions, measures, watermark, row_count, refreshed_at, full_refreshed_at "
+            "FROM rollup_state WHERE table_name = ?", (table,)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ('signature', 'dimensions', 'measures', 'watermark', 'row_count', 'refreshed_at', 'full_refreshed_at')
+        state = dict(zip(keys, row))
+        state['dimensions'] = json.loads(state['dimensions'])
+        state['measures'] = json.loads(state['measures'])
+        return state
+
+    def refresh(self, source_conn, specs: Sequence[RollupSpec], db_type: str = 'sqlite') -> None:
+        """
+        Bring every table's rollups up to date from the base tables on source_conn
+        (a SQLAlchemy connection). Errors are logged per table and never raised.
+        """
+        for spec in specs:
+            try:
+                self._refresh_table(source_conn, spec, db_type)
+            except Exception as e:
+                print(f"Warning: Rollup refresh failed for table {spec.table}: {type(e).__name__}: {e}")
+                self._count('errors')
+
+    def _refresh_table(self, source_conn, spec: RollupSpec, db_type: str) -> None:
+        now = time.time()
+        state = self._load_state(spec.table)
+        if state and now - state['refreshed_at'] < self.settings.refresh_seconds / 2:
+            return  # Another worker refreshed it moments ago
+
+        low = state['watermark'] if state and state['watermark'] is not None else 0
+        probe = pd.read_sql(text(build_watermark_sql(spec, db_type)), source_conn, params={'low': low}).iloc[0]
+        row_count = int(probe['row_count'])
+        max_key = _float_or_none(probe['max_key'])
+
+        incremental = bool(
+            state and spec.key
+            and state['signature'] == spec.signature
+            and state['watermark'] is not None
+            and now - state['full_refreshed_at'] < self.settings.full_refresh_seconds
+            # Rows at or below the watermark unchanged in number: nothing was deleted
+            and int(probe['old_rows'] or 0) == state['row_count']
+        )
+        if incremental:
+            self._merge_new_rows(source_conn, spec, db_type, state, max_key, row_count, now)
+        else:
+            self._rebuild(source_conn, spec, db_type, state, max_key, row_count, now)
+
+    def _merge_new_rows(self, source_conn, spec, db_type, state, max_key, row_count, now) -> None:
+        rows = []
+        if max_key is not None and max_key > state['watermark']:
+            params = {'low': state['watermark'], 'high': max_key}
+            for dimension in state['dimensions']:
+                groups = pd.read_sql(text(build_rollup_sql(spec, dimension, db_type, incremental=True)), source_conn, params=params)
+                rows += _cell_rows(spec, dimension, groups)
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = conn.execute("SELECT watermark FROM rollup_state WHERE table_name = ?", (spec.table,)).fetchone()
+            if current is None or current[0] != state['watermark']:
+                # Another worker merged the same rows first
+                conn.execute("ROLLBACK")
+                return
+            conn.executemany(_MERGE_SQL, rows)
+            conn.execute(
+                "UPDATE rollup_state SET watermark = ?, row_count = row_count + ?, refreshed_at = ? WHERE table_name = ?",
+                (max(max_key or 0, state['watermark']), row_count - state['row_count'], now, spec.table)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._count('refreshes')
+
+    def _rebuild(self, source_conn, spec, db_type, state, max_key, row_count, now) -> None:
+        # A full rebuild aggregates up to the key probed above; later rows arrive incrementally
+        rows = []
+        dimensions = []
+        # High-cardinality dimensions are skipped before any group is fetched
+        cardinality = pd.read_sql(text(build_cardinality_sql(spec, db_type)), source_conn).iloc[0]
+        for i, dimension in enumerate(spec.dimensions):
+            distinct = int(cardinality[f'distinct_{i}'] or 0)
+            if distinct > self.settings.max_groups:
+                print(f"Rollup: skipping {spec.table}.{dimension} ({distinct} groups > {self.settings.max_groups})")
+                continue
+            sql = build_rollup_sql(spec, dimension, db_type)
+            groups = pd.read_sql(text(sql), source_conn, params={'high': max_key} if spec.key else None)
+            dimensions.append(dimension)
+            rows += _cell_rows(spec, dimension, groups)
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM rollup_cells WHERE table_name = ?", (spec.table,))
+            conn.executemany(_MERGE_SQL, rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO rollup_state "
+                "(table_name, signature, dimensions, measures, watermark, row_count, refreshed_at, full_refreshed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (spec.table, spec.signature, json.dumps(dimensions), json.dumps(list(spec.measures)),
+                 max_key if spec.key else None, row_count, now, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._count('full_refreshes')
+        print(f"Rollup: rebuilt {spec.table} ({row_count} rows, dimensions: {', '.join(dimensions) or 'none'})")
+
+    def query(self, validated_request: ChartRequest) -> Optional[pd.DataFrame]:
+        """
+        Answer an aggregated chart request from the rollups, like build_sql would:
+        columns [x_axis, aggregate alias], largest groups first, at most MAX_GROUPS
+        (line/area charts: every group in x order, at most MAX_ROWS).
+        Returns None if no fresh rollup covers the request.
+        """
+        agg = validated_request.aggregate_y
+        x_col, y_col = validated_request.x_axis, validated_request.y_axis
+        if agg not in _AGGREGATE_EXPRESSIONS or not x_col or not y_col or validated_request.color:
+            return None
+        try:
+            state = self._load_state(validated_request.table_name)
+            if (
+                state is None
+                or time.time() - state['refreshed_at'] > self.settings.max_staleness_seconds
+                or x_col not in state['dimensions']
+                or (agg != 'COUNT' and y_col not in state['measures'])
+            ):
+                self._count('misses')
+                return None
+
+            if orders_by_x(validated_request):
+                order_by, max_limit = 'dim_value', MAX_ROWS
+            else:
+                order_by, max_limit = 'value DESC', MAX_GROUPS
+            limit = min(validated_request.limit or max_limit, max_limit)
+            df = pd.read_sql(
+                f"SELECT dim_value, {_AGGREGATE_EXPRESSIONS[agg]} AS value FROM rollup_cells "
+                f"WHERE table_name = ? AND dimension = ? AND measure = ? ORDER BY {order_by} LIMIT ?",
+                self._connect(),
+                params=(validated_request.table_name, x_col, ROW_COUNT_MEASURE if agg == 'COUNT' else y_col, max(1, limit))
+            )
+        except sqlite3.Error as e:
+            print(f"Warning: Rollup read failed ({validated_request.table_name}): {e}")
+            self._count('errors')
+            return None
+        self._count('hits')
+        return df.rename(columns={'dim_value': x_col, 'value': get_aggregated_y_axis_name(validated_request)})
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters and per-table refresh state for monitoring."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        try:
+            rows = self._connect().execute("SELECT table_name, row_count, refreshed_at FROM rollup_state").fetchall()
+        except sqlite3.Error:
+            rows = []
+        now = time.time()
+        stats['tables'] = {table: {'rows': count, 'age_seconds': round(now - refreshed_at, 1)} for table, count, refreshed_at in rows}
+        return stats
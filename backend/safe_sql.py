@@ -16,11 +16,17 @@ BASELINE_ALLOWED_TABLES: Set[str] = {
     'Opportunity'
 }
 
+# Dialects with double-quoted identifiers and LIMIT; SQL Server uses [brackets] and TOP
+LIMIT_DIALECTS: Set[str] = {'sqlite', 'duckdb'}
+
 # PII columns that must be blocked from selection and raw_data
 PII_COLUMNS: Set[str] = {
     'Email'  # dbo.Contact.Email - PII that must be protected
 }
 
+# Chart types that draw their points in x order (aggregated points are ordered by x, not by value)
+SERIES_CHART_TYPES: Set[str] = {'line_chart', 'area_chart'}
+
 # Allowed chart types (whitelist)
 ALLOWED_CHART_TYPES: Set[str] = {
     'bar_chart',
@@ -31,6 +37,7 @@ ALLOWED_CHART_TYPES: Set[str] = {
     'histogram',
     'box_plot',
     'area_chart',
+    'stacked_bar_chart',
     '3d_scatter_plot',
     'bubble_chart'
 }
@@ -49,6 +56,8 @@ ALLOWED_AGGREGATIONS: Set[str] = {
 MAX_ROWS = 5000  # Maximum rows for non-aggregated queries
 MAX_GROUPS = 50  # Maximum groups for aggregated queries
 MAX_HISTOGRAM_BINS = 100  # Maximum bins for histograms
+MAX_DENSITY_BINS = 60  # Maximum bins per axis for 2D density charts
+MAX_DENSITY_BINS_3D = 15  # Maximum bins per axis for 3D density charts
 
 # SQL Server numerical data types (for aggregation validation)
 NUMERICAL_TYPES: Set[str] = {
@@ -91,16 +100,16 @@ def quote_ident(name: str, db_type: str = 'sqlite') -> str:
     
     Args:
         name: Identifier name (table or column)
-        db_type: Database type ('sqlite' or 'sqlserver')
+        db_type: Database type ('sqlite', 'duckdb' or 'sqlserver')
         
     Returns:
-        Quoted identifier: [name] for SQL Server, "name" for SQLite
+        Quoted identifier: [name] for SQL Server, "name" for SQLite and DuckDB
     """
     if not name:
         raise SafeSQLError("Identifier name cannot be empty")
     
-    if db_type == 'sqlite':
-        # SQLite uses double quotes for identifiers
+    if db_type in LIMIT_DIALECTS:
+        # SQLite and DuckDB use double quotes for identifiers
         escaped = name.replace('"', '""')
         return f'"{escaped}"'
     else:
@@ -239,6 +248,8 @@ def validate_chart_request(
         'box_plot': 'box_plot',
         'area': 'area_chart',
         'area_chart': 'area_chart',
+        'stacked_bar': 'stacked_bar_chart',
+        'stacked_bar_chart': 'stacked_bar_chart',
         'bubble': 'bubble_chart',
         'bubble_chart': 'bubble_chart',
     }
@@ -364,10 +375,26 @@ def validate_chart_request(
     return validated
 
 
+def orders_by_x(validated_request: ChartRequest, table_schema: Optional[Dict] = None) -> bool:
+    """
+    True if aggregated rows must be ordered by x rather than by value:
+    line/area charts, and any chart over a date or numeric x column.
+    Such rows are a series, so they are not cut to the MAX_GROUPS largest groups.
+    """
+    if validated_request.chart_type in SERIES_CHART_TYPES:
+        return True
+    if table_schema is None:
+        return False
+    return validated_request.x_axis in (
+        set(table_schema.get('date_columns', [])) | set(table_schema.get('numerical_columns', []))
+    )
+
+
 def build_sql(
     validated_request: ChartRequest,
     schema_map: Dict[str, Dict],
-    db_type: str = 'sqlite'
+    db_type: str = 'sqlite',
+    max_rows: int = MAX_ROWS
 ) -> Tuple[str, List]:
     """
     Build a safe SQL query from a validated chart request.
@@ -375,7 +402,9 @@ def build_sql(
     Args:
         validated_request: Validated ChartRequest object
         schema_map: Schema map for column type information
-        db_type: Database type ('sqlite' or 'sqlserver'). Defaults to 'sqlite'.
+        db_type: Database type ('sqlite', 'duckdb' or 'sqlserver'). Defaults to 'sqlite'.
+        max_rows: Row cap for series and non-aggregated queries (the caller's fetch limit).
+            Defaults to MAX_ROWS.
         
     Returns:
         Tuple of (SQL query string, parameter list)
@@ -398,23 +427,23 @@ def build_sql(
     # Build SELECT columns
     select_parts = []
     
+    agg_alias = None
     if is_aggregated:
         # Aggregated query: SELECT [x], AGG([y]) AS [y_alias]
         select_parts.append(quote_ident(validated_request.x_axis, db_type))
         
         agg_func = validated_request.aggregate_y
         y_col = quote_ident(validated_request.y_axis, db_type)
+        agg_alias = quote_ident(get_aggregated_y_axis_name(validated_request), db_type)
         
         if agg_func == 'COUNT':
-            select_parts.append(f"COUNT({y_col}) AS {quote_ident(f'Count of {validated_request.y_axis}', db_type)}")
-        elif agg_func == 'SUM':
-            select_parts.append(f"SUM({y_col}) AS {quote_ident(f'Sum of {validated_request.y_axis}', db_type)}")
-        elif agg_func == 'AVG':
-            select_parts.append(f"AVG({y_col}) AS {quote_ident(f'Average of {validated_request.y_axis}', db_type)}")
-        elif agg_func == 'MIN':
-            select_parts.append(f"MIN({y_col}) AS {quote_ident(f'Min of {validated_request.y_axis}', db_type)}")
-        elif agg_func == 'MAX':
-            select_parts.append(f"MAX({y_col}) AS {quote_ident(f'Max of {validated_request.y_axis}', db_type)}")
+            # Count rows per group (NULL y values still count as records)
+            select_parts.append(f"COUNT(*) AS {agg_alias}")
+        elif agg_func == 'AVG' and db_type not in LIMIT_DIALECTS:
+            # SQL Server AVG over integer columns truncates; cast to get a float mean
+            select_parts.append(f"AVG(CAST({y_col} AS FLOAT)) AS {agg_alias}")
+        else:
+            select_parts.append(f"{agg_func}({y_col}) AS {agg_alias}")
         
         # Add color column if present (for grouping)
         if validated_request.color:
@@ -448,6 +477,9 @@ def build_sql(
     
     # Build WHERE clause (future: for filters)
     where_clause = ""
+    if is_aggregated:
+        # NULL categories are dropped, matching pandas groupby semantics
+        where_clause = f"WHERE {quote_ident(validated_request.x_axis, db_type)} IS NOT NULL"
     # Placeholder for future filter support with parameterization
     
     # Build GROUP BY clause (for aggregated queries)
@@ -460,9 +492,12 @@ def build_sql(
     
     # Build ORDER BY clause
     order_by_clause = ""
-    if is_aggregated:
-        # Order by aggregated value descending
-        agg_alias = select_parts[1].split(" AS ")[1]  # Get alias from SELECT
+    series = is_aggregated and orders_by_x(validated_request, table_schema)
+    if series:
+        # Series are drawn in x order; ordering by value would zigzag and drop points
+        order_by_clause = f"ORDER BY {', '.join(group_by_cols)}"
+    elif is_aggregated:
+        # Order by aggregated value descending so the largest groups survive the limit
         order_by_clause = f"ORDER BY {agg_alias} DESC"
     elif validated_request.x_axis:
         # For non-aggregated, order by x_axis if it's sortable
@@ -470,25 +505,27 @@ def build_sql(
         order_by_clause = f"ORDER BY {quote_ident(validated_request.x_axis, db_type)}"
     
     # Determine limit
-    if is_aggregated:
+    if series:
+        # A series keeps its first max_rows points in x order
+        limit_value = validated_request.limit if validated_request.limit else max_rows
+        limit_value = min(limit_value, max_rows)
+    elif is_aggregated:
         # For aggregated queries, limit groups
         limit_value = validated_request.limit if validated_request.limit else MAX_GROUPS
         limit_value = min(limit_value, MAX_GROUPS)
-    elif validated_request.chart_type == 'histogram':
-        # Histograms might need more rows for binning
-        limit_value = validated_request.limit if validated_request.limit else MAX_HISTOGRAM_BINS
-        limit_value = min(limit_value, MAX_HISTOGRAM_BINS)
     else:
+        # Raw histogram values are capped like any other rows (MAX_HISTOGRAM_BINS limits
+        # bins, not values; see build_binned_sql for histograms binned in the database)
         # For non-aggregated queries, limit rows
-        limit_value = validated_request.limit if validated_request.limit else MAX_ROWS
-        limit_value = min(limit_value, MAX_ROWS)
+        limit_value = validated_request.limit if validated_request.limit else max_rows
+        limit_value = min(limit_value, max_rows)
     
     # Ensure limit is at least 1
     limit_value = max(1, limit_value)
     
     # Build final SQL with database-appropriate LIMIT syntax
-    if db_type == 'sqlite':
-        # SQLite uses LIMIT at the end
+    if db_type in LIMIT_DIALECTS:
+        # SQLite and DuckDB use LIMIT at the end
         sql_parts = [
             "SELECT",
             select_clause,
@@ -511,8 +548,8 @@ def build_sql(
     if order_by_clause:
         sql_parts.append(order_by_clause)
     
-    # Add LIMIT clause for SQLite (at the end)
-    if db_type == 'sqlite':
+    # Add LIMIT clause for SQLite and DuckDB (at the end)
+    if db_type in LIMIT_DIALECTS:
         sql_parts.append(f"LIMIT {limit_value}")
     
     sql = " ".join(sql_parts)
@@ -551,6 +588,195 @@ def get_aggregated_y_axis_name(validated_request: ChartRequest) -> str:
     return y_col
 
 
+def _as_float(expr: str, db_type: str) -> str:
+    """Cast a numeric expression to double precision in the given dialect (DuckDB's REAL is 4 bytes)."""
+    float_type = {'sqlite': 'REAL', 'duckdb': 'DOUBLE'}.get(db_type, 'FLOAT')
+    return f"CAST({expr} AS {float_type})"
+
+
+def _truncate(expr: str, db_type: str) -> str:
+    """Integer part of a non-negative expression (DuckDB rounds when casting to INTEGER)."""
+    if db_type == 'duckdb':
+        expr = f"FLOOR({expr})"
+    return f"CAST({expr} AS INTEGER)"
+
+
+def _sql_number(value: float) -> str:
+    """Render a float probed from the database as a SQL literal."""
+    value = float(value)
+    if value != value or value in (float('inf'), float('-inf')):
+        raise SafeSQLError(f"Cannot use non-finite value {value} in SQL")
+    return repr(value)
+
+
+def build_range_probe_sql(table_name: str, columns: List[str], db_type: str = 'sqlite') -> str:
+    """
+    Build a one-row query returning the row count and MIN/MAX of each column.
+    Rows with a NULL in any of the columns are excluded, matching the binned queries.
+    Result columns: row_count, min_0, max_0, min_1, max_1, ...
+    
+    Args:
+        table_name: Validated table name
+        columns: Validated numerical column names
+        db_type: Database type ('sqlite', 'duckdb' or 'sqlserver')
+    """
+    if not columns:
+        raise SafeSQLError("At least one column is required for a range probe")
+    select_parts = ["COUNT(*) AS row_count"]
+    for i, col in enumerate(columns):
+        value = _as_float(quote_ident(col, db_type), db_type)
+        select_parts.append(f"MIN({value}) AS min_{i}")
+        select_parts.append(f"MAX({value}) AS max_{i}")
+    not_null = " AND ".join(f"{quote_ident(col, db_type)} IS NOT NULL" for col in columns)
+    return f"SELECT {', '.join(select_parts)} FROM {quote_ident(table_name, db_type)} WHERE {not_null}"
+
+
+@dataclass
+class BinAxis:
+    """Equal-width bins over [low, low + width * bins] for one column."""
+    column: str
+    low: float
+    width: float
+    bins: int
+    
+    def centers(self) -> List[float]:
+        return [self.low + (i + 0.5) * self.width for i in range(self.bins)]
+
+
+def choose_bins(column: str, low: float, high: float, max_bins: int, integer: bool = False) -> BinAxis:
+    """
+    Pick equal-width bins covering [low, high].
+    Integer columns with a small range get one bin per value.
+    """
+    low, high = float(low), float(high)
+    span = high - low
+    if span <= 0:
+        return BinAxis(column, low - 0.5, 1.0, 1)
+    if integer and span + 1 <= max_bins:
+        return BinAxis(column, low - 0.5, 1.0, int(span) + 1)
+    return BinAxis(column, low, span / max_bins, max_bins)
+
+
+def _bin_index_expr(axis: BinAxis, db_type: str) -> str:
+    """Bucket index 0..bins-1 for a column (the top edge falls in the last bucket)."""
+    value = _as_float(quote_ident(axis.column, db_type), db_type)
+    offset = f"({value} - {_sql_number(axis.low)}) / {_sql_number(axis.width)}"
+    # Values are >= low, so truncating is the same as FLOOR
+    return f"CASE WHEN {offset} >= {axis.bins} THEN {axis.bins - 1} ELSE {_truncate(offset, db_type)} END"
+
+
+def build_binned_sql(table_name: str, axes: List[BinAxis], db_type: str = 'sqlite',
+                     group_column: Optional[str] = None, value_column: Optional[str] = None) -> str:
+    """
+    Build a GROUP BY query counting rows per bucket of one or more binned columns.
+    At most prod(bins) rows (per group) are returned, regardless of table size.
+    Result columns: bin_0, bin_1, ..., [group_column,] bin_count[, bin_value]
+    
+    Args:
+        table_name: Validated table name
+        axes: Bins for each validated numerical column (from choose_bins)
+        db_type: Database type ('sqlite', 'duckdb' or 'sqlserver')
+        group_column: Optional validated column to count separately (e.g. histogram or scatter color)
+        value_column: Optional validated numerical column averaged per bucket as bin_value (e.g. bubble size)
+    """
+    if not axes:
+        raise SafeSQLError("At least one binned column is required")
+    if any(axis.bins > MAX_HISTOGRAM_BINS for axis in axes):
+        raise SafeSQLError(f"At most {MAX_HISTOGRAM_BINS} bins per column are allowed")
+    group_names = [f"bin_{i}" for i in range(len(axes))]
+    inner_parts = [f"{_bin_index_expr(axis, db_type)} AS {name}" for axis, name in zip(axes, group_names)]
+    if group_column:
+        group_names.append(quote_ident(group_column, db_type))
+        inner_parts.append(quote_ident(group_column, db_type))
+    aggregates = ["COUNT(*) AS bin_count"]
+    if value_column:
+        inner_parts.append(f"{_as_float(quote_ident(value_column, db_type), db_type)} AS bin_source_value")
+        aggregates.append("AVG(bin_source_value) AS bin_value")
+    not_null = " AND ".join(f"{quote_ident(axis.column, db_type)} IS NOT NULL" for axis in axes)
+    return (
+        f"SELECT {', '.join(group_names)}, {', '.join(aggregates)} "
+        f"FROM (SELECT {', '.join(inner_parts)} FROM {quote_ident(table_name, db_type)} WHERE {not_null}) AS binned "
+        f"GROUP BY {', '.join(group_names)} "
+        f"ORDER BY {', '.join(group_names)}"
+    )
+
+
+# Quartile columns returned by build_box_stats_sql, in order
+BOX_STAT_COLUMNS = ['n', 'q1', 'median', 'q3', 'lowerfence', 'upperfence']
+
+
+def _rank_percentile_expr(fraction: float, db_type: str = 'sqlite') -> str:
+    """
+    PERCENTILE_CONT over ROW_NUMBER()-ranked rows (for databases without it).
+    Interpolates linearly between the two ranks around (n - 1) * fraction,
+    which gives the same result as PERCENTILE_CONT.
+    """
+    position = f"(n - 1) * {fraction}"
+    base_rank = _truncate(position, db_type)
+    low = f"MAX(CASE WHEN rn = {base_rank} + 1 THEN v END)"
+    high = f"COALESCE(MAX(CASE WHEN rn = {base_rank} + 2 THEN v END), {low})"
+    return f"{low} + ({position} - {base_rank}) * ({high} - {low})"
+
+
+def build_box_stats_sql(validated_request: ChartRequest, db_type: str = 'sqlite') -> str:
+    """
+    Build a query returning box plot statistics per x category (and color, if set).
+    Quartiles use PERCENTILE_CONT on SQL Server and ROW_NUMBER() interpolation on
+    SQLite and DuckDB; fences are the most extreme values within 1.5 IQR of the box (Tukey),
+    as Plotly draws them. At most MAX_GROUPS categories (largest first) are returned.
+    Result columns: x_axis, [color,] n, q1, median, q3, lowerfence, upperfence
+    
+    Args:
+        validated_request: Validated box_plot ChartRequest (numerical y_axis)
+        db_type: Database type ('sqlite', 'duckdb' or 'sqlserver')
+    """
+    if not validated_request.x_axis or not validated_request.y_axis:
+        raise SafeSQLError("Box plot statistics require x_axis and y_axis")
+    keys = [quote_ident(validated_request.x_axis, db_type)]
+    if validated_request.color and validated_request.color != validated_request.x_axis:
+        keys.append(quote_ident(validated_request.color, db_type))
+    y_col = quote_ident(validated_request.y_axis, db_type)
+    partition = ", ".join(keys)
+    not_null = " AND ".join(f"{col} IS NOT NULL" for col in keys + [y_col])
+    
+    ranked_parts = [
+        *keys,
+        f"{_as_float(y_col, db_type)} AS v",
+        f"COUNT(*) OVER (PARTITION BY {partition}) AS n",
+    ]
+    if db_type in LIMIT_DIALECTS:
+        ranked_parts.append(f"ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY {y_col}) AS rn")
+        stats = (
+            f"SELECT {partition}, n, {_rank_percentile_expr(0.25, db_type)} AS q1, "
+            f"{_rank_percentile_expr(0.5, db_type)} AS median, {_rank_percentile_expr(0.75, db_type)} AS q3 "
+            f"FROM ranked GROUP BY {partition}, n"
+        )
+    else:
+        value = _as_float(y_col, db_type)
+        for name, fraction in (('q1', 0.25), ('median', 0.5), ('q3', 0.75)):
+            ranked_parts.append(
+                f"PERCENTILE_CONT({fraction}) WITHIN GROUP (ORDER BY {value}) OVER (PARTITION BY {partition}) AS {name}"
+            )
+        stats = f"SELECT DISTINCT {partition}, n, q1, median, q3 FROM ranked"
+    
+    ranked = f"SELECT {', '.join(ranked_parts)} FROM {quote_ident(validated_request.table_name, db_type)} WHERE {not_null}"
+    stat_keys = ", ".join(f"s.{col}" for col in keys)
+    join_on = " AND ".join(f"r.{col} = s.{col}" for col in keys)
+    top = "" if db_type in LIMIT_DIALECTS else f"TOP {MAX_GROUPS} "
+    sql = (
+        f"WITH ranked AS ({ranked}), stats AS ({stats}) "
+        f"SELECT {top}{stat_keys}, s.n, s.q1, s.median, s.q3, "
+        f"MIN(CASE WHEN r.v >= s.q1 - 1.5 * (s.q3 - s.q1) THEN r.v END) AS lowerfence, "
+        f"MAX(CASE WHEN r.v <= s.q3 + 1.5 * (s.q3 - s.q1) THEN r.v END) AS upperfence "
+        f"FROM stats s JOIN ranked r ON {join_on} "
+        f"GROUP BY {stat_keys}, s.n, s.q1, s.median, s.q3 "
+        f"ORDER BY s.n DESC"
+    )
+    if db_type in LIMIT_DIALECTS:
+        sql += f" LIMIT {MAX_GROUPS}"
+    return sql
+
+
 def filter_pii_from_dataframe(df, table_name: str = None):
     """
     Remove PII columns from a DataFrame before returning to frontend.
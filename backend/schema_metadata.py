@@ -0,0 +1,206 @@
+"""
+Column metadata store shared by schema discovery and chart data fetching.
+Loads column types for all target tables in a single INFORMATION_SCHEMA query
+and caches them together with a schema version hash.
+"""
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, text
+
+
+# Tables exposed to chart generation
+TARGET_TABLES: List[str] = ['Account', 'Contact', 'Lead', 'Opportunity']
+
+# SQL Server data types by classification
+NUMERICAL_DATA_TYPES = {
+    'int', 'smallint', 'bigint', 'tinyint', 'decimal', 'numeric',
+    'real', 'float', 'money', 'smallmoney', 'bit'
+}
+DATE_DATA_TYPES = {
+    'date', 'datetime', 'datetime2', 'smalldatetime', 'timestamp', 'time', 'datetimeoffset'
+}
+
+# (table_name, column_name, data_type) in ordinal order
+ColumnRow = Tuple[str, str, str]
+
+
+def classify_data_type(data_type: str) -> str:
+    """
+    Classify a database data type for charting.
+
+    Returns:
+        'numerical', 'date', or 'categorical'
+    """
+    normalized = (data_type or '').lower()
+    if normalized in NUMERICAL_DATA_TYPES:
+        return 'numerical'
+    if normalized in DATE_DATA_TYPES:
+        return 'date'
+    return 'categorical'
+
+
+@dataclass
+class SchemaSnapshot:
+    """Immutable view of column metadata for all target tables."""
+    # {table_name: {column_name: data_type}} in ordinal order
+    column_types: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    # {table_name: {all_columns, numerical_columns, date_columns, categorical_columns}}
+    tables: Dict[str, Dict[str, List[str]]] = field(default_factory=dict)
+    # Short hash of column_types; changes whenever a column or type changes
+    version: str = ''
+    loaded_at: float = 0.0
+
+    def get_column_types(self, table_name: str) -> Dict[str, str]:
+        """Return {column_name: data_type} for a table (empty if unknown)."""
+        return self.column_types.get(table_name, {})
+
+    def get_date_columns(self, table_name: str) -> List[str]:
+        """Return date/time columns for a table (empty if unknown)."""
+        return self.tables.get(table_name, {}).get('date_columns', [])
+
+
+def build_schema_snapshot(rows: Iterable[ColumnRow], table_order: Optional[Sequence[str]] = None) -> SchemaSnapshot:
+    """
+    Build a SchemaSnapshot from (table_name, column_name, data_type) rows.
+
+    Args:
+        rows: Column rows, ordered by ordinal position within each table
+        table_order: Optional table ordering for the resulting dicts
+    """
+    column_types: Dict[str, Dict[str, str]] = {}
+    for table_name, column_name, data_type in rows:
+        column_types.setdefault(table_name, {})[column_name] = (data_type or '').lower()
+
+    if table_order:
+        ordered = [t for t in table_order if t in column_types]
+        ordered += [t for t in column_types if t not in ordered]
+        column_types = {t: column_types[t] for t in ordered}
+
+    tables: Dict[str, Dict[str, List[str]]] = {}
+    for table_name, columns in column_types.items():
+        schema = {
+            'all_columns': [],
+            'numerical_columns': [],
+            'date_columns': [],
+            'categorical_columns': []
+        }
+        for column_name, data_type in columns.items():
+            schema['all_columns'].append(column_name)
+            schema[f'{classify_data_type(data_type)}_columns'].append(column_name)
+        tables[table_name] = schema
+
+    version = hashlib.sha256(
+        json.dumps(column_types, sort_keys=True).encode('utf-8')
+    ).hexdigest()[:16] if column_types else ''
+
+    return SchemaSnapshot(
+        column_types=column_types,
+        tables=tables,
+        version=version,
+        loaded_at=time.time()
+    )
+
+
+def load_information_schema_columns(conn, database: str, tables: Sequence[str] = TARGET_TABLES) -> List[ColumnRow]:
+    """
+    Fetch column metadata for all requested tables in one round trip.
+
+    Args:
+        conn: SQLAlchemy connection
+        database: Catalog name to filter on
+        tables: Table names to include
+    """
+    query = text("""
+        SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE
+        FROM INFORMATION_SCHEMA.COLUMNS
+        WHERE TABLE_NAME IN :tables
+        AND TABLE_CATALOG = :database
+        ORDER BY TABLE_NAME, ORDINAL_POSITION
+    """).bindparams(bindparam('tables', expanding=True))
+    result = conn.execute(query, {'tables': list(tables), 'database': database})
+    return [(row.TABLE_NAME, row.COLUMN_NAME, row.DATA_TYPE) for row in result]
+
+
+def sqlite_data_type(declared_type: str, column_name: str) -> str:
+    """
+    Map a SQLite declared column type to the SQL Server type name used for
+    classification, following SQLite's type affinity rules.
+    SQLite has no date type: TEXT columns named like '...Date' hold ISO dates.
+    """
+    declared = (declared_type or '').upper()
+    if 'INT' in declared:
+        return 'int'
+    if any(name in declared for name in ('REAL', 'FLOA', 'DOUB')):
+        return 'float'
+    if 'DATE' in declared or 'TIME' in declared or column_name.endswith('Date'):
+        return 'datetime2'
+    if 'NUMERIC' in declared or 'DECIMAL' in declared:
+        return 'decimal'
+    return 'nvarchar'
+
+
+def load_sqlite_columns(conn, tables: Sequence[str] = TARGET_TABLES) -> List[ColumnRow]:
+    """
+    Fetch column metadata for a SQLite database (which has no INFORMATION_SCHEMA)
+    with types mapped to SQL Server names, so both backends classify alike.
+
+    Args:
+        conn: SQLAlchemy connection
+        tables: Table names to include (missing tables are skipped)
+    """
+    rows: List[ColumnRow] = []
+    for table_name in sorted(tables):
+        quoted = '"' + table_name.replace('"', '""') + '"'
+        for column in conn.execute(text(f"PRAGMA table_info({quoted})")):
+            rows.append((table_name, column.name, sqlite_data_type(column.type, column.name)))
+    return rows
+
+
+class ColumnMetadataStore:
+    """
+    Thread-safe TTL cache around a column metadata loader.
+
+    Failed loads are not cached, so a transient database error does not
+    hide the schema for a full TTL period.
+    """
+
+    def __init__(self, loader: Callable[[], Iterable[ColumnRow]], ttl: float,
+                 table_order: Optional[Sequence[str]] = None):
+        self._loader = loader
+        self._ttl = ttl
+        self._table_order = table_order
+        self._snapshot: Optional[SchemaSnapshot] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> SchemaSnapshot:
+        """Return the cached snapshot, refreshing it when expired."""
+        snapshot = self._snapshot
+        if snapshot is not None and self._expires_at > time.time():
+            return snapshot
+
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            if self._snapshot is not None and self._expires_at > time.time():
+                return self._snapshot
+            try:
+                snapshot = build_schema_snapshot(self._loader(), self._table_order)
+            except Exception as e:
+                print(f"Error getting table schemas: {e}")
+                import traceback
+                traceback.print_exc()
+                return SchemaSnapshot()
+            if snapshot.tables:
+                self._snapshot = snapshot
+                self._expires_at = time.time() + self._ttl
+            return snapshot
+
+    def invalidate(self) -> None:
+        """Force the next get() to reload metadata."""
+        with self._lock:
+            self._expires_at = 0.0
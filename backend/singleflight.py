@@ -0,0 +1,87 @@
+"""
+Single-flight coalescing for concurrent identical work.
+The first caller for a key becomes the leader and does the work; callers that
+arrive while it is in flight await the leader's result instead of repeating
+the Gemini call or database query.
+"""
+import asyncio
+import copy
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Per-process registry of in-flight work keyed by request/query identity.
+
+    Followers receive a deep copy of the leader's result so callers can
+    mutate what they get back. All methods must be called from the event loop.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {'leaders': 0, 'followers': 0}
+
+    def join(self, key: Hashable) -> Tuple[bool, asyncio.Future]:
+        """
+        Join the flight for key.
+
+        Returns:
+            (is_leader, future). The leader must call finish(key, result)
+            exactly once; followers await the future.
+        """
+        future = self._flights.get(key)
+        if future is not None:
+            self._stats['followers'] += 1
+            return False, future
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark exceptions as retrieved even when nobody followed this flight
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._flights[key] = future
+        self._stats['leaders'] += 1
+        return True, future
+
+    def finish(self, key: Hashable, result: Any = None, error: BaseException = None) -> None:
+        """Publish the leader's result (or error) and close the flight."""
+        future = self._flights.get(key)
+        if future is None:
+            return
+        del self._flights[key]
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def wait(self, future: asyncio.Future) -> Any:
+        """Await a leader's future; a cancelled follower does not cancel the flight."""
+        return copy.deepcopy(await asyncio.shield(future))
+
+    async def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run `await func(*args, **kwargs)` once per key among concurrent callers.
+
+        The work runs in its own task, so a leader whose request is cancelled
+        (e.g. a client disconnect) still delivers the result to its followers.
+        """
+        is_leader, future = self.join(key)
+        if not is_leader:
+            return await self.wait(future)
+
+        task = asyncio.ensure_future(func(*args, **kwargs))
+
+        def settle(t: asyncio.Task) -> None:
+            if t.cancelled():
+                self.finish(key, error=asyncio.CancelledError())
+            elif t.exception() is not None:
+                self.finish(key, error=t.exception())
+            else:
+                self.finish(key, t.result())
+
+        task.add_done_callback(settle)
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Leader/follower counters and the number of flights currently running."""
+        return {**self._stats, 'in_flight': len(self._flights)}
@@ -0,0 +1,143 @@
+"""
+Per-table change detection for cached chart responses.
+A table's version is a hash of its row count and the maximum of its change
+marker columns: a SQL Server rowversion column if the table has one (changes
+on every insert and update), otherwise its '<Table>ID' key and a modified or
+created date. All target tables are fingerprinted in one UNION ALL query,
+rerun at most every check_interval seconds per process.
+
+Cached responses record the version of the table they were computed from and
+are dropped as soon as that table changes. Only a rowversion or modified-date
+marker changes on UPDATE (see detects_updates); for other tables the version
+only sees inserts and deletes, so their entries keep the short response TTL.
+"""
+import hashlib
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from backend.safe_sql import quote_ident
+from backend.schema_metadata import DATE_DATA_TYPES
+
+# SQL Server types that hold a database-wide change counter
+ROWVERSION_DATA_TYPES = {'rowversion', 'timestamp'}
+# Date columns that advance when rows change, most specific first
+CHANGE_DATE_COLUMNS = ('LastModifiedDate', 'ModifiedDate', 'UpdatedAt', 'CreatedDate')
+# Of those, the ones set on UPDATE (CreatedDate only moves on INSERT)
+UPDATE_DATE_COLUMNS = ('LastModifiedDate', 'ModifiedDate', 'UpdatedAt')
+# Marker columns per table in the fingerprint query (missing markers are NULL)
+MARKER_SLOTS = 2
+
+
+def change_marker_columns(table_name: str, column_types: Dict[str, str], db_type: str = 'sqlite') -> List[str]:
+    """Columns whose maximum changes when the table changes (at most MARKER_SLOTS)."""
+    if db_type != 'sqlite':
+        for column, data_type in column_types.items():
+            if data_type in ROWVERSION_DATA_TYPES:
+                return [column]
+    markers = []
+    if f"{table_name}ID" in column_types:
+        markers.append(f"{table_name}ID")
+    for column in CHANGE_DATE_COLUMNS:
+        if column in column_types:
+            markers.append(column)
+            break
+    return markers[:MARKER_SLOTS]
+
+
+def detects_updates(table_name: str, column_types: Dict[str, str], db_type: str = 'sqlite') -> bool:
+    """Whether the table's version changes on UPDATE (rowversion or modified-date marker), not just on INSERT/DELETE."""
+    for column in change_marker_columns(table_name, column_types, db_type):
+        if column in UPDATE_DATE_COLUMNS:
+            return True
+        if db_type != 'sqlite' and column_types[column] in ROWVERSION_DATA_TYPES:
+            return True
+    return False
+
+
+def _marker_expr(column: str, data_type: str, db_type: str) -> str:
+    col = quote_ident(column, db_type)
+    if db_type == 'sqlite':
+        return f"CAST(MAX({col}) AS TEXT)"
+    if data_type in ROWVERSION_DATA_TYPES:
+        return f"CAST(MAX(CAST({col} AS BIGINT)) AS NVARCHAR(64))"
+    if data_type in DATE_DATA_TYPES:
+        # ISO 8601 keeps sub-second precision
+        return f"CONVERT(NVARCHAR(64), MAX({col}), 126)"
+    return f"CAST(MAX({col}) AS NVARCHAR(64))"
+
+
+def build_fingerprint_sql(tables: Dict[str, Dict[str, str]], db_type: str = 'sqlite') -> str:
+    """
+    One query returning (table_name, row_count, marker_0, marker_1) per table.
+
+    Args:
+        tables: {table_name: {column_name: data_type}}
+        db_type: Database type ('sqlite' or 'sqlserver')
+    """
+    selects = []
+    for table_name, column_types in tables.items():
+        markers = [
+            _marker_expr(column, column_types[column], db_type)
+            for column in change_marker_columns(table_name, column_types, db_type)
+        ]
+        markers += ['NULL'] * (MARKER_SLOTS - len(markers))
+        marker_list = ", ".join(f"{expr} AS marker_{i}" for i, expr in enumerate(markers))
+        name = table_name.replace("'", "''")
+        selects.append(
+            f"SELECT '{name}' AS table_name, COUNT(*) AS row_count, {marker_list} "
+            f"FROM {quote_ident(table_name, db_type)}"
+        )
+    return " UNION ALL ".join(selects)
+
+
+def fingerprints_from_rows(rows: Iterable[Sequence[Any]]) -> Dict[str, str]:
+    """{table_name: version} from fingerprint query rows."""
+    versions = {}
+    for table_name, *values in rows:
+        marker = "|".join('' if value is None else str(value) for value in values)
+        versions[table_name] = hashlib.sha256(marker.encode('utf-8')).hexdigest()[:12]
+    return versions
+
+
+class TableVersions:
+    """
+    Current version of every target table, reloaded at most every check_interval seconds.
+    If loading fails, versions are unknown (None) until the next successful check.
+    """
+
+    def __init__(self, loader: Callable[[], Dict[str, str]], check_interval: float):
+        self._loader = loader
+        self.check_interval = check_interval
+        self._versions: Dict[str, str] = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'checks': 0, 'changes': 0, 'errors': 0}
+
+    def get(self, table_name: str) -> Optional[str]:
+        """Version of a table, or None if it can't be determined."""
+        with self._lock:
+            if time.time() - self._checked_at >= self.check_interval:
+                self._reload()
+            return self._versions.get(table_name)
+
+    def _reload(self) -> None:
+        self._checked_at = time.time()
+        self._stats['checks'] += 1
+        try:
+            versions = self._loader()
+        except Exception as e:
+            print(f"Warning: Table change detection failed: {type(e).__name__}: {e}")
+            self._stats['errors'] += 1
+            self._versions = {}
+            return
+        self._stats['changes'] += sum(
+            1 for table, version in versions.items()
+            if table in self._versions and self._versions[table] != version
+        )
+        self._versions = versions
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters and current versions for monitoring."""
+        with self._lock:
+            return {**self._stats, 'check_interval': self.check_interval, 'versions': dict(self._versions)}
@@ -0,0 +1,101 @@
+"""
+Tests for the opt-in Arrow IPC chart transport.
+"""
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+
+from backend.arrow_transport import (
+    ARROW_STREAM_MEDIA_TYPE,
+    accepts_arrow,
+    arrow_available,
+    encode_arrow_response,
+    reference_columns,
+)
+from backend.json_encoding import RawJSON, encode_json_text
+
+
+def _response(df, fig):
+    return encode_json_text({
+        'chart_json': RawJSON(pio.to_json(fig, validate=False)),
+        'chart_type': 'scatter_plot',
+        'title': 'Revenue vs employees',
+        'raw_data': RawJSON(df.to_json(orient='split', date_format='iso', index=False)),
+        'suggestions': ['by region'],
+    })
+
+
+class TestReferenceColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Employees': np.arange(50),
+            'Revenue': np.linspace(0.1, 1e6, 50),
+            'Region': ['North', 'South'] * 25,
+        })
+        self.columns = json.loads(self.df.to_json(orient='split', index=False))
+        self.columns = {name: [row[i] for row in self.columns['data']]
+                        for i, name in enumerate(self.columns['columns'])}
+
+    def test_full_column_arrays_become_references(self):
+        fig = json.loads(pio.to_json(px.scatter(self.df, x='Employees', y='Revenue'), validate=False))
+
+        replaced = reference_columns(fig, self.columns)
+
+        self.assertEqual(replaced, 2)
+        self.assertEqual(fig['data'][0]['x'], {'column': 'Employees'})
+        self.assertEqual(fig['data'][0]['y'], {'column': 'Revenue'})
+
+    def test_grouped_traces_stay_inline(self):
+        fig = json.loads(pio.to_json(px.scatter(self.df, x='Employees', y='Revenue', color='Region'), validate=False))
+
+        self.assertEqual(reference_columns(fig, self.columns), 0)
+        self.assertEqual(len(fig['data']), 2)
+
+    def test_plain_list_arrays_are_matched(self):
+        fig = {'data': [{'type': 'bar', 'x': ['North', 'South'] * 25, 'y': [1, 2]}]}
+
+        reference_columns(fig, self.columns)
+
+        self.assertEqual(fig['data'][0]['x'], {'column': 'Region'})
+        self.assertEqual(fig['data'][0]['y'], [1, 2])
+
+
+class TestAcceptsArrow(unittest.TestCase):
+
+    def test_requires_arrow_media_type(self):
+        self.assertFalse(accepts_arrow(None))
+        self.assertFalse(accepts_arrow('application/json'))
+        self.assertEqual(accepts_arrow(f'application/json, {ARROW_STREAM_MEDIA_TYPE};q=0.9'), arrow_available())
+
+
+@unittest.skipUnless(arrow_available(), 'pyarrow not installed')
+class TestEncodeArrowResponse(unittest.TestCase):
+
+    def test_round_trip(self):
+        import pyarrow as pa
+
+        df = pd.DataFrame({'Employees': np.arange(20), 'Revenue': np.linspace(1.5, 99.5, 20)})
+        body = encode_arrow_response(_response(df, px.scatter(df, x='Employees', y='Revenue')))
+
+        table = pa.ipc.open_stream(body).read_all()
+        self.assertEqual(table.column_names, ['Employees', 'Revenue'])
+        # raw_data carries pandas' JSON rounding (10 decimals)
+        self.assertTrue(np.allclose(table.column('Revenue').to_numpy(), df['Revenue'].to_numpy()))
+
+        chart = json.loads(table.schema.metadata[b'chart'])
+        self.assertNotIn('raw_data', chart)
+        self.assertEqual(chart['chart_json']['data'][0]['y'], {'column': 'Revenue'})
+        self.assertEqual(chart['suggestions'], ['by region'])
+
+    def test_responses_without_rows_are_left_as_json(self):
+        error = encode_json_text({'error_type': 'DATA_ERROR', 'message': 'no data', 'suggestions': []})
+        self.assertIsNone(encode_arrow_response(error))
+
+
+if __name__ == '__main__':
+    unittest.main()
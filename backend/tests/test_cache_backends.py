@@ -0,0 +1,141 @@
+"""
+Tests for the shared cache backends.
+"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from backend.cache_backends import RedisCache, SQLiteCache, create_cache
+from backend.config import CacheSettings
+from backend.response_cache import ResponseCache
+
+
+class TestSQLiteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def make(self, **kwargs):
+        options = {'ttl': 60, 'max_entries': 10, 'max_bytes': 10_000}
+        options.update(kwargs)
+        return SQLiteCache(self.path, 'response', **options)
+
+    def test_entries_are_shared_between_instances(self):
+        """Two instances on one file behave like two workers on one host."""
+        worker_a, worker_b = self.make(), self.make()
+        worker_a.put('key', {'chart_type': 'bar_chart', 'suggestions': ['a']})
+
+        self.assertEqual(worker_b.get('key'), {'chart_type': 'bar_chart', 'suggestions': ['a']})
+        self.assertEqual(worker_b.get_stats()['hits'], 1)
+        self.assertEqual(worker_a.get_stats()['entries'], 1)
+
+    def test_namespaces_are_isolated(self):
+        self.make().put('key', 1)
+        other = SQLiteCache(self.path, 'schema', ttl=60, max_entries=10, max_bytes=10_000)
+        self.assertIsNone(other.get('key'))
+
+    def test_ttl_expiry(self):
+        cache = self.make(ttl=0.01)
+        cache.put('key', 'value')
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.get_stats()['expirations'], 1)
+
+    def test_lru_eviction_and_byte_budget(self):
+        cache = self.make(max_entries=2)
+        cache.put('a', 1)
+        time.sleep(0.01)
+        cache.put('b', 2)
+        time.sleep(0.01)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+
+        small = SQLiteCache(self.path, 'small', ttl=60, max_entries=100, max_bytes=20)
+        small.put('x', 'a' * 10)
+        small.put('y', 'b' * 10)
+        self.assertIsNone(small.get('x'))
+        self.assertFalse(small.put('huge', 'c' * 100))
+        self.assertEqual(small.get_stats()['bytes'], 12)
+
+
+class FakeRedis:
+    """Minimal stand-in for a Redis-protocol client."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expires_at = self.data.get(key, (None, 0))
+        return value if expires_at > time.time() else None
+
+    def set(self, key, value, px):
+        self.data[key] = (value, time.time() + px / 1000)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        prefix = match.rstrip('*')
+        return [k for k in self.data if k.startswith(prefix)]
+
+
+class TestRedisCache(unittest.TestCase):
+
+    def test_round_trip_ttl_and_clear(self):
+        client = FakeRedis()
+        cache = RedisCache('redis://unused', 'response', ttl=60, max_bytes=1000, client=client)
+        cache.put('key', {'title': 'Revenue'})
+
+        self.assertEqual(cache.get('key'), {'title': 'Revenue'})
+        self.assertIn('charting_ai:response:key', client.data)
+
+        self.assertEqual(len(cache), 1)
+
+        cache.clear()
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.get_stats()['hits'], 1)
+
+    def test_discarded_stale_hit_counts_as_miss(self):
+        cache = RedisCache('redis://unused', 'response', ttl=60, max_bytes=1000, client=FakeRedis())
+        cache.put('key', 'stale')
+        cache.get('key')
+        cache.discard('key')
+
+        self.assertIsNone(cache.get('key'))
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (0, 2))
+
+    def test_server_errors_are_misses(self):
+        class DownRedis(FakeRedis):
+            def get(self, key):
+                raise ConnectionError('connection refused')
+
+        cache = RedisCache('redis://unused', 'response', ttl=60, max_bytes=1000, client=DownRedis())
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.get_stats()['errors'], 1)
+
+
+class TestCreateCache(unittest.TestCase):
+
+    def test_memory_backend(self):
+        cache = create_cache(CacheSettings(backend='memory'), 'response', 60, 10, 1000)
+        self.assertIsInstance(cache, ResponseCache)
+
+    def test_unavailable_backend_falls_back_to_memory(self):
+        settings = CacheSettings(backend='sqlite', sqlite_path='/proc/no-such-dir/cache.db')
+        cache = create_cache(settings, 'response', 60, 10, 1000)
+        self.assertIsInstance(cache, ResponseCache)
+
+
+if __name__ == '__main__':
+    unittest.main()
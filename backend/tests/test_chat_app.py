@@ -0,0 +1,542 @@
+"""
+End-to-end tests for /chat against one app instance.
+The app reads a seeded temporary SQLite database; Gemini is replaced by a
+stand-in that returns fixed chart parameters after a delay.
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from backend.cache_backends import RedisCache
+from backend.db_backend import DatabaseBackend
+from backend.response_cache import ResponseCache
+from backend.db_init import init_sqlite_schema
+from backend import seed_sqlite_data
+
+_temp_dir = None
+_db_path = None
+app_module = None
+
+
+def setUpModule():
+    global _temp_dir, _db_path, app_module
+    _temp_dir = tempfile.TemporaryDirectory()
+    db_path = _db_path = os.path.join(_temp_dir.name, 'chart.db')
+    init_sqlite_schema(db_path)
+    random.seed(21)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    seed_sqlite_data.seed_accounts(cursor)
+    seed_sqlite_data.seed_opportunities(cursor)
+    conn.commit()
+    conn.close()
+
+    database_url = f'sqlite:///{db_path}'
+    with patch.dict(os.environ, {'DATABASE_URL': database_url, 'GEMINI_API_KEY': 'test-key'}):
+        import backend.app
+    app_module = backend.app
+    # Point the (lazily created) engine and schema store at the fixture
+    app_module._db_backend = DatabaseBackend('sqlite', database_url)
+    app_module._db_engine = None
+    app_module._schema_store.invalidate()
+
+
+def tearDownModule():
+    if app_module._db_engine is not None:
+        app_module._db_engine.dispose()
+    _temp_dir.cleanup()
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Stands in for a Gemini GenerativeModel: a fixed reply after a blocking delay."""
+
+    def __init__(self, reply, delay=0.0):
+        self.reply = reply
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls += 1
+        return FakeResponse(self.reply)
+
+
+def trace_values(values):
+    """Plotly trace array as a list (Plotly encodes numeric arrays as base64 'bdata')."""
+    if isinstance(values, dict):
+        return np.frombuffer(base64.b64decode(values['bdata']), dtype=values['dtype']).tolist()
+    return list(values)
+
+
+CHART_PARAMS = {
+    'chart_type': 'bar_chart', 'table_name': 'Opportunity', 'x_axis': 'Stage', 'y_axis': 'Value',
+    'aggregate_y': 'SUM', 'title': 'Value by stage',
+}
+
+
+class ChatAppTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.chart_model = FakeModel(json.dumps(CHART_PARAMS), delay=0.3)
+        self.suggestions_model = FakeModel('Value by account, Value over time', delay=0.05)
+        patches = [
+            patch.object(app_module, 'model_for_chart_params', self.chart_model),
+            patch.object(app_module, 'model_for_suggestions', self.suggestions_model),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def post_concurrently(self, messages):
+        async def scenario():
+            transport = httpx.ASGITransport(app=app_module.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                started = time.perf_counter()
+                responses = await asyncio.gather(*[
+                    client.post('/chat', json={'message': message, 'language': 'en'}) for message in messages
+                ])
+                return responses, time.perf_counter() - started
+        return asyncio.run(scenario())
+
+    def run_chat_events(self, message, **options):
+        """Drive _chat_events directly and return the decoded final result."""
+        request = app_module.ChatRequest(message=message, language='en', **options)
+
+        async def scenario():
+            events = [event async for event in app_module._chat_events(request)]
+            return events[-1]
+        stage, payload = asyncio.run(scenario())
+        self.assertEqual(stage, 'result')
+        return json.loads(payload) if isinstance(payload, str) else payload
+
+
+class FakeRedis:
+    """Minimal stand-in for a Redis-protocol client."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        value, expires_at = self.data.get(key, (None, 0))
+        return value if expires_at > time.time() else None
+
+    def set(self, key, value, px):
+        self.data[key] = (value, time.time() + px / 1000)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        prefix = match.rstrip('*')
+        return [k for k in list(self.data) if k.startswith(prefix)]
+
+
+class TestSharedResponseCache(ChatAppTestCase):
+    """The chat pipeline works unchanged on a shared (non-memory) response cache."""
+
+    def setUp(self):
+        super().setUp()
+        self.redis = FakeRedis()
+        cache = RedisCache('redis://unused', 'response', ttl=60, max_bytes=10_000_000, client=self.redis)
+        cache_patch = patch.object(app_module, '_response_cache', cache)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def test_chart_is_cached_and_served_from_redis(self):
+        message = 'please chart opportunity figures from the shared cache'
+
+        first = self.run_chat_events(message)
+        second = self.run_chat_events(message)
+
+        self.assertNotIn('error_type', first)
+        self.assertEqual(first['chart_type'], 'bar_chart')
+        self.assertEqual(second, first)
+        # The second request was answered from the cache without calling Gemini
+        self.assertEqual(self.chart_model.calls, 1)
+        self.assertEqual(len(self.redis.data), 1)
+
+
+class TestMemoryResponseCache(ChatAppTestCase):
+    """A repeated question is answered from the in-process cache without Gemini or the database."""
+
+    def setUp(self):
+        super().setUp()
+        cache_patch = patch.object(app_module, '_response_cache', ResponseCache(ttl=60, max_entries=10, max_bytes=10_000_000))
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+
+    def get_metrics(self):
+        async def scenario():
+            transport = httpx.ASGITransport(app=app_module.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                return await client.get('/metrics')
+        response = asyncio.run(scenario())
+        self.assertEqual(response.status_code, 200)
+        return response.json()['response_cache']
+
+    def test_repeated_message_skips_gemini_and_the_database(self):
+        message = 'please chart opportunity figures from memory'
+
+        with patch.object(app_module, 'run_chart_query', wraps=app_module.run_chart_query) as run_chart_query:
+            (first,), _ = self.post_concurrently([message])
+            after_first = self.get_metrics()
+            (second,), _ = self.post_concurrently([message])
+            after_second = self.get_metrics()
+
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.chart_model.calls, 1)
+        self.assertEqual(run_chart_query.call_count, 1)
+        self.assertEqual(after_first['backend'], 'memory')
+        self.assertEqual((after_first['hits'], after_first['misses'], after_first['entries']), (0, 1, 1))
+        self.assertEqual((after_second['hits'], after_second['misses']), (1, 1))
+
+
+class TestResponseCacheFreshness(unittest.TestCase):
+    """Cached responses are only trusted past the short TTL when the table version sees UPDATEs."""
+
+    def setUp(self):
+        cache = ResponseCache(ttl=3600, max_entries=10, max_bytes=100000)
+        cache_patch = patch.object(app_module, '_response_cache', cache)
+        cache_patch.start()
+        self.addCleanup(cache_patch.stop)
+        self.cache = cache
+
+    def store(self, table_name, version, age):
+        self.cache.put('key', {'table': table_name, 'version': version, 'stored_at': time.time() - age, 'body': '{}'})
+
+    def test_tables_without_update_markers_use_the_short_ttl(self):
+        version = app_module._table_versions.get('Opportunity')
+        self.store('Opportunity', version, age=60)
+        self.assertEqual(app_module._get_cached_response('key'), '{}')
+
+        self.store('Opportunity', version, age=app_module.RESPONSE_CACHE_TTL + 60)
+        self.assertIsNone(app_module._get_cached_response('key'))
+
+    def test_tables_with_update_markers_use_the_long_ttl(self):
+        version = app_module._table_versions.get('Opportunity')
+        self.store('Opportunity', version, age=app_module.RESPONSE_CACHE_TTL + 60)
+        with patch.object(app_module, 'detects_updates', return_value=True):
+            self.assertEqual(app_module._get_cached_response('key'), '{}')
+
+    def test_replica_reads_are_cached_without_a_version(self):
+        self.assertIsNone(app_module._source_table_version('Opportunity', 'replica'))
+        self.assertEqual(
+            app_module._source_table_version('Opportunity', 'primary'), app_module._table_versions.get('Opportunity')
+        )
+
+        self.store('Opportunity', None, age=app_module.RESPONSE_CACHE_TTL + 60)
+        with patch.object(app_module, 'detects_updates', return_value=True):
+            self.assertIsNone(app_module._get_cached_response('key'))
+
+    def test_columnar_reads_are_cached_with_the_loaded_version(self):
+        with patch.object(app_module, '_columnar', SimpleNamespace(version=lambda table_name: 'loaded-version')):
+            version = app_module._source_table_version('Opportunity', 'columnar')
+        self.assertEqual(version, 'loaded-version')
+
+        # The primary has moved on since the copy was loaded
+        self.store('Opportunity', version, age=1)
+        self.assertIsNone(app_module._get_cached_response('key'))
+
+    def test_changed_table_version_is_a_miss(self):
+        self.store('Opportunity', 'older-version', age=1)
+
+        self.assertIsNone(app_module._get_cached_response('key'))
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (0, 1, 0))
+
+
+class TestDensityMode(ChatAppTestCase):
+    """Large scatter and bubble charts are binned in SQL, per color group and with averaged sizes."""
+
+    def setUp(self):
+        super().setUp()
+        threshold_patch = patch.object(app_module, 'DENSITY_ROW_THRESHOLD', 5)
+        threshold_patch.start()
+        self.addCleanup(threshold_patch.stop)
+
+    def chart_result(self, message, **params):
+        self.chart_model.reply = json.dumps({
+            'chart_type': 'scatter_plot', 'table_name': 'Opportunity', 'x_axis': 'AccountID', 'y_axis': 'Value',
+            'aggregate_y': 'NONE', 'title': 'Value by account', **params,
+        })
+        result = self.run_chat_events(message)
+        self.assertNotIn('error_type', result)
+        chart = json.loads(result['chart_json']) if isinstance(result['chart_json'], str) else result['chart_json']
+        return result, chart['data']
+
+    def test_plain_scatter_is_binned(self):
+        _, traces = self.chart_result('please plot opportunity value density')
+
+        self.assertEqual([trace['type'] for trace in traces], ['heatmap'])
+
+    def test_scatter_with_color_is_binned_per_group(self):
+        result, traces = self.chart_result('please plot opportunity points in stage colors', color='Stage')
+
+        self.assertTrue(result['chart_warnings'][0].startswith('Showing point density'))
+        self.assertGreater(len(traces), 1)
+        self.assertTrue(all(trace['type'] == 'scatter' for trace in traces))
+        columns = result['raw_data']['columns']
+        self.assertIn('Stage', columns)
+        self.assertIn(app_module.BIN_COUNT_COLUMN, columns)
+
+    def test_large_bubble_chart_is_binned_with_average_size(self):
+        result, traces = self.chart_result(
+            'please plot opportunity bubbles sized by amount', chart_type='bubble_chart', size='Value'
+        )
+
+        self.assertTrue(result['chart_warnings'][0].startswith('Showing point density'))
+        columns = result['raw_data']['columns']
+        rows = result['raw_data']['data']
+        self.assertIn('Average Value', columns)
+        # One marker per non-empty cell, and the cells cover every plotted row
+        conn = sqlite3.connect(_db_path)
+        (plotted_rows,) = conn.execute(
+            'SELECT COUNT(*) FROM Opportunity WHERE AccountID IS NOT NULL AND Value IS NOT NULL'
+        ).fetchone()
+        conn.close()
+        counts = [row[columns.index(app_module.BIN_COUNT_COLUMN)] for row in rows]
+        markers = sum(len(trace_values(trace['x'])) for trace in traces)
+        self.assertEqual(markers, len(rows))
+        self.assertEqual(sum(counts), plotted_rows)
+
+    def test_probe_is_skipped_for_3d_color_or_size(self):
+        params = {
+            'chart_type': '3d_scatter_plot', 'table_name': 'Opportunity',
+            'x_axis': 'AccountID', 'y_axis': 'Value', 'z_axis': 'OpportunityID',
+        }
+
+        self.assertIsNotNone(app_module.build_range_probe_query(params))
+        self.assertIsNone(app_module.build_range_probe_query(dict(params, size='Value')))
+        self.assertIsNone(app_module.build_range_probe_query(dict(params, color='Stage')))
+        self.assertIsNotNone(app_module.build_range_probe_query(dict(params, chart_type='bubble_chart', size='Value')))
+
+
+def parse_sse(body):
+    """Server-Sent Events body as a list of (event, decoded data)."""
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+class TestChatStream(ChatAppTestCase):
+    """/chat/stream sends each stage as it is ready, then 'done' (or 'error')."""
+
+    def stream_concurrently(self, messages):
+        async def scenario():
+            transport = httpx.ASGITransport(app=app_module.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                responses = await asyncio.gather(*[
+                    client.post('/chat/stream', json={'message': message, 'language': 'en'}) for message in messages
+                ])
+            for response in responses:
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.headers['content-type'].startswith('text/event-stream'))
+            return [parse_sse(response.text) for response in responses]
+        return asyncio.run(scenario())
+
+    def test_stages_arrive_in_order_then_done(self):
+        (events,) = self.stream_concurrently(['please stream opportunity figures in stages'])
+
+        self.assertEqual([event for event, _ in events], ['params', 'chart', 'raw_data', 'suggestions', 'done'])
+        data = dict(events)
+        self.assertEqual(data['params']['chart_type'], 'bar_chart')
+        self.assertIn('chart_json', data['chart'])
+        self.assertTrue(data['raw_data']['raw_data']['data'])
+        self.assertEqual(data['suggestions']['suggestions'], ['Value by account', 'Value over time'])
+        # The large fields were already streamed and are not repeated
+        self.assertNotIn('chart_json', data['done'])
+        self.assertNotIn('raw_data', data['done'])
+        self.assertEqual(data['done']['chart_type'], 'bar_chart')
+
+    def test_failure_is_an_error_event(self):
+        self.chart_model.reply = 'not a chart'
+
+        (events,) = self.stream_concurrently(['please stream opportunity figures that fail'])
+
+        self.assertEqual([event for event, _ in events], ['error'])
+        self.assertEqual(events[0][1]['error_type'], 'MODEL_OUTPUT_ERROR')
+        self.assertIn('message', events[0][1])
+
+    def test_cache_hit_goes_straight_to_done(self):
+        message = 'please stream opportunity figures twice'
+        (first,) = self.stream_concurrently([message])
+
+        (second,) = self.stream_concurrently([message])
+
+        self.assertEqual([event for event, _ in second], ['done'])
+        self.assertEqual(second[0][1]['chart_json'], dict(first)['chart']['chart_json'])
+        self.assertEqual(self.chart_model.calls, 1)
+
+    def test_coalesced_follower_gets_the_full_response(self):
+        message = 'please stream opportunity figures together'
+
+        streams = self.stream_concurrently([message, message])
+
+        self.assertEqual(self.chart_model.calls, 1)
+        leader, follower = sorted(streams, key=len, reverse=True)
+        self.assertEqual([event for event, _ in follower], ['done'])
+        streamed = {}
+        for event, data in leader:
+            if event in ('chart', 'raw_data', 'suggestions', 'done'):
+                streamed.update(data)
+        self.assertEqual(follower[0][1], streamed)
+
+
+class TestRawDataFormat(ChatAppTestCase):
+    """raw_data is sent column-oriented ({columns, data}) with nulls and ISO dates."""
+
+    def test_rows_are_split_into_columns_and_values(self):
+        rows = pd.DataFrame({
+            'Stage': ['Prospecting', 'Closed Won'],
+            'Sum of Value': [1250.5, np.nan],
+            'ExpectedCloseDate': pd.to_datetime(['2024-03-01', None]),
+        })
+        with patch.object(app_module, 'run_chart_query', return_value=rows):
+            result = self.run_chat_events('please chart opportunity figures as split rows')
+
+        self.assertNotIn('error_type', result)
+        self.assertEqual(result['raw_data'], {
+            'columns': ['Stage', 'Sum of Value', 'ExpectedCloseDate'],
+            'data': [
+                ['Prospecting', 1250.5, '2024-03-01T00:00:00.000'],
+                ['Closed Won', None, None],
+            ],
+        })
+
+
+class TestFollowUpSuggestions(ChatAppTestCase):
+    """Suggestions are generated alongside the chart pipeline and can't fail it."""
+
+    def test_suggestions_run_while_the_data_is_fetched(self):
+        timeline = []
+        suggestions_reply = self.suggestions_model.generate_content
+
+        def record_suggestions(prompt, **kwargs):
+            timeline.append('suggestions started')
+            return suggestions_reply(prompt, **kwargs)
+
+        def slow_query(*args, **kwargs):
+            time.sleep(0.3)
+            timeline.append('query finished')
+            return fetch(*args, **kwargs)
+
+        fetch = app_module.run_chart_query
+        self.suggestions_model.generate_content = record_suggestions
+        with patch.object(app_module, 'run_chart_query', slow_query):
+            result = self.run_chat_events('please chart opportunity figures with suggestions')
+
+        self.assertNotIn('error_type', result)
+        self.assertEqual(result['suggestions'], ['Value by account', 'Value over time'])
+        self.assertEqual(timeline, ['suggestions started', 'query finished'])
+
+    def test_failing_suggestions_still_return_the_chart(self):
+        def fail(prompt, **kwargs):
+            time.sleep(0.1)
+            raise RuntimeError('suggestions model unavailable')
+
+        self.suggestions_model.generate_content = fail
+        result = self.run_chat_events('please chart opportunity figures without suggestions')
+
+        self.assertNotIn('error_type', result)
+        self.assertEqual(result['chart_type'], 'bar_chart')
+        self.assertTrue(result['raw_data']['data'])
+        self.assertEqual(result['suggestions'], [])
+
+
+class TestConcurrentChat(ChatAppTestCase):
+    """Concurrent /chat requests on one app instance overlap instead of queueing."""
+
+    def test_concurrent_requests_overlap(self):
+        # Schema load, engine creation and the first Plotly render are one-off costs
+        self.post_concurrently(['please chart opportunity figures, warm-up'])
+        self.chart_model.calls = 0
+        messages = [f'please chart opportunity figures, variant {i}' for i in range(6)]
+
+        responses, elapsed = self.post_concurrently(messages)
+
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            self.assertNotIn('error_type', body)
+            self.assertEqual(body['chart_type'], 'bar_chart')
+            self.assertTrue(body['raw_data']['data'])
+        self.assertEqual(self.chart_model.calls, len(messages))
+        # Six 300ms Gemini calls run side by side, not one after another
+        self.assertLess(elapsed, 0.3 * len(messages) / 2)
+
+
+class TestLineChartDownsampling(ChatAppTestCase):
+    """Long line series are fetched in x order past the point budget, then downsampled."""
+
+    ROWS = 3000
+
+    @classmethod
+    def setUpClass(cls):
+        # Inserted in shuffled order, so an unordered LIMIT would not return a contiguous x range
+        ids = list(range(1000, 1000 + cls.ROWS))
+        random.Random(5).shuffle(ids)
+        conn = sqlite3.connect(_db_path)
+        conn.executemany(
+            "INSERT INTO Opportunity (OpportunityID, Stage, Value) VALUES (?, 'Trend', ?)",
+            [(opp_id, float(opp_id % 97)) for opp_id in ids]
+        )
+        conn.commit()
+        conn.close()
+
+    def setUp(self):
+        super().setUp()
+        self.chart_model.reply = json.dumps({
+            'chart_type': 'line_chart', 'table_name': 'Opportunity', 'x_axis': 'OpportunityID',
+            'y_axis': 'Value', 'aggregate_y': 'NONE', 'title': 'Value by opportunity',
+        })
+
+    def test_series_is_ordered_by_x_and_downsampled_to_plot_width(self):
+        result = self.run_chat_events('please draw the opportunity value trend line', plot_width=300)
+
+        self.assertNotIn('error_type', result)
+        self.assertEqual(result['chart_type'], 'line_chart')
+        chart = json.loads(result['chart_json']) if isinstance(result['chart_json'], str) else result['chart_json']
+        x = trace_values(chart['data'][0]['x'])
+        self.assertLessEqual(len(x), 300)
+        self.assertEqual(x, sorted(x))
+        # Every row was fetched, not the first 1000
+        self.assertEqual((x[0], x[-1]), (1, 1000 + self.ROWS - 1))
+        # The data table lists the plotted points, not every fetched row
+        columns = result['raw_data']['columns']
+        self.assertEqual([row[columns.index('OpportunityID')] for row in result['raw_data']['data']], x)
+
+    def test_aggregated_series_fetch_the_chart_row_limit(self):
+        params = {'table_name': 'Opportunity', 'x_axis': 'ExpectedCloseDate', 'y_axis': 'Value', 'aggregate_y': 'SUM'}
+
+        line_sql = app_module.build_chart_query(dict(params, chart_type='line_chart'), 'sqlite')
+        bar_sql = app_module.build_chart_query(dict(params, chart_type='bar_chart'), 'sqlite')
+
+        self.assertTrue(line_sql.endswith(f'LIMIT {app_module.DOWNSAMPLE_MAX_ROWS}'))
+        self.assertTrue(bar_sql.endswith('LIMIT 1000'))
+
+
+if __name__ == '__main__':
+    unittest.main()
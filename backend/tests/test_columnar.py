@@ -0,0 +1,169 @@
+"""
+Tests for the in-process columnar (DuckDB) engine.
+Queries built with db_type='duckdb' must return what the same request returns
+on the seeded SQLite fixture.
+"""
+import os
+import random
+import tempfile
+import time
+import unittest
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from backend.columnar import ColumnarEngine, duckdb_available
+from backend.config import ColumnarSettings
+from backend.db_init import init_sqlite_schema
+from backend import seed_sqlite_data
+from backend.safe_sql import (
+    build_binned_sql,
+    build_box_stats_sql,
+    build_range_probe_sql,
+    build_sql,
+    choose_bins,
+    validate_chart_request,
+)
+
+SCHEMA = {
+    'Opportunity': {
+        'all_columns': ['OpportunityID', 'AccountID', 'OpportunityName', 'Stage', 'Value', 'ExpectedCloseDate'],
+        'numerical_columns': ['OpportunityID', 'AccountID', 'Value'],
+        'categorical_columns': ['OpportunityName', 'Stage'],
+        'date_columns': ['ExpectedCloseDate'],
+    },
+}
+COLUMN_TYPES = {
+    'Opportunity': {'OpportunityID': 'int', 'AccountID': 'int', 'OpportunityName': 'nvarchar', 'Stage': 'nvarchar',
+                    'Value': 'decimal', 'ExpectedCloseDate': 'datetime2'},
+}
+
+
+class TestDuckDBDialect(unittest.TestCase):
+
+    def test_limit_quoting_and_double_precision(self):
+        validated = validate_chart_request(
+            {'table_name': 'Opportunity', 'chart_type': 'bar_chart', 'x_axis': 'Stage', 'y_axis': 'Value', 'aggregate_y': 'AVG'},
+            SCHEMA
+        )
+        sql, _ = build_sql(validated, SCHEMA, db_type='duckdb')
+
+        self.assertTrue(sql.startswith('SELECT "Stage", AVG("Value")'))
+        self.assertTrue(sql.endswith('LIMIT 50'))
+        self.assertIn('CAST("Value" AS DOUBLE)', build_range_probe_sql('Opportunity', ['Value'], db_type='duckdb'))
+
+    def test_bucket_index_truncates(self):
+        sql = build_binned_sql('Opportunity', [choose_bins('Value', 0, 100, 10)], db_type='duckdb')
+
+        self.assertIn('CAST(FLOOR((CAST("Value" AS DOUBLE) - 0.0) / 10.0) AS INTEGER)', sql)
+
+
+@unittest.skipUnless(duckdb_available(), 'duckdb not installed')
+class TestColumnarEngine(unittest.TestCase):
+    """DuckDB answers must match SQLite answers for the same chart requests."""
+
+    def setUp(self):
+        """Create and seed a temporary SQLite database and load it into the engine."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self.temp_dir.name, 'source.db')
+        init_sqlite_schema(db_path)
+
+        random.seed(8)
+        self.engine = create_engine(f'sqlite:///{db_path}')
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            seed_sqlite_data.seed_accounts(cursor)
+            seed_sqlite_data.seed_opportunities(cursor)
+            cursor.execute("UPDATE Opportunity SET Stage = 'Prospecting' WHERE OpportunityID % 3 = 0")
+            raw.commit()
+        finally:
+            raw.close()
+
+        self.conn = self.engine.connect()
+        self.columnar = ColumnarEngine(ColumnarSettings(refresh_seconds=60))
+        self.versions = {'Opportunity': 'v1'}
+        self.columnar.refresh(self.conn, COLUMN_TYPES, self.versions.get, db_type='sqlite')
+
+    def tearDown(self):
+        """Clean up temporary database."""
+        self.conn.close()
+        self.engine.dispose()
+        self.temp_dir.cleanup()
+
+    def assert_same_result(self, sqlite_sql, duckdb_sql, sort_by):
+        expected = pd.read_sql(text(sqlite_sql), self.conn).sort_values(sort_by).reset_index(drop=True)
+        actual = self.columnar.query(duckdb_sql).sort_values(sort_by).reset_index(drop=True)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+    def test_aggregates_match_sqlite(self):
+        for aggregate_y in ('SUM', 'AVG', 'COUNT', 'MIN', 'MAX'):
+            validated = validate_chart_request({
+                'table_name': 'Opportunity', 'chart_type': 'bar_chart', 'x_axis': 'Stage', 'y_axis': 'Value',
+                'aggregate_y': aggregate_y
+            }, SCHEMA)
+            self.assert_same_result(
+                build_sql(validated, SCHEMA, db_type='sqlite')[0], build_sql(validated, SCHEMA, db_type='duckdb')[0], 'Stage'
+            )
+
+    def test_box_stats_and_bins_match_sqlite(self):
+        validated = validate_chart_request(
+            {'table_name': 'Opportunity', 'chart_type': 'box_plot', 'x_axis': 'Stage', 'y_axis': 'Value'}, SCHEMA
+        )
+        self.assert_same_result(build_box_stats_sql(validated, 'sqlite'), build_box_stats_sql(validated, 'duckdb'), 'Stage')
+
+        probe = pd.read_sql(text(build_range_probe_sql('Opportunity', ['Value'], 'sqlite')), self.conn).iloc[0]
+        axes = [choose_bins('Value', probe['min_0'], probe['max_0'], 7)]
+        self.assert_same_result(build_binned_sql('Opportunity', axes, 'sqlite'), build_binned_sql('Opportunity', axes, 'duckdb'), 'bin_0')
+
+    def test_reloads_only_changed_tables(self):
+        self.conn.execute(text("DELETE FROM Opportunity"))
+        self.columnar.refresh(self.conn, COLUMN_TYPES, self.versions.get, db_type='sqlite')
+        self.assertEqual(self.columnar.get_stats()['loads'], 1)
+
+        self.versions['Opportunity'] = 'v2'
+        self.columnar.refresh(self.conn, COLUMN_TYPES, self.versions.get, db_type='sqlite')
+        self.assertEqual(self.columnar.get_stats()['tables']['Opportunity']['rows'], 0)
+
+    def test_unchanged_tables_are_reloaded_in_full_periodically(self):
+        # An update the version can't see (row count and markers unchanged)
+        self.conn.execute(text("UPDATE Opportunity SET Stage = 'Closed Won'"))
+        self.columnar.refresh(self.conn, COLUMN_TYPES, self.versions.get, db_type='sqlite')
+        self.assertNotEqual(set(self.columnar.query('SELECT DISTINCT "Stage" FROM "Opportunity"')['Stage']), {'Closed Won'})
+
+        self.columnar.settings.full_reload_seconds = 0
+        self.columnar.refresh(self.conn, COLUMN_TYPES, self.versions.get, db_type='sqlite')
+
+        self.assertEqual(set(self.columnar.query('SELECT DISTINCT "Stage" FROM "Opportunity"')['Stage']), {'Closed Won'})
+        self.assertEqual(self.columnar.get_stats()['full_reloads'], 1)
+
+    def test_version_is_the_one_the_copy_was_loaded_at(self):
+        self.assertEqual(self.columnar.version('Opportunity'), 'v1')
+        self.assertIsNone(self.columnar.version('Lead'))
+
+        self.versions['Opportunity'] = 'v2'
+        self.assertEqual(self.columnar.version('Opportunity'), 'v1')
+        self.columnar.refresh(self.conn, COLUMN_TYPES, self.versions.get, db_type='sqlite')
+        self.assertEqual(self.columnar.version('Opportunity'), 'v2')
+
+    def test_freshness_is_the_age_of_the_loaded_copy(self):
+        self.columnar.settings.max_staleness_seconds = 0.01
+        time.sleep(0.02)
+        # A change check that finds the version unchanged does not make the copy fresh again
+        self.columnar.refresh(self.conn, COLUMN_TYPES, self.versions.get, db_type='sqlite')
+
+        self.assertFalse(self.columnar.covers('Opportunity', ['Stage']))
+
+    def test_coverage(self):
+        self.assertTrue(self.columnar.covers('Opportunity', ['Stage', 'Value']))
+        self.assertFalse(self.columnar.covers('Opportunity', ['Probability']))
+        self.assertFalse(self.columnar.covers('Lead', ['Status']))
+
+        self.columnar.settings.max_rows = 5
+        self.versions['Opportunity'] = 'v2'
+        self.columnar.refresh(self.conn, COLUMN_TYPES, self.versions.get, db_type='sqlite')
+        self.assertFalse(self.columnar.covers('Opportunity', ['Stage']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Tests for connection pool settings, metrics and warm-up.
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from backend.config import PoolSettings, get_pool_settings
+from backend.db_backend import DatabaseBackend
+from backend.db_pool import LatencyHistogram, PoolMetrics, warm_pool
+
+
+class TestPoolSettings(unittest.TestCase):
+
+    def test_from_environment(self):
+        env = {'SQL_POOL_SIZE': '3', 'SQL_POOL_MAX_OVERFLOW': '0', 'SQL_POOL_TIMEOUT': '2.5',
+               'SQL_POOL_PRE_PING': 'false', 'SQL_POOL_WARM_CONNECTIONS': '8'}
+        with patch.dict(os.environ, env, clear=True):
+            pool = get_pool_settings()
+
+        self.assertEqual((pool.size, pool.max_overflow, pool.timeout, pool.pre_ping), (3, 0, 2.5, False))
+        # Never warm more connections than the pool can hold
+        self.assertEqual(pool.warm_connections, 3)
+
+    def test_invalid_values_fall_back_to_defaults(self):
+        with patch.dict(os.environ, {'SQL_POOL_SIZE': 'many', 'SQL_POOL_TIMEOUT': '-1'}, clear=True):
+            self.assertEqual(get_pool_settings(), PoolSettings())
+
+
+class TestPoolMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        pool = PoolSettings(size=2, max_overflow=0, timeout=0.05)
+        backend = DatabaseBackend('sqlite', f"sqlite:///{os.path.join(self.temp_dir.name, 'chart.db')}", pool=pool)
+        self.engine = backend.create_engine()
+        self.metrics = PoolMetrics(self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.temp_dir.cleanup()
+
+    def test_pool_is_sized_by_settings(self):
+        self.assertEqual(self.engine.pool.size(), 2)
+        self.assertEqual(self.engine.pool.timeout(), 0.05)
+
+    def test_checkouts_connects_and_occupancy(self):
+        with self.metrics.connect() as conn:
+            conn.execute(text('SELECT 1'))
+            self.assertEqual(self.metrics.get_stats()['checkedout'], 1)
+        with self.metrics.connect():
+            pass
+
+        stats = self.metrics.get_stats()
+        self.assertEqual((stats['connects'], stats['checkouts'], stats['checkedout'], stats['checkedin']), (1, 2, 0, 1))
+        self.assertEqual(stats['checkout_wait']['count'], 2)
+        self.assertEqual(stats['connect_latency']['count'], 1)
+
+    def test_exhausted_pool_counts_timeouts(self):
+        held = [self.metrics.connect(), self.metrics.connect()]
+        try:
+            with self.assertRaises(PoolTimeoutError):
+                self.metrics.connect()
+        finally:
+            for conn in held:
+                conn.close()
+
+        stats = self.metrics.get_stats()
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertGreaterEqual(stats['checkout_wait']['max_ms'], 50)
+
+    def test_invalidations(self):
+        with self.metrics.connect() as conn:
+            conn.invalidate()
+
+        self.assertEqual(self.metrics.get_stats()['invalidations'], 1)
+
+    def test_warm_pool_leaves_connections_open(self):
+        self.assertEqual(warm_pool(self.engine, 2), 2)
+
+        stats = self.metrics.get_stats()
+        self.assertEqual((stats['connects'], stats['checkedin']), (2, 2))
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_buckets_are_cumulative(self):
+        histogram = LatencyHistogram(bounds_ms=(10, 100))
+        for ms in (1, 10, 50, 500):
+            histogram.observe(ms)
+
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['buckets_ms'], {'10': 2, '100': 3, '+Inf': 4})
+        self.assertEqual((snapshot['count'], snapshot['sum_ms'], snapshot['max_ms']), (4, 561.0, 500.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
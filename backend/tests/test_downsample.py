@@ -0,0 +1,109 @@
+"""
+Tests for line/area chart downsampling.
+"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from backend.downsample import (
+    downsample_frame,
+    lttb_indices,
+    minmax_indices,
+    target_points,
+)
+
+
+class TestIndices(unittest.TestCase):
+
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        x = np.arange(10000, dtype=float)
+        y = np.zeros(10000)
+        y[4321] = 50.0
+
+        kept = lttb_indices(x, y, 100)
+
+        self.assertEqual(len(kept), 100)
+        self.assertEqual(kept[0], 0)
+        self.assertEqual(kept[-1], 9999)
+        self.assertIn(4321, kept)
+        self.assertTrue(np.all(np.diff(kept) > 0))
+
+    def test_minmax_keeps_extremes_of_every_bucket(self):
+        y = np.sin(np.arange(10000) / 50.0)
+        y[777] = -5.0
+        y[8888] = 5.0
+
+        kept = minmax_indices(y, 200)
+
+        self.assertLessEqual(len(kept), 200)
+        self.assertIn(777, kept)
+        self.assertIn(8888, kept)
+        self.assertEqual(kept[0], 0)
+        self.assertEqual(kept[-1], 9999)
+
+    def test_short_series_are_untouched(self):
+        self.assertEqual(list(lttb_indices(np.arange(5.0), np.arange(5.0), 10)), [0, 1, 2, 3, 4])
+        self.assertEqual(list(minmax_indices(np.arange(5.0), 10)), [0, 1, 2, 3, 4])
+
+
+class TestDownsampleFrame(unittest.TestCase):
+
+    def test_time_series_reduced_to_budget(self):
+        n = 50000
+        df = pd.DataFrame({
+            'Date': pd.date_range('2020-01-01', periods=n, freq='min'),
+            'Revenue': np.sin(np.arange(n) / 500.0),
+        })
+
+        for method in ('lttb', 'minmax'):
+            out = downsample_frame(df, 'Date', 'Revenue', 1000, method=method)
+            self.assertLessEqual(len(out), 1000)
+            self.assertGreater(len(out), 900)
+            self.assertTrue(out['Date'].is_monotonic_increasing)
+            self.assertAlmostEqual(out['Revenue'].max(), df['Revenue'].max(), places=3)
+
+    def test_unsorted_x_keeps_original_row_order(self):
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({'x': rng.permutation(5000), 'y': rng.random(5000)})
+
+        out = downsample_frame(df, 'x', 'y', 500)
+
+        self.assertTrue(out.index.is_monotonic_increasing)
+        self.assertIn(df['x'].idxmin(), out.index)
+        self.assertIn(df['x'].idxmax(), out.index)
+
+    def test_color_groups_share_the_budget(self):
+        df = pd.DataFrame({
+            'x': np.tile(np.arange(3000), 2),
+            'y': np.random.default_rng(1).random(6000),
+            'Region': ['North'] * 3000 + ['South'] * 3000,
+        })
+
+        out = downsample_frame(df, 'x', 'y', 600, color_col='Region')
+
+        counts = out['Region'].value_counts()
+        self.assertEqual(set(counts.index), {'North', 'South'})
+        self.assertEqual(counts['North'], 300)
+        self.assertEqual(counts['South'], 300)
+
+    def test_small_or_non_numeric_frames_are_returned_unchanged(self):
+        small = pd.DataFrame({'x': range(10), 'y': range(10)})
+        self.assertIs(downsample_frame(small, 'x', 'y', 100), small)
+
+        labels = pd.DataFrame({'x': range(500), 'y': ['a'] * 500})
+        self.assertIs(downsample_frame(labels, 'x', 'y', 100), labels)
+
+
+class TestTargetPoints(unittest.TestCase):
+
+    def test_budget_follows_width_in_steps(self):
+        self.assertEqual(target_points(None), 1000)
+        self.assertEqual(target_points(1366), 1400)
+        self.assertEqual(target_points(1310), target_points(1390))
+        self.assertEqual(target_points(10), 100)
+        self.assertEqual(target_points(10 ** 6), 10000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Load tests for the request thread pools.
+Concurrent slow calls must overlap and leave the event loop responsive.
+"""
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from backend import executors
+from backend.config import ExecutorSettings, get_executor_settings
+
+
+class TestExecutors(unittest.TestCase):
+
+    def test_concurrent_llm_calls_do_not_serialize(self):
+        """Eight 200ms blocking calls finish in far less than 8 x 200ms."""
+        delay = 0.2
+        concurrency = min(8, executors.LLM_POOL_SIZE)
+
+        async def scenario():
+            heartbeats = 0
+            done = asyncio.Event()
+
+            async def heartbeat():
+                nonlocal heartbeats
+                while not done.is_set():
+                    heartbeats += 1
+                    await asyncio.sleep(0.01)
+
+            ticker = asyncio.create_task(heartbeat())
+            started = time.perf_counter()
+            await asyncio.gather(*[executors.run_llm(time.sleep, delay) for _ in range(concurrency)])
+            elapsed = time.perf_counter() - started
+            done.set()
+            await ticker
+            return elapsed, heartbeats
+
+        elapsed, heartbeats = asyncio.run(scenario())
+
+        self.assertLess(elapsed, delay * concurrency / 2)
+        # The loop kept running other coroutines while the calls were blocked
+        self.assertGreater(heartbeats, 5)
+
+    def test_pools_are_independent(self):
+        """A saturated LLM pool does not delay database work."""
+        async def scenario():
+            blockers = [executors.run_llm(time.sleep, 0.3) for _ in range(executors.LLM_POOL_SIZE * 2)]
+            pending = asyncio.gather(*blockers)
+            await asyncio.sleep(0.01)
+            started = time.perf_counter()
+            result = await executors.run_db(sum, [1, 2, 3])
+            db_elapsed = time.perf_counter() - started
+            await pending
+            return result, db_elapsed
+
+        result, db_elapsed = asyncio.run(scenario())
+
+        self.assertEqual(result, 6)
+        self.assertLess(db_elapsed, 0.1)
+
+    def test_executor_stats(self):
+        stats = executors.get_executor_stats()
+        self.assertEqual(set(stats), {'llm', 'db', 'render'})
+        self.assertEqual(stats['llm']['max_workers'], executors.LLM_POOL_SIZE)
+        self.assertEqual(stats['db']['max_workers'], executors.DB_POOL_SIZE)
+
+
+class TestExecutorSettings(unittest.TestCase):
+
+    def test_from_environment(self):
+        env = {'LLM_POOL_SIZE': '16', 'RENDER_POOL_SIZE': '2', 'SQL_POOL_SIZE': '3', 'SQL_POOL_MAX_OVERFLOW': '1'}
+        with patch.dict(os.environ, env, clear=True):
+            settings = get_executor_settings()
+
+        # DB threads follow the connection pool unless DB_POOL_SIZE is set
+        self.assertEqual((settings.llm_workers, settings.db_workers, settings.render_workers), (16, 4, 2))
+
+    def test_invalid_values_fall_back_to_defaults(self):
+        with patch.dict(os.environ, {'LLM_POOL_SIZE': 'lots', 'DB_POOL_SIZE': '0', 'RENDER_POOL_SIZE': '-2'}, clear=True):
+            self.assertEqual(get_executor_settings(), ExecutorSettings())
+
+
+if __name__ == '__main__':
+    unittest.main()
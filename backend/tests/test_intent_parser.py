@@ -0,0 +1,129 @@
+"""
+Tests for the rule-based chart intent parser.
+"""
+import unittest
+
+from backend.intent_parser import IntentParser, split_identifier, tokenize
+
+
+SCHEMAS = {
+    'Account': {
+        'all_columns': ['AccountID', 'AccountName', 'Region', 'Industry', 'Revenue', 'CreatedDate'],
+        'numerical_columns': ['AccountID', 'Revenue'],
+        'date_columns': ['CreatedDate'],
+        'categorical_columns': ['AccountName', 'Region', 'Industry'],
+    },
+    'Contact': {
+        'all_columns': ['ContactID', 'AccountID', 'FullName', 'Role', 'Email', 'CreatedDate'],
+        'numerical_columns': ['ContactID', 'AccountID'],
+        'date_columns': ['CreatedDate'],
+        'categorical_columns': ['FullName', 'Role', 'Email'],
+    },
+    'Lead': {
+        'all_columns': ['LeadID', 'AccountID', 'LeadSource', 'Status', 'Budget', 'CreatedDate'],
+        'numerical_columns': ['LeadID', 'AccountID', 'Budget'],
+        'date_columns': ['CreatedDate'],
+        'categorical_columns': ['LeadSource', 'Status'],
+    },
+    'Opportunity': {
+        'all_columns': ['OpportunityID', 'AccountID', 'OpportunityName', 'Stage', 'Value', 'ExpectedCloseDate'],
+        'numerical_columns': ['OpportunityID', 'AccountID', 'Value'],
+        'date_columns': ['ExpectedCloseDate'],
+        'categorical_columns': ['OpportunityName', 'Stage'],
+    },
+}
+
+CHART_TYPE_MAPPING = {
+    'bar': 'bar_chart', 'bar chart': 'bar_chart',
+    'pie': 'pie_chart', 'pie chart': 'pie_chart',
+    'line': 'line_chart', 'line chart': 'line_chart',
+    'histogram': 'histogram',
+    'scatter': 'scatter_plot', 'scatter plot': 'scatter_plot',
+}
+
+
+class TestTokenizer(unittest.TestCase):
+
+    def test_split_identifier(self):
+        self.assertEqual(split_identifier('LeadSource'), ['Lead', 'Source'])
+        self.assertEqual(split_identifier('AccountID'), ['Account', 'ID'])
+        self.assertEqual(split_identifier('ExpectedCloseDate'), ['Expected', 'Close', 'Date'])
+
+    def test_tokenize_singularizes(self):
+        self.assertEqual(tokenize('Opportunities by Stages?'), ['opportunity', 'by', 'stage'])
+
+
+class TestIntentParser(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = IntentParser(CHART_TYPE_MAPPING)
+
+    def parse(self, message, **kwargs):
+        return self.parser.parse(message, SCHEMAS, **kwargs)
+
+    def test_measure_by_dimension(self):
+        params = self.parse('Total revenue by region')
+        self.assertEqual(params['table_name'], 'Account')
+        self.assertEqual(params['chart_type'], 'bar_chart')
+        self.assertEqual((params['x_axis'], params['y_axis'], params['aggregate_y']), ('Region', 'Revenue', 'SUM'))
+        self.assertEqual(params['title'], 'Total Revenue by Region')
+
+    def test_aggregation_and_chart_synonyms(self):
+        params = self.parse('Show me average revenue per industry as a pie chart')
+        self.assertEqual(params['chart_type'], 'pie_chart')
+        self.assertEqual((params['x_axis'], params['aggregate_y']), ('Industry', 'AVG'))
+
+    def test_row_count_of_mentioned_table(self):
+        params = self.parse('How many leads by lead source?')
+        self.assertEqual(params['table_name'], 'Lead')
+        self.assertEqual((params['x_axis'], params['y_axis'], params['aggregate_y']), ('LeadSource', 'LeadID', 'COUNT'))
+        self.assertEqual(params['title'], 'Number of Leads by Lead Source')
+
+    def test_time_dimension_uses_date_column_and_line_chart(self):
+        params = self.parse('opportunity value over time')
+        self.assertEqual(params['x_axis'], 'ExpectedCloseDate')
+        self.assertEqual(params['chart_type'], 'line_chart')
+
+    def test_forced_chart_type_wins(self):
+        params = self.parse('revenue by region', forced_chart_type='donut_chart')
+        self.assertEqual(params['chart_type'], 'donut_chart')
+
+    def test_falls_back_when_unsure(self):
+        for message in [
+            'Top 10 accounts by revenue',            # dimension is numeric
+            'revenue by region excluding europe',    # too many unexplained words
+            'count by created date',                 # date column exists in every table
+            'histogram of revenue',                  # chart type not supported
+            'revenue by region and industry',        # two dimensions
+            'revenue',                               # no dimension
+        ]:
+            self.assertIsNone(self.parse(message), message)
+
+    def test_filter_values_go_to_gemini(self):
+        for message in [
+            'revenue by region for EMEA',
+            'average value by stage for Q1',
+            'revenue by region in europe',
+            'total revenue by industry 2024',
+            'Revenue by region Europe',
+        ]:
+            self.assertIsNone(self.parse(message), message)
+
+    def test_unexplained_filler_words_are_tolerated(self):
+        params = self.parse('Total sales revenue by region')
+        self.assertEqual((params['x_axis'], params['y_axis']), ('Region', 'Revenue'))
+        self.assertIsNotNone(self.parse('Show me average revenue per industry as a pie chart'))
+
+    def test_non_english_goes_to_gemini(self):
+        self.assertIsNone(self.parse('revenue by region', language='ar'))
+
+    def test_hit_rate(self):
+        self.parse('revenue by region')
+        self.parse('budget by status')
+        self.parse('Top 10 accounts by revenue')
+        self.parse('pipeline health')
+        self.assertEqual(self.parser.get_stats(), {'hits': 2, 'misses': 2, 'hit_rate': 0.5})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Tests for single-pass response encoding.
+"""
+import copy
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.utils import PlotlyJSONEncoder
+
+from backend.json_encoding import RawJSON, encode_json, encode_json_text
+
+
+class TestEncodeJson(unittest.TestCase):
+
+    def test_raw_json_values_are_spliced_verbatim(self):
+        figure = RawJSON('{"data":[{"type":"bar","y":[1,2]}]}')
+        payload = {'chart_json': figure, 'title': 'Revenue "by" region', 'suggestions': ['a']}
+
+        text = encode_json_text(payload)
+
+        self.assertIn('"chart_json": {"data":[{"type":"bar","y":[1,2]}]}', text)
+        self.assertEqual(json.loads(text), {
+            'chart_json': {'data': [{'type': 'bar', 'y': [1, 2]}]},
+            'title': 'Revenue "by" region',
+            'suggestions': ['a'],
+        })
+
+    def test_raw_json_payload_is_returned_as_is(self):
+        body = RawJSON('{"chart_type": "bar_chart"}')
+        self.assertEqual(encode_json(body), b'{"chart_type": "bar_chart"}')
+
+    def test_plain_payloads_handle_numpy_and_pandas(self):
+        payload = {'values': np.array([1, 2]), 'when': pd.Timestamp('2024-01-02')}
+        decoded = json.loads(encode_json(payload))
+        self.assertEqual(decoded['values'], [1, 2])
+        self.assertTrue(decoded['when'].startswith('2024-01-02'))
+
+    def test_figure_matches_two_pass_encoding(self):
+        fig = go.Figure(go.Bar(x=['a', 'b'], y=np.array([1.5, 2.5])))
+        payload = {'chart_json': RawJSON(pio.to_json(fig, validate=False)), 'chart_type': 'bar_chart'}
+
+        decoded = json.loads(encode_json(payload))
+
+        expected = json.loads(json.dumps(fig.to_plotly_json(), cls=PlotlyJSONEncoder))
+        self.assertEqual(decoded['chart_json'], expected)
+        self.assertEqual(decoded['chart_type'], 'bar_chart')
+
+    def test_deepcopy_keeps_raw_marker(self):
+        copied = copy.deepcopy({'chart_json': RawJSON('{}')})
+        self.assertIsInstance(copied['chart_json'], RawJSON)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+Tests for the thread-local SQLite connections behind the shared local stores.
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+from backend.local_sqlite import LocalSQLite
+
+
+class TestLocalSQLite(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.sqlite = LocalSQLite(os.path.join(self.temp_dir.name, 'nested', 'store.db'))
+
+    def test_one_wal_connection_per_thread(self):
+        conn = self.sqlite.connect()
+        self.assertIs(self.sqlite.connect(), conn)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.sqlite.connect()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], conn)
+
+    def test_writes_are_visible_to_other_threads(self):
+        self.sqlite.connect().execute("CREATE TABLE t (v INTEGER)")
+        self.sqlite.connect().execute("INSERT INTO t VALUES (1)")
+
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(self.sqlite.connect().execute("SELECT v FROM t").fetchall()))
+        thread.start()
+        thread.join()
+        self.assertEqual(seen, [[(1,)]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests for the canonicalized chart parameter cache.
+"""
+import time
+import unittest
+
+from backend.intent_parser import chart_type_phrases
+from backend.param_cache import ParamCache, canonicalize
+from backend.tests.test_intent_parser import CHART_TYPE_MAPPING, SCHEMAS
+
+
+PARAMS = {'table_name': 'Account', 'chart_type': 'bar_chart', 'x_axis': 'Region', 'y_axis': 'Revenue', 'title': 'Revenue by Region'}
+
+
+class TestCanonicalize(unittest.TestCase):
+
+    def setUp(self):
+        self.phrases = chart_type_phrases(CHART_TYPE_MAPPING)
+
+    def canonical(self, message):
+        return canonicalize(message, SCHEMAS, self.phrases)
+
+    def test_paraphrases_share_canonical_form(self):
+        expected = self.canonical('show revenue by region')
+        self.assertEqual(self.canonical('revenue per region'), expected)
+        self.assertEqual(self.canonical('Revenue by Region please'), expected)
+        self.assertEqual(expected[0], ('col:revenue', 'by', 'col:region'))
+
+    def test_column_and_table_names_are_resolved(self):
+        signature, _ = self.canonical('how many leads per source')
+        self.assertEqual(signature, ('agg:count', 'table:lead', 'by', 'col:leadsource'))
+
+    def test_meaningful_differences_change_signature(self):
+        base = self.canonical('revenue by region')[0]
+        self.assertNotEqual(self.canonical('region by revenue')[0], base)
+        self.assertNotEqual(self.canonical('average revenue by region')[0], base)
+        self.assertNotEqual(self.canonical('revenue by region pie chart')[0], base)
+        self.assertNotEqual(self.canonical('top 5 accounts by revenue')[0],
+                            self.canonical('top 10 accounts by revenue')[0])
+
+
+class TestParamCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = ParamCache(CHART_TYPE_MAPPING)
+        self.cache.put('show revenue by region', SCHEMAS, 'en', None, 'v1', PARAMS)
+
+    def get(self, message, language='en', forced=None, version='v1'):
+        return self.cache.get(message, SCHEMAS, language, forced, version)
+
+    def test_paraphrase_hits(self):
+        self.assertEqual(self.get('Revenue per Region please'), PARAMS)
+        self.assertEqual(self.get('revenue by region for managers'), PARAMS)
+        self.assertEqual(self.cache.get_stats()['similar_hits'], 1)
+
+    def test_returns_copy(self):
+        self.get('revenue by region')['y_axis'] = 'Sum of Revenue'
+        self.assertEqual(self.get('revenue by region')['y_axis'], 'Revenue')
+
+    def test_context_must_match(self):
+        self.assertIsNone(self.get('revenue by region', language='ar'))
+        self.assertIsNone(self.get('revenue by region', forced='pie_chart'))
+        self.assertIsNone(self.get('revenue by region', version='v2'))
+        self.assertIsNone(self.get('average revenue by region'))
+        self.assertIsNone(self.get('revenue by region excluding emea and apac'))
+
+    def test_ttl_and_capacity(self):
+        cache = ParamCache(CHART_TYPE_MAPPING, ttl=0.01, max_entries=2)
+        cache.put('revenue by region', SCHEMAS, 'en', None, 'v1', PARAMS)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('revenue by region', SCHEMAS, 'en', None, 'v1'))
+
+        cache = ParamCache(CHART_TYPE_MAPPING, max_entries=2)
+        for message in ['revenue by region', 'revenue by industry', 'budget by status']:
+            cache.put(message, SCHEMAS, 'en', None, 'v1', PARAMS)
+        self.assertEqual(cache.get_stats()['entries'], 2)
+        self.assertIsNone(cache.get('revenue by region', SCHEMAS, 'en', None, 'v1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
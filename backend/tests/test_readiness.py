@@ -0,0 +1,81 @@
+"""
+Tests for the startup warm-up that gates worker readiness.
+"""
+import asyncio
+import unittest
+
+from backend.readiness import Readiness
+
+
+def step_returning(*outcomes):
+    """Async step that raises or returns the given outcomes in turn."""
+    remaining = list(outcomes)
+
+    async def step():
+        outcome = remaining.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return step
+
+
+class TestReadiness(unittest.TestCase):
+
+    def test_ready_after_all_steps(self):
+        readiness = Readiness()
+        self.assertFalse(readiness.get_status()['ready'])
+
+        asyncio.run(readiness.warm_up([
+            ('database_pool', step_returning('2/2 connections'), True),
+            ('schema_cache', step_returning('4 tables'), True),
+        ]))
+
+        status = readiness.get_status()
+        self.assertTrue(status['ready'])
+        self.assertEqual(status['steps']['schema_cache']['detail'], '4 tables')
+        self.assertIn('startup_seconds', status)
+
+    def test_required_steps_are_retried_until_they_succeed(self):
+        readiness = Readiness()
+        database = step_returning(RuntimeError('login timeout'), RuntimeError('login timeout'), '1/1 connections')
+
+        asyncio.run(readiness.warm_up([('database_pool', database, True)], retry_seconds=0))
+
+        record = readiness.get_status()['steps']['database_pool']
+        self.assertTrue(readiness.ready)
+        self.assertEqual((record['ok'], record['attempts']), (True, 3))
+        self.assertNotIn('error', record)
+
+    def test_optional_step_failure_does_not_block_readiness(self):
+        readiness = Readiness()
+
+        asyncio.run(readiness.warm_up([
+            ('gemini_client', step_returning(ConnectionError('unreachable')), False),
+            ('chart_renderer', step_returning('rendered'), False),
+        ]))
+
+        steps = readiness.get_status()['steps']
+        self.assertTrue(readiness.ready)
+        self.assertEqual(steps['gemini_client']['error'], 'ConnectionError: unreachable')
+        self.assertEqual(steps['gemini_client']['attempts'], 1)
+        self.assertTrue(steps['chart_renderer']['ok'])
+
+    def test_not_ready_while_required_step_fails(self):
+        readiness = Readiness()
+
+        async def warm_up_briefly():
+            task = asyncio.create_task(readiness.warm_up(
+                [('database_pool', step_returning(*[RuntimeError('down')] * 100), True)], retry_seconds=0.01
+            ))
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        asyncio.run(warm_up_briefly())
+
+        status = readiness.get_status()
+        self.assertFalse(status['ready'])
+        self.assertFalse(status['steps']['database_pool']['ok'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+Tests for the local read replica.
+A seeded SQLite database stands in for Azure SQL; after every sync the replica
+tables must hold exactly the source rows.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, text
+
+from backend.config import ReplicaSettings, get_replica_settings
+from backend.db_init import init_sqlite_schema
+from backend import seed_sqlite_data
+from backend.replica import SnapshotReplica, build_copy_sql
+
+COLUMN_TYPES = {
+    'Account': {'AccountID': 'int', 'AccountName': 'nvarchar', 'Region': 'nvarchar', 'Industry': 'nvarchar',
+                'Revenue': 'decimal', 'CreatedDate': 'datetime2'},
+    'Lead': {'LeadID': 'int', 'AccountID': 'int', 'LeadSource': 'nvarchar', 'Status': 'nvarchar',
+             'Budget': 'decimal', 'CreatedDate': 'datetime2', 'Score': 'int'},
+}
+
+
+class TestSnapshotReplica(unittest.TestCase):
+    """Replica tables must equal the source tables after full and incremental syncs."""
+
+    def setUp(self):
+        """Create and seed a temporary source database and an empty replica."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_path = os.path.join(self.temp_dir.name, 'source.db')
+        init_sqlite_schema(self.source_path)
+
+        random.seed(11)
+        conn = sqlite3.connect(self.source_path)
+        seed_sqlite_data.seed_accounts(conn.cursor())
+        seed_sqlite_data.seed_leads(conn.cursor())
+        conn.commit()
+        conn.close()
+
+        self.engine = create_engine(f'sqlite:///{self.source_path}')
+        self.conn = self.engine.connect()
+        self.replica = SnapshotReplica(ReplicaSettings(
+            sync_seconds=0, batch_rows=7, sqlite_path=os.path.join(self.temp_dir.name, 'replica.db')
+        ))
+
+    def tearDown(self):
+        """Clean up temporary databases."""
+        self.conn.close()
+        self.engine.dispose()
+        self.temp_dir.cleanup()
+
+    def sync(self):
+        self.replica.sync(self.conn, COLUMN_TYPES, db_type='sqlite')
+
+    def assert_replica_matches_source(self):
+        replica = sqlite3.connect(self.replica.path)
+        try:
+            for table in COLUMN_TYPES:
+                query = f'SELECT * FROM "{table}" ORDER BY 1'
+                expected = self.conn.execute(text(query)).fetchall()
+                self.assertEqual(replica.execute(query).fetchall(), [tuple(row) for row in expected], table)
+        finally:
+            replica.close()
+
+    def test_full_sync_copies_every_row(self):
+        self.sync()
+
+        self.assert_replica_matches_source()
+        stats = self.replica.get_stats()
+        self.assertEqual(stats['full_syncs'], 2)
+        self.assertEqual(stats['tables']['Account']['rows'], self.conn.execute(text('SELECT COUNT(*) FROM Account')).scalar())
+
+    def test_incremental_sync_appends_new_rows(self):
+        self.sync()
+        self.conn.execute(text(
+            "INSERT INTO Account (AccountID, AccountName, Region, Revenue, CreatedDate) VALUES "
+            "(10001, 'New A', 'North', 12.5, '2030-01-01'), (10002, 'New B', NULL, NULL, NULL)"
+        ))
+        self.conn.commit()
+
+        self.sync()
+
+        self.assert_replica_matches_source()
+        stats = self.replica.get_stats()
+        self.assertEqual((stats['full_syncs'], stats['syncs']), (2, 2))
+
+    def test_deleted_rows_trigger_full_copy(self):
+        self.sync()
+        self.conn.execute(text("DELETE FROM Lead WHERE LeadID IN (SELECT MIN(LeadID) FROM Lead)"))
+        self.conn.commit()
+
+        self.sync()
+
+        self.assert_replica_matches_source()
+        stats = self.replica.get_stats()
+        self.assertEqual((stats['full_syncs'], stats['syncs']), (3, 1))
+
+    def test_freshness_follows_table_budget_and_columns(self):
+        self.assertFalse(self.replica.is_fresh('Account'))
+        self.sync()
+
+        self.assertTrue(self.replica.is_fresh('Account', ['Region', 'Revenue']))
+        # Score exists only in the source schema, so charts over it read the source
+        self.assertFalse(self.replica.is_fresh('Lead', ['Score']))
+
+        self.replica.settings.table_staleness_seconds = {'Lead': 0}
+        with patch('backend.replica.time.time', return_value=self.replica._load_state('Lead')['synced_at'] + 1):
+            self.assertFalse(self.replica.is_fresh('Lead', ['Status']))
+            self.assertTrue(self.replica.is_fresh('Account', ['Region']))
+
+    def test_sqlserver_dialect(self):
+        sql = build_copy_sql('Lead', ['LeadID', 'Status'], 'LeadID', db_type='sqlserver', incremental=True)
+
+        self.assertEqual(
+            sql, 'SELECT [LeadID], [Status] FROM [Lead] WHERE [LeadID] <= :high AND [LeadID] > :low ORDER BY [LeadID]'
+        )
+
+
+class TestReplicaSettings(unittest.TestCase):
+
+    def test_table_staleness_budgets_from_environment(self):
+        env = {'REPLICA_SYNC_SECONDS': '60', 'REPLICA_TABLE_STALENESS_SECONDS': 'Opportunity=30, Account=3600,Lead=soon'}
+        with patch.dict(os.environ, env, clear=True):
+            settings = get_replica_settings()
+
+        self.assertEqual(settings.sync_seconds, 60)
+        self.assertEqual(settings.staleness_budget('Opportunity'), 30)
+        self.assertEqual(settings.staleness_budget('Account'), 3600)
+        self.assertEqual(settings.staleness_budget('Lead'), settings.max_staleness_seconds)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests for the bounded LRU/TTL response cache.
+"""
+import threading
+import time
+import unittest
+
+from backend.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_get_put_and_stats(self):
+        cache = ResponseCache(ttl=60, max_entries=10, max_bytes=1000)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', {'chart_json': {}}, size=100)
+
+        self.assertEqual(cache.get('a'), {'chart_json': {}})
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries'], stats['bytes']), (1, 1, 1, 100))
+
+    def test_true_lru_eviction_by_entry_count(self):
+        cache = ResponseCache(ttl=60, max_entries=2, max_bytes=1000)
+        cache.put('a', 1, size=1)
+        cache.put('b', 2, size=1)
+        cache.get('a')  # 'b' is now least recently used
+        cache.put('c', 3, size=1)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_byte_budget(self):
+        cache = ResponseCache(ttl=60, max_entries=100, max_bytes=250)
+        cache.put('a', 'x', size=100)
+        cache.put('b', 'y', size=100)
+        cache.put('c', 'z', size=100)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get_stats()['bytes'], 200)
+
+        # A single oversized value is rejected instead of flushing the cache
+        self.assertFalse(cache.put('huge', 'big', size=1000))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get_stats()['rejected'], 1)
+
+    def test_replacing_a_key_updates_bytes(self):
+        cache = ResponseCache(ttl=60, max_entries=10, max_bytes=1000)
+        cache.put('a', 'x', size=300)
+        cache.put('a', 'y', size=50)
+        self.assertEqual(cache.get_stats()['bytes'], 50)
+        self.assertEqual(cache.get('a'), 'y')
+
+    def test_ttl_expiry(self):
+        cache = ResponseCache(ttl=0.01, max_entries=10, max_bytes=1000)
+        cache.put('a', 'x', size=10)
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get('a'))
+        stats = cache.get_stats()
+        self.assertEqual((stats['expirations'], stats['entries'], stats['bytes']), (1, 0, 0))
+
+    def test_discarded_stale_hit_counts_as_miss(self):
+        cache = ResponseCache(ttl=60, max_entries=10, max_bytes=1000)
+        cache.put('a', 'x', size=10)
+        cache.get('a')
+        cache.discard('a')
+
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate'], stats['entries']), (0, 1, 0.0, 0))
+
+    def test_default_sizer(self):
+        cache = ResponseCache(ttl=60, max_entries=10, max_bytes=1000, sizer=len)
+        cache.put('a', 'abcd')
+        self.assertEqual(cache.get_stats()['bytes'], 4)
+
+    def test_concurrent_access_keeps_accounting_consistent(self):
+        cache = ResponseCache(ttl=60, max_entries=50, max_bytes=10_000)
+
+        def worker(offset):
+            for i in range(500):
+                key = (offset + i) % 80
+                if cache.get(key) is None:
+                    cache.put(key, key, size=(key % 7) + 1)
+
+        threads = [threading.Thread(target=worker, args=(n * 13,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = cache.get_stats()
+        self.assertLessEqual(stats['entries'], 50)
+        self.assertEqual(stats['bytes'], sum(size for _, _, size in cache._entries.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
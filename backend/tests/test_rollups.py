@@ -0,0 +1,182 @@
+"""
+Tests for pre-aggregated rollups.
+Answers from RollupStore must match safe_sql.build_sql run against the base
+table on the seeded SQLite fixture, before and after incremental refreshes.
+"""
+import os
+import random
+import tempfile
+import unittest
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from backend.config import RollupSettings
+from backend.db_init import init_sqlite_schema
+from backend import seed_sqlite_data
+from backend.rollups import RollupStore, build_cardinality_sql, build_rollup_sql, rollup_specs_from_schema
+from backend.safe_sql import build_sql, validate_chart_request
+
+SCHEMA = {
+    'Account': {
+        'all_columns': ['AccountID', 'AccountName', 'Region', 'Industry', 'Revenue', 'CreatedDate'],
+        'numerical_columns': ['AccountID', 'Revenue'],
+        'categorical_columns': ['AccountName', 'Region', 'Industry'],
+        'date_columns': ['CreatedDate'],
+    },
+    'Lead': {
+        'all_columns': ['LeadID', 'AccountID', 'LeadSource', 'Status', 'Budget', 'CreatedDate'],
+        'numerical_columns': ['LeadID', 'AccountID', 'Budget'],
+        'categorical_columns': ['LeadSource', 'Status'],
+        'date_columns': ['CreatedDate'],
+    },
+}
+
+
+class TestRollups(unittest.TestCase):
+    """Rollup answers must equal the GROUP BY query over the base table."""
+
+    def setUp(self):
+        """Create and seed a temporary SQLite database and rollup store."""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'source.db')
+        init_sqlite_schema(self.db_path)
+
+        random.seed(3)
+        self.engine = create_engine(f'sqlite:///{self.db_path}')
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            seed_sqlite_data.seed_accounts(cursor)
+            seed_sqlite_data.seed_leads(cursor)
+            raw.commit()
+        finally:
+            raw.close()
+
+        self.conn = self.engine.connect()
+        self.specs = rollup_specs_from_schema(SCHEMA)
+        self.store = RollupStore(RollupSettings(
+            refresh_seconds=0, sqlite_path=os.path.join(self.temp_dir.name, 'rollups.db')
+        ))
+
+    def tearDown(self):
+        """Clean up temporary databases."""
+        self.conn.close()
+        self.engine.dispose()
+        self.temp_dir.cleanup()
+
+    def assert_matches_base_table(self, table, x_axis, y_axis, aggregate_y):
+        validated = validate_chart_request(
+            {'table_name': table, 'chart_type': 'bar_chart', 'x_axis': x_axis, 'y_axis': y_axis, 'aggregate_y': aggregate_y},
+            SCHEMA
+        )
+        sql, _ = build_sql(validated, SCHEMA, db_type='sqlite')
+        expected = pd.read_sql(text(sql), self.conn).sort_values(x_axis).reset_index(drop=True)
+        actual = self.store.query(validated)
+
+        self.assertIsNotNone(actual, f"{aggregate_y}({y_axis}) by {x_axis} not answered from rollup")
+        self.assertEqual(list(actual.columns), list(expected.columns))
+        pd.testing.assert_frame_equal(actual.sort_values(x_axis).reset_index(drop=True), expected, check_dtype=False)
+
+    def assert_all_aggregates_match(self):
+        for aggregate_y in ('SUM', 'AVG', 'COUNT', 'MIN', 'MAX'):
+            self.assert_matches_base_table('Account', 'Region', 'Revenue', aggregate_y)
+            self.assert_matches_base_table('Account', 'Industry', 'Revenue', aggregate_y)
+            self.assert_matches_base_table('Lead', 'Status', 'Budget', aggregate_y)
+
+    def test_specs_from_schema(self):
+        lead = next(spec for spec in self.specs if spec.table == 'Lead')
+        self.assertEqual(lead.dimensions, ('LeadSource', 'Status'))
+        self.assertEqual(lead.measures, ('Budget',))
+        self.assertEqual(lead.key, 'LeadID')
+
+    def test_full_build_matches_base_table(self):
+        self.store.refresh(self.conn, self.specs)
+
+        self.assert_all_aggregates_match()
+        self.assertEqual(self.store.get_stats()['full_refreshes'], 2)
+
+    def test_incremental_refresh_merges_new_rows(self):
+        self.store.refresh(self.conn, self.specs)
+        self.conn.execute(text(
+            "INSERT INTO Account (AccountID, AccountName, Region, Industry, Revenue) VALUES "
+            "(10001, 'New A', 'North', 'Retail', 1e9), (10002, 'New B', 'Atlantis', 'Retail', NULL)"
+        ))
+        self.conn.execute(text("INSERT INTO Lead (LeadID, Status, Budget) VALUES (10001, 'New', -5)"))
+        self.conn.commit()
+
+        self.store.refresh(self.conn, self.specs)
+
+        self.assert_all_aggregates_match()
+        stats = self.store.get_stats()
+        self.assertEqual((stats['full_refreshes'], stats['refreshes']), (2, 2))
+
+    def test_deleted_rows_trigger_rebuild(self):
+        self.store.refresh(self.conn, self.specs)
+        self.conn.execute(text("DELETE FROM Account WHERE AccountID IN (SELECT MIN(AccountID) FROM Account)"))
+        self.conn.commit()
+
+        self.store.refresh(self.conn, self.specs)
+
+        self.assert_all_aggregates_match()
+        # Only Account is rebuilt; Lead has no new rows
+        stats = self.store.get_stats()
+        self.assertEqual((stats['full_refreshes'], stats['refreshes']), (3, 1))
+
+    def test_uncovered_or_stale_requests_fall_back(self):
+        self.store.refresh(self.conn, self.specs)
+
+        with_color = validate_chart_request({
+            'table_name': 'Lead', 'chart_type': 'bar_chart', 'x_axis': 'Status', 'y_axis': 'Budget',
+            'aggregate_y': 'SUM', 'color': 'LeadSource'
+        }, SCHEMA)
+        self.assertIsNone(self.store.query(with_color))
+
+        self.store.settings.max_staleness_seconds = 0
+        stale = validate_chart_request({
+            'table_name': 'Lead', 'chart_type': 'bar_chart', 'x_axis': 'Status', 'y_axis': 'Budget', 'aggregate_y': 'SUM'
+        }, SCHEMA)
+        self.assertIsNone(self.store.query(stale))
+
+    def test_high_cardinality_dimensions_are_skipped(self):
+        self.store.settings.max_groups = 10
+        self.store.refresh(self.conn, self.specs)
+
+        by_name = validate_chart_request({
+            'table_name': 'Account', 'chart_type': 'bar_chart', 'x_axis': 'AccountName', 'y_axis': 'Revenue', 'aggregate_y': 'SUM'
+        }, SCHEMA)
+        self.assertIsNone(self.store.query(by_name))
+        self.assert_matches_base_table('Account', 'Region', 'Revenue', 'SUM')
+
+    def test_rollups_are_opt_in(self):
+        self.assertEqual(RollupSettings().refresh_seconds, 0)
+
+    def test_cardinality_sql(self):
+        lead = next(spec for spec in self.specs if spec.table == 'Lead')
+        self.assertEqual(
+            build_cardinality_sql(lead, db_type='sqlserver'),
+            'SELECT COUNT(DISTINCT [LeadSource]) AS distinct_0, COUNT(DISTINCT [Status]) AS distinct_1 FROM [Lead]'
+        )
+
+    def test_line_charts_are_ordered_by_x(self):
+        self.store.refresh(self.conn, self.specs)
+
+        validated = validate_chart_request({
+            'table_name': 'Lead', 'chart_type': 'line_chart', 'x_axis': 'Status', 'y_axis': 'Budget', 'aggregate_y': 'SUM'
+        }, SCHEMA)
+        x_values = list(self.store.query(validated)['Status'])
+
+        self.assertEqual(x_values, sorted(x_values))
+        self.assert_matches_base_table('Lead', 'Status', 'Budget', 'SUM')
+
+    def test_sqlserver_dialect(self):
+        lead = next(spec for spec in self.specs if spec.table == 'Lead')
+        sql = build_rollup_sql(lead, 'Status', db_type='sqlserver', incremental=True)
+
+        self.assertIn('SUM(CAST([Budget] AS FLOAT)) AS sum_0', sql)
+        self.assertIn('[LeadID] <= :high AND [LeadID] > :low', sql)
+        self.assertTrue(sql.endswith('GROUP BY [Status]'))
+
+
+if __name__ == '__main__':
+    unittest.main()
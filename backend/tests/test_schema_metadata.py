@@ -0,0 +1,139 @@
+"""
+Tests for the shared column metadata store.
+"""
+import unittest
+
+from sqlalchemy import create_engine, event
+
+from backend.schema_metadata import (
+    ColumnMetadataStore,
+    SchemaSnapshot,
+    build_schema_snapshot,
+    classify_data_type,
+    load_information_schema_columns,
+)
+
+
+ROWS = [
+    ('Account', 'AccountID', 'int'),
+    ('Account', 'Region', 'nvarchar'),
+    ('Account', 'Revenue', 'decimal'),
+    ('Account', 'CreatedDate', 'datetime2'),
+    ('Lead', 'LeadID', 'int'),
+    ('Lead', 'Status', 'nvarchar'),
+]
+
+
+class TestSchemaSnapshot(unittest.TestCase):
+
+    def test_classify_data_type(self):
+        self.assertEqual(classify_data_type('INT'), 'numerical')
+        self.assertEqual(classify_data_type('money'), 'numerical')
+        self.assertEqual(classify_data_type('datetime2'), 'date')
+        self.assertEqual(classify_data_type('nvarchar'), 'categorical')
+        self.assertEqual(classify_data_type(None), 'categorical')
+
+    def test_build_snapshot_matches_schema_format(self):
+        snapshot = build_schema_snapshot(ROWS, table_order=['Lead', 'Account'])
+
+        self.assertEqual(list(snapshot.tables), ['Lead', 'Account'])
+        self.assertEqual(snapshot.tables['Account'], {
+            'all_columns': ['AccountID', 'Region', 'Revenue', 'CreatedDate'],
+            'numerical_columns': ['AccountID', 'Revenue'],
+            'date_columns': ['CreatedDate'],
+            'categorical_columns': ['Region'],
+        })
+        self.assertEqual(snapshot.get_column_types('Lead'), {'LeadID': 'int', 'Status': 'nvarchar'})
+        self.assertEqual(snapshot.get_date_columns('Account'), ['CreatedDate'])
+        self.assertEqual(snapshot.get_column_types('Missing'), {})
+
+    def test_version_tracks_schema_changes(self):
+        first = build_schema_snapshot(ROWS)
+        same = build_schema_snapshot(list(ROWS))
+        changed = build_schema_snapshot(ROWS + [('Lead', 'Budget', 'decimal')])
+
+        self.assertTrue(first.version)
+        self.assertEqual(first.version, same.version)
+        self.assertNotEqual(first.version, changed.version)
+
+
+class TestColumnMetadataStore(unittest.TestCase):
+
+    def test_loader_called_once_within_ttl(self):
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return ROWS
+
+        store = ColumnMetadataStore(loader, ttl=60)
+        first = store.get()
+        second = store.get()
+
+        self.assertIs(first, second)
+        self.assertEqual(len(calls), 1)
+
+        store.invalidate()
+        store.get()
+        self.assertEqual(len(calls), 2)
+
+    def test_failed_load_is_not_cached(self):
+        attempts = []
+
+        def loader():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("connection refused")
+            return ROWS
+
+        store = ColumnMetadataStore(loader, ttl=60)
+        self.assertIsInstance(store.get(), SchemaSnapshot)
+        self.assertEqual(store.get().tables['Lead']['categorical_columns'], ['Status'])
+        self.assertEqual(len(attempts), 2)
+
+
+class TestInformationSchemaLoader(unittest.TestCase):
+    """The batched loader issues a single query for all tables."""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+
+        @event.listens_for(self.engine, 'connect')
+        def attach_information_schema(dbapi_conn, _):
+            dbapi_conn.execute("ATTACH ':memory:' AS INFORMATION_SCHEMA")
+            dbapi_conn.execute(
+                "CREATE TABLE INFORMATION_SCHEMA.COLUMNS "
+                "(TABLE_NAME, COLUMN_NAME, DATA_TYPE, TABLE_CATALOG, ORDINAL_POSITION)"
+            )
+            dbapi_conn.executemany(
+                "INSERT INTO INFORMATION_SCHEMA.COLUMNS VALUES (?, ?, ?, ?, ?)",
+                [
+                    ('Lead', 'Status', 'nvarchar', 'crm', 2),
+                    ('Lead', 'LeadID', 'int', 'crm', 1),
+                    ('Account', 'AccountID', 'int', 'crm', 1),
+                    ('Account', 'AccountID', 'int', 'other_db', 1),
+                    ('Audit', 'AuditID', 'int', 'crm', 1),
+                ]
+            )
+            dbapi_conn.commit()
+
+        self.statements = []
+
+        @event.listens_for(self.engine, 'before_cursor_execute')
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+    def test_single_round_trip(self):
+        with self.engine.connect() as conn:
+            rows = load_information_schema_columns(conn, 'crm', ['Account', 'Lead'])
+
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual(rows, [
+            ('Account', 'AccountID', 'int'),
+            ('Lead', 'LeadID', 'int'),
+            ('Lead', 'Status', 'nvarchar'),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Tests for single-flight coalescing of concurrent identical work.
+"""
+import asyncio
+import unittest
+
+from backend.singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def work(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            return {'rows': [value]}
+
+        async def scenario():
+            return await asyncio.gather(*[flights.do('q', work, 1) for _ in range(5)])
+
+        results = asyncio.run(scenario())
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'rows': [1]}] * 5)
+        # Followers get copies, so mutating one result doesn't affect the others
+        results[1]['rows'].append(2)
+        self.assertEqual(results[2], {'rows': [1]})
+        self.assertEqual(flights.get_stats(), {'leaders': 1, 'followers': 4, 'in_flight': 0})
+
+    def test_different_keys_and_sequential_calls_run_separately(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def work(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key
+
+        async def scenario():
+            await asyncio.gather(flights.do('a', work, 'a'), flights.do('b', work, 'b'))
+            await flights.do('a', work, 'a')
+
+        asyncio.run(scenario())
+        self.assertEqual(sorted(calls), ['a', 'a', 'b'])
+
+    def test_errors_propagate_to_followers(self):
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise RuntimeError('database unavailable')
+
+        async def scenario():
+            return await asyncio.gather(*[flights.do('q', work) for _ in range(3)], return_exceptions=True)
+
+        results = asyncio.run(scenario())
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+        self.assertEqual(flights.get_stats()['in_flight'], 0)
+
+    def test_cancelled_leader_still_serves_followers(self):
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        async def scenario():
+            leader = asyncio.create_task(flights.do('q', work))
+            await asyncio.sleep(0)
+            follower = asyncio.create_task(flights.do('q', work))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await follower
+
+        self.assertEqual(asyncio.run(scenario()), 'done')
+
+    def test_join_and_finish(self):
+        flights = SingleFlight()
+
+        async def scenario():
+            is_leader, future = flights.join('k')
+            follower_is_leader, same_future = flights.join('k')
+            waiter = asyncio.create_task(flights.wait(same_future))
+            flights.finish('k', {'response': 'ok'})
+            return is_leader, follower_is_leader, future is same_future, await waiter
+
+        self.assertEqual(asyncio.run(scenario()), (True, False, True, {'response': 'ok'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+Parity tests for SQL-side aggregation.
+Compares safe_sql.build_sql GROUP BY results against the pandas groupby
+that fetch_data_for_chart used to run, on the seeded SQLite fixture.
+"""
+import unittest
+import os
+import random
+import sqlite3
+import tempfile
+
+import pandas as pd
+
+from backend.db_init import init_sqlite_schema
+from backend import seed_sqlite_data
+from backend.safe_sql import (
+    validate_chart_request,
+    build_sql,
+    get_aggregated_y_axis_name,
+    MAX_GROUPS,
+    MAX_ROWS,
+)
+
+
+def build_sqlite_schema_map(conn):
+    """Build a get_all_table_schemas()-style map from SQLite PRAGMA metadata."""
+    schema_map = {}
+    for table_name in ['Account', 'Contact', 'Lead', 'Opportunity']:
+        all_columns, numerical, dates, categorical = [], [], [], []
+        for _, col_name, col_type, *_ in conn.execute(f'PRAGMA table_info("{table_name}")'):
+            all_columns.append(col_name)
+            if col_type.upper() in ('INTEGER', 'NUMERIC'):
+                numerical.append(col_name)
+            elif col_name.endswith('Date'):
+                dates.append(col_name)
+            else:
+                categorical.append(col_name)
+        schema_map[table_name] = {
+            'all_columns': all_columns,
+            'numerical_columns': numerical,
+            'date_columns': dates,
+            'categorical_columns': categorical,
+        }
+    return schema_map
+
+
+def pandas_aggregate(df, x_col, y_col, aggregate_y):
+    """Reference implementation: the pandas aggregation previously run in app.py."""
+    if aggregate_y == 'COUNT':
+        return df.groupby(x_col).size().reset_index(name=f'Count of {y_col}')
+    grouped = df.groupby(x_col)[y_col]
+    if aggregate_y == 'SUM':
+        return grouped.sum().reset_index(name=f'Sum of {y_col}')
+    if aggregate_y == 'AVG':
+        return grouped.mean().reset_index(name=f'Average of {y_col}')
+    if aggregate_y == 'MIN':
+        return grouped.min().reset_index(name=f'Min of {y_col}')
+    return grouped.max().reset_index(name=f'Max of {y_col}')
+
+
+class TestSQLAggregationParity(unittest.TestCase):
+    """SQL GROUP BY results must match the pandas reference."""
+
+    CASES = [
+        ('Account', 'Region', 'Revenue'),
+        ('Account', 'Industry', 'Revenue'),
+        ('Lead', 'Status', 'Budget'),
+        ('Lead', 'LeadSource', 'Budget'),
+        ('Opportunity', 'Stage', 'Value'),
+        ('Contact', 'Role', 'ContactID'),
+    ]
+
+    def setUp(self):
+        """Create and seed a temporary SQLite database."""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        self.db_path = self.temp_db.name
+        self.temp_db.close()
+        init_sqlite_schema(self.db_path)
+
+        random.seed(42)
+        self.conn = sqlite3.connect(self.db_path)
+        cursor = self.conn.cursor()
+        seed_sqlite_data.seed_accounts(cursor)
+        seed_sqlite_data.seed_contacts(cursor)
+        seed_sqlite_data.seed_leads(cursor)
+        seed_sqlite_data.seed_opportunities(cursor)
+        self.conn.commit()
+        self.schema = build_sqlite_schema_map(self.conn)
+
+    def tearDown(self):
+        """Clean up temporary database."""
+        self.conn.close()
+        if os.path.exists(self.db_path):
+            os.unlink(self.db_path)
+
+    def run_sql_aggregate(self, table_name, x_col, y_col, aggregate_y):
+        validated = validate_chart_request(
+            {'table_name': table_name, 'chart_type': 'bar_chart',
+             'x_axis': x_col, 'y_axis': y_col, 'aggregate_y': aggregate_y},
+            self.schema
+        )
+        sql, params = build_sql(validated, self.schema, db_type='sqlite')
+        return pd.read_sql(sql, self.conn, params=params), get_aggregated_y_axis_name(validated)
+
+    def test_parity_with_pandas(self):
+        """Every aggregation matches pandas groupby for every dimension/measure pair."""
+        for table_name, x_col, y_col in self.CASES:
+            full_table = pd.read_sql(f'SELECT * FROM "{table_name}"', self.conn)
+            for aggregate_y in ['SUM', 'AVG', 'COUNT', 'MIN', 'MAX']:
+                with self.subTest(table=table_name, x=x_col, y=y_col, agg=aggregate_y):
+                    sql_df, y_name = self.run_sql_aggregate(table_name, x_col, y_col, aggregate_y)
+                    expected = pandas_aggregate(full_table, x_col, y_col, aggregate_y)
+
+                    self.assertEqual(list(sql_df.columns), list(expected.columns))
+                    self.assertEqual(sql_df.columns[1], y_name)
+                    self.assertLessEqual(len(sql_df), MAX_GROUPS)
+
+                    actual = sql_df.set_index(x_col)[y_name].sort_index()
+                    reference = expected.set_index(x_col)[y_name].sort_index()
+                    self.assertEqual(list(actual.index), list(reference.index))
+                    for key in reference.index:
+                        if pd.isna(reference[key]):
+                            self.assertTrue(pd.isna(actual[key]))
+                        else:
+                            self.assertAlmostEqual(float(actual[key]), float(reference[key]), places=4)
+
+    def test_results_sorted_by_value_descending(self):
+        """Aggregated rows come back largest first."""
+        sql_df, y_name = self.run_sql_aggregate('Account', 'Region', 'Revenue', 'SUM')
+        values = list(sql_df[y_name])
+        self.assertEqual(values, sorted(values, reverse=True))
+
+    def test_group_limit_keeps_largest_groups(self):
+        """More than MAX_GROUPS categories are cut to the top MAX_GROUPS by value."""
+        rows = [(1000 + i, f'Account_{i}', f'Region_{i}', float(i)) for i in range(MAX_GROUPS + 25)]
+        self.conn.executemany(
+            "INSERT INTO Account (AccountID, AccountName, Region, Revenue) VALUES (?, ?, ?, ?)", rows
+        )
+        self.conn.commit()
+
+        sql_df, y_name = self.run_sql_aggregate('Account', 'Region', 'Revenue', 'SUM')
+        full_table = pd.read_sql('SELECT * FROM "Account"', self.conn)
+        expected = pandas_aggregate(full_table, 'Region', 'Revenue', 'SUM')
+        expected = expected.sort_values(y_name, ascending=False).head(MAX_GROUPS)
+
+        self.assertEqual(len(sql_df), MAX_GROUPS)
+        self.assertEqual(set(sql_df['Region']), set(expected['Region']))
+
+
+    def test_series_are_ordered_by_x_without_group_limit(self):
+        """Aggregated line charts and date/numeric x axes come back in x order, every point kept."""
+        rows = [(1000 + i, f'2031-{1 + i // 28:02d}-{1 + i % 28:02d}', float(i % 7)) for i in range(MAX_GROUPS + 25)]
+        self.conn.executemany("INSERT INTO Opportunity (OpportunityID, ExpectedCloseDate, Value) VALUES (?, ?, ?)", rows)
+        self.conn.commit()
+        distinct_dates = self.conn.execute(
+            'SELECT COUNT(DISTINCT ExpectedCloseDate) FROM Opportunity WHERE ExpectedCloseDate IS NOT NULL'
+        ).fetchone()[0]
+
+        for chart_type, x_col in (('line_chart', 'ExpectedCloseDate'), ('bar_chart', 'ExpectedCloseDate'), ('area_chart', 'Stage')):
+            with self.subTest(chart_type=chart_type, x=x_col):
+                validated = validate_chart_request(
+                    {'table_name': 'Opportunity', 'chart_type': chart_type,
+                     'x_axis': x_col, 'y_axis': 'Value', 'aggregate_y': 'SUM'},
+                    self.schema
+                )
+                sql, params = build_sql(validated, self.schema, db_type='sqlite')
+                x_values = list(pd.read_sql(sql, self.conn, params=params)[x_col])
+
+                self.assertEqual(x_values, sorted(x_values))
+                if x_col == 'ExpectedCloseDate':
+                    self.assertEqual(len(x_values), distinct_dates)
+
+
+class TestSQLServerAggregationSQL(unittest.TestCase):
+    """SQL Server dialect output for aggregated queries."""
+
+    SCHEMA = {
+        'Account': {
+            'all_columns': ['AccountID', 'Region', 'Revenue'],
+            'numerical_columns': ['AccountID', 'Revenue'],
+            'date_columns': [],
+            'categorical_columns': ['Region'],
+        }
+    }
+
+    def build(self, aggregate_y):
+        validated = validate_chart_request(
+            {'table_name': 'Account', 'chart_type': 'bar_chart',
+             'x_axis': 'Region', 'y_axis': 'Revenue', 'aggregate_y': aggregate_y},
+            self.SCHEMA
+        )
+        return build_sql(validated, self.SCHEMA, db_type='sqlserver')[0]
+
+    def test_group_by_with_top(self):
+        sql = self.build('SUM')
+        self.assertIn(f'SELECT TOP {MAX_GROUPS}', sql)
+        self.assertIn('GROUP BY [Region]', sql)
+        self.assertIn('WHERE [Region] IS NOT NULL', sql)
+        self.assertIn('ORDER BY [Sum of Revenue] DESC', sql)
+
+    def test_series_limit_is_the_callers_row_cap(self):
+        validated = validate_chart_request(
+            {'table_name': 'Account', 'chart_type': 'line_chart',
+             'x_axis': 'Region', 'y_axis': 'Revenue', 'aggregate_y': 'SUM'},
+            self.SCHEMA
+        )
+        self.assertIn(f'SELECT TOP {MAX_ROWS}', build_sql(validated, self.SCHEMA, db_type='sqlserver')[0])
+        self.assertIn('SELECT TOP 1000', build_sql(validated, self.SCHEMA, db_type='sqlserver', max_rows=1000)[0])
+
+    def test_avg_casts_to_float(self):
+        sql = self.build('AVG')
+        self.assertIn('AVG(CAST([Revenue] AS FLOAT)) AS [Average of Revenue]', sql)
+        self.assertIn('ORDER BY [Average of Revenue] DESC', sql)
+
+    def test_count_counts_rows(self):
+        self.assertIn('COUNT(*) AS [Count of Revenue]', self.build('COUNT'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Parity tests for SQL-side binning (density charts and histograms).
+Compares safe_sql.build_binned_sql bucket counts against numpy.histogram/histogram2d
+over the full column on the seeded SQLite fixture.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from backend.db_init import init_sqlite_schema
+from backend import seed_sqlite_data
+from backend.safe_sql import (
+    SafeSQLError,
+    build_binned_sql,
+    build_range_probe_sql,
+    build_sql,
+    choose_bins,
+    validate_chart_request,
+    MAX_DENSITY_BINS,
+    MAX_HISTOGRAM_BINS,
+    MAX_ROWS,
+)
+
+
+class TestSQLBinning(unittest.TestCase):
+    """Bucket counts computed in SQL must match NumPy over the same rows."""
+
+    def setUp(self):
+        """Create and seed a temporary SQLite database."""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        self.db_path = self.temp_db.name
+        self.temp_db.close()
+        init_sqlite_schema(self.db_path)
+
+        random.seed(7)
+        self.conn = sqlite3.connect(self.db_path)
+        cursor = self.conn.cursor()
+        seed_sqlite_data.seed_accounts(cursor)
+        seed_sqlite_data.seed_leads(cursor)
+        seed_sqlite_data.seed_opportunities(cursor)
+        self.conn.commit()
+
+    def tearDown(self):
+        """Clean up temporary database."""
+        self.conn.close()
+        if os.path.exists(self.db_path):
+            os.unlink(self.db_path)
+
+    def probe(self, table_name, columns):
+        sql = build_range_probe_sql(table_name, columns, db_type='sqlite')
+        return pd.read_sql(sql, self.conn).iloc[0]
+
+    def test_probe_matches_full_column(self):
+        probe = self.probe('Opportunity', ['Value', 'AccountID'])
+        full = pd.read_sql('SELECT Value, AccountID FROM "Opportunity"', self.conn).dropna()
+
+        self.assertEqual(probe['row_count'], len(full))
+        self.assertAlmostEqual(probe['min_0'], full['Value'].min())
+        self.assertAlmostEqual(probe['max_0'], full['Value'].max())
+        self.assertEqual(probe['min_1'], full['AccountID'].min())
+        self.assertEqual(probe['max_1'], full['AccountID'].max())
+
+    def test_2d_counts_match_histogram2d(self):
+        columns = ['Value', 'AccountID']
+        probe = self.probe('Opportunity', columns)
+        axes = [
+            choose_bins('Value', probe['min_0'], probe['max_0'], MAX_DENSITY_BINS),
+            choose_bins('AccountID', probe['min_1'], probe['max_1'], MAX_DENSITY_BINS, integer=True),
+        ]
+        binned = pd.read_sql(build_binned_sql('Opportunity', axes, db_type='sqlite'), self.conn)
+
+        full = pd.read_sql('SELECT Value, AccountID FROM "Opportunity"', self.conn).dropna()
+        edges = [axis.low + np.arange(axis.bins + 1) * axis.width for axis in axes]
+        expected, _, _ = np.histogram2d(full['Value'], full['AccountID'], bins=edges)
+
+        actual = np.zeros_like(expected)
+        actual[binned['bin_0'], binned['bin_1']] = binned['bin_count']
+        np.testing.assert_array_equal(actual, expected)
+        self.assertEqual(binned['bin_count'].sum(), probe['row_count'])
+        self.assertLessEqual(binned['bin_0'].max(), axes[0].bins - 1)
+
+    def test_histogram_counts_cover_whole_column(self):
+        probe = self.probe('Lead', ['Budget'])
+        axis = choose_bins('Budget', probe['min_0'], probe['max_0'], MAX_HISTOGRAM_BINS)
+        binned = pd.read_sql(build_binned_sql('Lead', [axis], db_type='sqlite'), self.conn)
+
+        budget = pd.read_sql('SELECT Budget FROM "Lead"', self.conn)['Budget'].dropna()
+        expected, _ = np.histogram(budget, bins=axis.low + np.arange(axis.bins + 1) * axis.width)
+
+        actual = np.zeros_like(expected)
+        actual[binned['bin_0']] = binned['bin_count']
+        np.testing.assert_array_equal(actual, expected)
+        self.assertLessEqual(len(binned), MAX_HISTOGRAM_BINS)
+
+    def test_histogram_counts_split_by_group(self):
+        probe = self.probe('Lead', ['Budget'])
+        axis = choose_bins('Budget', probe['min_0'], probe['max_0'], 20)
+        binned = pd.read_sql(build_binned_sql('Lead', [axis], db_type='sqlite', group_column='Status'), self.conn)
+
+        leads = pd.read_sql('SELECT Budget, Status FROM "Lead"', self.conn).dropna(subset=['Budget'])
+        self.assertEqual(list(binned.columns), ['bin_0', 'Status', 'bin_count'])
+        self.assertEqual(
+            binned.groupby('Status')['bin_count'].sum().to_dict(),
+            leads.groupby('Status').size().to_dict()
+        )
+
+    def test_bubble_size_is_averaged_per_bucket(self):
+        probe = self.probe('Opportunity', ['AccountID'])
+        axis = choose_bins('AccountID', probe['min_0'], probe['max_0'], 4)
+        binned = pd.read_sql(
+            build_binned_sql('Opportunity', [axis], db_type='sqlite', group_column='Stage', value_column='Value'), self.conn
+        )
+
+        full = pd.read_sql('SELECT AccountID, Stage, Value FROM "Opportunity"', self.conn).dropna(subset=['AccountID'])
+        full['bin_0'] = np.minimum(((full['AccountID'] - axis.low) // axis.width).astype(int), axis.bins - 1)
+        expected = full.groupby(['bin_0', 'Stage'])['Value'].mean().reset_index()
+        self.assertEqual(list(binned.columns), ['bin_0', 'Stage', 'bin_count', 'bin_value'])
+        np.testing.assert_allclose(
+            binned.sort_values(['bin_0', 'Stage'])['bin_value'].to_numpy(),
+            expected.sort_values(['bin_0', 'Stage'])['Value'].to_numpy()
+        )
+
+    def test_raw_histogram_values_are_not_capped_at_bin_limit(self):
+        schema = {'Lead': {'all_columns': ['Budget'], 'numerical_columns': ['Budget']}}
+        validated = validate_chart_request({'table_name': 'Lead', 'chart_type': 'histogram', 'x_axis': 'Budget'}, schema)
+        sql, _ = build_sql(validated, schema, db_type='sqlite')
+        self.assertTrue(sql.endswith(f'LIMIT {MAX_ROWS}'))
+
+    def test_small_integer_ranges_get_one_bin_per_value(self):
+        axis = choose_bins('Rating', 1, 5, MAX_DENSITY_BINS, integer=True)
+        self.assertEqual(axis.bins, 5)
+        self.assertEqual(axis.centers(), [1.0, 2.0, 3.0, 4.0, 5.0])
+
+        constant = choose_bins('Value', 3.5, 3.5, MAX_DENSITY_BINS)
+        self.assertEqual(constant.bins, 1)
+        self.assertEqual(constant.centers(), [3.5])
+
+    def test_sqlserver_dialect(self):
+        axes = [choose_bins('Value', 0, 100, 10), choose_bins('AccountID', 1, 30, 10, integer=True)]
+        sql = build_binned_sql('Opportunity', axes, db_type='sqlserver')
+
+        self.assertIn('CAST([Value] AS FLOAT)', sql)
+        self.assertIn('FROM [Opportunity]', sql)
+        self.assertIn('AS binned GROUP BY bin_0, bin_1', sql)
+        self.assertNotIn('TOP', sql)
+
+    def test_non_finite_bounds_are_rejected(self):
+        axis = choose_bins('Value', 0, 1, 10)
+        axis.width = float('nan')
+        with self.assertRaises(SafeSQLError):
+            build_binned_sql('Opportunity', [axis])
+
+
+if __name__ == '__main__':
+    unittest.main()
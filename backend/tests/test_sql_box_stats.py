@@ -0,0 +1,103 @@
+"""
+Parity tests for SQL-side box plot statistics.
+Compares safe_sql.build_box_stats_sql against pandas quantiles and Tukey
+fences over the full column on the seeded SQLite fixture.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+
+import pandas as pd
+
+from backend.db_init import init_sqlite_schema
+from backend import seed_sqlite_data
+from backend.safe_sql import (
+    BOX_STAT_COLUMNS,
+    MAX_GROUPS,
+    build_box_stats_sql,
+    validate_chart_request,
+)
+
+SCHEMA = {
+    'Lead': {
+        'all_columns': ['Budget', 'Status', 'LeadSource'],
+        'numerical_columns': ['Budget'],
+        'categorical_columns': ['Status', 'LeadSource'],
+    }
+}
+
+
+def _expected_stats(values: pd.Series) -> pd.Series:
+    q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    return pd.Series({
+        'n': len(values), 'q1': q1, 'median': median, 'q3': q3,
+        'lowerfence': values[values >= q1 - 1.5 * iqr].min(),
+        'upperfence': values[values <= q3 + 1.5 * iqr].max(),
+    })
+
+
+class TestSQLBoxStats(unittest.TestCase):
+    """Quartiles and fences computed in SQL must match pandas over the same rows."""
+
+    def setUp(self):
+        """Create and seed a temporary SQLite database."""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        self.db_path = self.temp_db.name
+        self.temp_db.close()
+        init_sqlite_schema(self.db_path)
+
+        random.seed(11)
+        self.conn = sqlite3.connect(self.db_path)
+        cursor = self.conn.cursor()
+        seed_sqlite_data.seed_accounts(cursor)
+        seed_sqlite_data.seed_leads(cursor)
+        self.conn.commit()
+        self.leads = pd.read_sql('SELECT Budget, Status, LeadSource FROM "Lead"', self.conn).dropna()
+
+    def tearDown(self):
+        """Clean up temporary database."""
+        self.conn.close()
+        if os.path.exists(self.db_path):
+            os.unlink(self.db_path)
+
+    def box_stats(self, **params):
+        validated = validate_chart_request(
+            {'table_name': 'Lead', 'chart_type': 'box_plot', 'x_axis': 'Status', 'y_axis': 'Budget', **params},
+            SCHEMA
+        )
+        return pd.read_sql(build_box_stats_sql(validated, db_type='sqlite'), self.conn)
+
+    def test_stats_match_pandas_per_category(self):
+        stats = self.box_stats()
+
+        self.assertEqual(list(stats.columns), ['Status'] + BOX_STAT_COLUMNS)
+        expected = self.leads.groupby('Status')['Budget'].apply(_expected_stats).unstack()
+        actual = stats.set_index('Status')[BOX_STAT_COLUMNS].sort_index()
+        pd.testing.assert_frame_equal(actual, expected[BOX_STAT_COLUMNS].sort_index(), check_dtype=False)
+        self.assertTrue(stats['n'].is_monotonic_decreasing)
+
+    def test_stats_split_by_color(self):
+        stats = self.box_stats(color='LeadSource')
+
+        self.assertEqual(list(stats.columns), ['Status', 'LeadSource'] + BOX_STAT_COLUMNS)
+        expected = self.leads.groupby(['Status', 'LeadSource'])['Budget'].apply(_expected_stats).unstack()
+        actual = stats.set_index(['Status', 'LeadSource'])[BOX_STAT_COLUMNS].sort_index()
+        pd.testing.assert_frame_equal(actual, expected[BOX_STAT_COLUMNS].sort_index(), check_dtype=False)
+
+    def test_sqlserver_dialect(self):
+        validated = validate_chart_request(
+            {'table_name': 'Lead', 'chart_type': 'box_plot', 'x_axis': 'Status', 'y_axis': 'Budget'}, SCHEMA
+        )
+        sql = build_box_stats_sql(validated, db_type='sqlserver')
+
+        self.assertIn('PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY CAST([Budget] AS FLOAT))', sql)
+        self.assertIn(f'SELECT TOP {MAX_GROUPS} s.[Status]', sql)
+        self.assertNotIn('ROW_NUMBER', sql)
+        self.assertNotIn('LIMIT', sql)
+
+
+if __name__ == '__main__':
+    unittest.main()
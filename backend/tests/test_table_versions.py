@@ -0,0 +1,128 @@
+"""
+Tests for per-table change detection used to validate cached responses.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from backend.db_init import init_sqlite_schema
+from backend import seed_sqlite_data
+from backend.table_versions import (
+    TableVersions,
+    build_fingerprint_sql,
+    change_marker_columns,
+    detects_updates,
+    fingerprints_from_rows,
+)
+
+COLUMN_TYPES = {
+    'Account': {'AccountID': 'integer', 'AccountName': 'text', 'Region': 'text', 'Revenue': 'numeric', 'CreatedDate': 'text'},
+    'Lead': {'LeadID': 'integer', 'Status': 'text', 'Budget': 'numeric', 'CreatedDate': 'text'},
+}
+
+
+class TestFingerprints(unittest.TestCase):
+    """Versions change with inserts, deletes and marker updates, and only for the affected table."""
+
+    def setUp(self):
+        """Create and seed a temporary SQLite database."""
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        self.db_path = self.temp_db.name
+        self.temp_db.close()
+        init_sqlite_schema(self.db_path)
+
+        random.seed(5)
+        self.conn = sqlite3.connect(self.db_path)
+        cursor = self.conn.cursor()
+        seed_sqlite_data.seed_accounts(cursor)
+        seed_sqlite_data.seed_leads(cursor)
+        self.conn.commit()
+
+    def tearDown(self):
+        """Clean up temporary database."""
+        self.conn.close()
+        if os.path.exists(self.db_path):
+            os.unlink(self.db_path)
+
+    def versions(self):
+        return fingerprints_from_rows(self.conn.execute(build_fingerprint_sql(COLUMN_TYPES)).fetchall())
+
+    def test_versions_are_stable_without_changes(self):
+        self.assertEqual(self.versions(), self.versions())
+        self.assertEqual(set(self.versions()), {'Account', 'Lead'})
+
+    def test_insert_changes_only_that_table(self):
+        before = self.versions()
+        self.conn.execute("INSERT INTO Lead (LeadID, Status, Budget) VALUES (9999, 'New', 10)")
+        after = self.versions()
+
+        self.assertNotEqual(before['Lead'], after['Lead'])
+        self.assertEqual(before['Account'], after['Account'])
+
+    def test_delete_and_marker_update_change_version(self):
+        before = self.versions()
+        self.conn.execute("DELETE FROM Account WHERE AccountID = (SELECT MIN(AccountID) FROM Account)")
+        deleted = self.versions()
+        self.conn.execute("UPDATE Account SET CreatedDate = '2999-01-01' WHERE AccountID = (SELECT MAX(AccountID) FROM Account)")
+
+        self.assertNotEqual(before['Account'], deleted['Account'])
+        self.assertNotEqual(deleted['Account'], self.versions()['Account'])
+
+    def test_marker_columns(self):
+        self.assertEqual(change_marker_columns('Account', COLUMN_TYPES['Account']), ['AccountID', 'CreatedDate'])
+        self.assertEqual(
+            change_marker_columns('Account', {'AccountID': 'int', 'RowVer': 'timestamp'}, db_type='sqlserver'), ['RowVer']
+        )
+        self.assertEqual(change_marker_columns('Notes', {'Body': 'nvarchar'}), [])
+
+    def test_detects_updates_only_with_rowversion_or_modified_date(self):
+        self.assertFalse(detects_updates('Account', COLUMN_TYPES['Account']))
+        self.assertTrue(detects_updates('Account', {'AccountID': 'integer', 'UpdatedAt': 'text'}))
+        self.assertTrue(detects_updates('Account', {'AccountID': 'int', 'RowVer': 'timestamp'}, db_type='sqlserver'))
+        # SQLite 'timestamp' columns are ordinary dates, not change counters
+        self.assertFalse(detects_updates('Account', {'AccountID': 'int', 'RowVer': 'timestamp'}))
+
+    def test_sqlserver_dialect(self):
+        sql = build_fingerprint_sql({'Account': {'AccountID': 'int', 'CreatedDate': 'datetime2'}}, db_type='sqlserver')
+
+        self.assertIn('CAST(MAX([AccountID]) AS NVARCHAR(64)) AS marker_0', sql)
+        self.assertIn('CONVERT(NVARCHAR(64), MAX([CreatedDate]), 126) AS marker_1', sql)
+        self.assertIn('FROM [Account]', sql)
+
+
+class TestTableVersions(unittest.TestCase):
+
+    def test_reloads_at_most_once_per_interval(self):
+        loads = []
+        versions = TableVersions(lambda: loads.append(1) or {'Account': 'v1'}, check_interval=60)
+
+        with patch('backend.table_versions.time.time', return_value=1000.0):
+            self.assertEqual(versions.get('Account'), 'v1')
+            self.assertEqual(versions.get('Account'), 'v1')
+        self.assertEqual(len(loads), 1)
+
+        with patch('backend.table_versions.time.time', return_value=1061.0):
+            versions.get('Account')
+        self.assertEqual(len(loads), 2)
+
+    def test_failed_check_makes_versions_unknown(self):
+        results = [{'Account': 'v1'}, RuntimeError('database unavailable'), {'Account': 'v2'}]
+
+        def loader():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        versions = TableVersions(loader, check_interval=0)
+        self.assertEqual(versions.get('Account'), 'v1')
+        self.assertIsNone(versions.get('Account'))
+        self.assertEqual(versions.get('Account'), 'v2')
+        self.assertEqual(versions.get_stats()['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,7 @@ import { Send, Bot, User, Loader2, ChevronDown, ChevronUp, MessageSquare, Rotate
 import { useLanguage } from '@/contexts/LanguageContext';
 import { ChartTypeSelector, ChartType } from './ChartTypeSelector';
 import { getApiUrl } from '@/config/api';
+import { readChatStream, parseRawData } from '@/lib/chatStream';
 
 interface Message {
   id: string;
@@ -19,11 +20,15 @@ interface ChatPanelProps {
     chartJson: any;
     rawData: any[];
     suggestions: string[];
-  }) => void;
+  }) => string | void;
+  // Fills in a streamed chart once its table data / follow-up suggestions arrive
+  onChartUpdated?: (id: string, update: { rawData?: any[]; suggestions?: string[] }) => void;
   suggestions: string[];
+  // Width in pixels the next chart will be drawn at; sizes server-side line/area downsampling
+  getPlotWidth?: () => number | undefined;
 }
 
-export const ChatPanel = ({ onChartGenerated, suggestions }: ChatPanelProps) => {
+export const ChatPanel = ({ onChartGenerated, onChartUpdated, suggestions, getPlotWidth }: ChatPanelProps) => {
   const { t, language, direction } = useLanguage();
   const [messages, setMessages] = useState<Message[]>([
     { id: '1', role: 'assistant', content: t.welcomeMessage }
@@ -31,6 +36,7 @@ export const ChatPanel = ({ onChartGenerated, suggestions }: ChatPanelProps) =>
   const [input, setInput] = useState('');
   const [selectedChartType, setSelectedChartType] = useState<ChartType>(null);
   const [isLoading, setIsLoading] = useState(false);
+  const [progressText, setProgressText] = useState('');
   const [isMinimized, setIsMinimized] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const requestInFlightRef = useRef<boolean>(false);
@@ -71,15 +77,18 @@ export const ChatPanel = ({ onChartGenerated, suggestions }: ChatPanelProps) =>
     setMessages(prev => [...prev, userMessage]);
     setInput('');
     setIsLoading(true);
+    setProgressText('');
 
     try {
-      const response = await fetch(getApiUrl('chat'), {
+      const plotWidth = getPlotWidth?.();
+      const response = await fetch(getApiUrl('chat/stream'), {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
           message: messageToSend,
           language: language,
           forced_chart_type: selectedChartType,
+          plot_width: plotWidth ? Math.round(plotWidth) : undefined,
         }),
         signal: abortController.signal,
       });
@@ -89,7 +98,37 @@ export const ChatPanel = ({ onChartGenerated, suggestions }: ChatPanelProps) =>
         throw new Error(errorData.error || `HTTP ${response.status}: ${response.statusText}`);
       }
 
-      const data = await response.json();
+      let data: any = null;
+      // Holder object so the stream callback's assignment is visible after the await
+      const streamed: { chartId: string | null } = { chartId: null };
+
+      if ((response.headers.get('content-type') || '').includes('text/event-stream')) {
+        // Render each stage as soon as the backend finishes it
+        await readChatStream(response, ({ event, data: payload }) => {
+          if (event === 'params') {
+            if (payload.title) setProgressText(payload.title);
+          } else if (event === 'chart') {
+            streamed.chartId = onChartGenerated({
+              title: payload.title || messageToSend,
+              chartJson: payload.chart_json,
+              rawData: [],
+              suggestions: [],
+            }) || null;
+          } else if (event === 'raw_data') {
+            if (streamed.chartId) onChartUpdated?.(streamed.chartId, { rawData: parseRawData(payload.raw_data) });
+          } else if (event === 'suggestions') {
+            if (streamed.chartId) onChartUpdated?.(streamed.chartId, { suggestions: payload.suggestions || [] });
+          } else if (event === 'done' || event === 'error') {
+            data = payload;
+          }
+        });
+      } else {
+        data = await response.json();
+      }
+
+      if (!data) {
+        throw new Error('Stream ended without a result');
+      }
 
       // Log debug info if available (development mode)
       if (data._debug) {
@@ -115,13 +154,23 @@ export const ChatPanel = ({ onChartGenerated, suggestions }: ChatPanelProps) =>
           isError: true,
         };
         setMessages(prev => [...prev, assistantMessage]);
+      } else if (streamed.chartId) {
+        // Chart was already added to the grid by the 'chart' event
+        const assistantMessage: Message = {
+          id: (Date.now() + 1).toString(),
+          role: 'assistant',
+          content: language === 'ar' 
+            ? 'تم إنشاء الرسم البياني بنجاح! يمكنك رؤيته في الشبكة على اليسار.'
+            : 'Chart generated successfully! You can see it in the grid.',
+        };
+        setMessages(prev => [...prev, assistantMessage]);
       } else if (data.ok === true && data.rows && data.rows.length > 0) {
         // Handle response: manual chart selection mode (chart_json only)
         const chartData = data.chart_json
           ? {
               title: data.chart?.title || messageToSend,
               chartJson: data.chart_json,
-              rawData: data.rows || data.raw_data || [],
+              rawData: data.rows || parseRawData(data.raw_data),
               suggestions: data.suggestions || [],
             }
           : null;
@@ -151,7 +200,7 @@ export const ChatPanel = ({ onChartGenerated, suggestions }: ChatPanelProps) =>
         onChartGenerated({
           title: messageToSend,
           chartJson: data.chart_json,
-          rawData: data.raw_data || [],
+          rawData: parseRawData(data.raw_data),
           suggestions: data.suggestions || [],
         });
 
@@ -191,6 +240,7 @@ export const ChatPanel = ({ onChartGenerated, suggestions }: ChatPanelProps) =>
       lastPendingMessageRef.current = '';
       abortControllerRef.current = null;
       setIsLoading(false);
+      setProgressText('');
     }
   };
 
@@ -438,7 +488,7 @@ export const ChatPanel = ({ onChartGenerated, suggestions }: ChatPanelProps) =>
                   </div>
                   <div className="chat-bubble-assistant flex items-center gap-2">
                     <Loader2 className="h-4 w-4 animate-spin text-accent" />
-                    <span className="text-sm text-muted-foreground">{t.generating}</span>
+                    <span className="text-sm text-muted-foreground">{progressText || t.generating}</span>
                   </div>
                 </motion.div>
               )}
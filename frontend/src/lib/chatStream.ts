@@ -0,0 +1,78 @@
+export interface ChatStreamEvent {
+  event: string;
+  data: any;
+}
+
+/**
+ * Parse a Server-Sent Events response body (as produced by POST /chat/stream)
+ * and invoke onEvent for each complete event as soon as it arrives.
+ */
+export async function readChatStream(
+  response: Response,
+  onEvent: (event: ChatStreamEvent) => void
+): Promise<void> {
+  if (!response.body) {
+    throw new Error('Streaming is not supported by this browser');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  const dispatch = (block: string) => {
+    let event = 'message';
+    const dataLines: string[] = [];
+    for (const line of block.split('\n')) {
+      if (line.startsWith('event:')) {
+        event = line.slice(6).trim();
+      } else if (line.startsWith('data:')) {
+        dataLines.push(line.slice(5).trimStart());
+      }
+    }
+    if (dataLines.length === 0) return;
+    onEvent({ event, data: JSON.parse(dataLines.join('\n')) });
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, '\n');
+
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      dispatch(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+    }
+  }
+
+  if (buffer.trim()) {
+    dispatch(buffer);
+  }
+}
+
+/**
+ * raw_data arrives column-oriented ({ columns, data }); the chart table expects row objects.
+ * Row arrays and JSON strings (older responses) are accepted as well.
+ */
+export function parseRawData(rawData: any): any[] {
+  if (Array.isArray(rawData)) return rawData;
+  if (typeof rawData === 'string' && rawData) {
+    try {
+      return parseRawData(JSON.parse(rawData));
+    } catch {
+      return [];
+    }
+  }
+  if (rawData && Array.isArray(rawData.columns) && Array.isArray(rawData.data)) {
+    const columns: string[] = rawData.columns;
+    return rawData.data.map((values: any[]) => {
+      const row: Record<string, any> = {};
+      columns.forEach((column, i) => {
+        row[column] = values[i];
+      });
+      return row;
+    });
+  }
+  return [];
+}
@@ -29,7 +29,7 @@ const Insights = () => {
     suggestions?: string[];
   }) => {
     const newChart: ChartData = {
-      id: Date.now().toString(),
+      id: `${Date.now()}-${Math.random().toString(36).slice(2, 8)}`,
       title: data.title,
       chartJson: data.chartJson,
       rawData: data.rawData,
@@ -38,6 +38,19 @@ const Insights = () => {
     if (data.suggestions && data.suggestions.length > 0) {
       setSuggestions(data.suggestions);
     }
+    return newChart.id;
+  }, []);
+
+  const handleChartUpdated = useCallback((id: string, update: {
+    rawData?: any[];
+    suggestions?: string[];
+  }) => {
+    if (update.rawData) {
+      setCharts(prev => prev.map(chart => chart.id === id ? { ...chart, rawData: update.rawData } : chart));
+    }
+    if (update.suggestions && update.suggestions.length > 0) {
+      setSuggestions(update.suggestions);
+    }
   }, []);
 
   const handleRemoveChart = useCallback((id: string) => {
@@ -52,6 +65,16 @@ const Insights = () => {
 
   const chartsContainerRef = useRef<HTMLDivElement>(null);
 
+  // Charts share one grid column width: measure a drawn plot, or the column before the first chart
+  const getPlotWidth = useCallback(() => {
+    const container = chartsContainerRef.current;
+    if (!container) return undefined;
+    const plot = container.querySelector<HTMLElement>('.plotly-container');
+    if (plot) return plot.clientWidth;
+    const columns = window.matchMedia('(min-width: 1280px)').matches ? 2 : 1;
+    return container.clientWidth / columns;
+  }, []);
+
   const handleDownloadDashboard = useCallback(async () => {
     // Frontend-only: Export dashboard as image
     if (!chartsContainerRef.current || charts.length === 0) {
@@ -171,7 +194,9 @@ const Insights = () => {
             <div className="sticky top-24">
               <ChatPanel
                 onChartGenerated={handleChartGenerated}
+                onChartUpdated={handleChartUpdated}
                 suggestions={suggestions}
+                getPlotWidth={getPlotWidth}
               />
             </div>
           </div>
@@ -203,10 +228,13 @@ const Insights = () => {
                 </button>
                 <ChatPanel
                   onChartGenerated={(data) => {
-                    handleChartGenerated(data);
+                    const id = handleChartGenerated(data);
                     setShowMobileChat(false);
+                    return id;
                   }}
+                  onChartUpdated={handleChartUpdated}
                   suggestions={suggestions}
+                  getPlotWidth={getPlotWidth}
                 />
               </div>
             </motion.div>
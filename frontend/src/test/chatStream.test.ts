@@ -0,0 +1,103 @@
+import { describe, it, expect } from "vitest";
+
+import { parseRawData, readChatStream, type ChatStreamEvent } from "@/lib/chatStream";
+
+// A fetch Response whose body yields the given chunks one read() at a time
+const streamResponse = (chunks: Uint8Array[], onRead: () => void = () => {}): Response => {
+  let index = 0;
+  return {
+    body: {
+      getReader: () => ({
+        read: async () => {
+          onRead();
+          return index < chunks.length ? { done: false, value: chunks[index++] } : { done: true, value: undefined };
+        },
+      }),
+    },
+  } as unknown as Response;
+};
+
+const collect = async (chunks: Uint8Array[]): Promise<ChatStreamEvent[]> => {
+  const events: ChatStreamEvent[] = [];
+  await readChatStream(streamResponse(chunks), (event) => events.push(event));
+  return events;
+};
+
+const encode = (text: string) => new TextEncoder().encode(text);
+
+describe("readChatStream", () => {
+  const body =
+    'event: params\ndata: {"chart_type": "bar_chart", "title": "Valeur par étape"}\n\n' +
+    'event: chart\ndata: {"chart_json": {"data": []}}\n\n' +
+    'event: done\ndata: {"suggestions": ["a", "b"]}\n\n';
+  const expected = [
+    { event: "params", data: { chart_type: "bar_chart", title: "Valeur par étape" } },
+    { event: "chart", data: { chart_json: { data: [] } } },
+    { event: "done", data: { suggestions: ["a", "b"] } },
+  ];
+
+  it("dispatches every event of a single chunk in order", async () => {
+    expect(await collect([encode(body)])).toEqual(expected);
+  });
+
+  it("reassembles events split across chunks at any byte", async () => {
+    const bytes = encode(body);
+    for (let cut = 1; cut < bytes.length; cut++) {
+      // Includes cuts inside the blank-line separator and inside the multi-byte "é"
+      expect(await collect([bytes.slice(0, cut), bytes.slice(cut)])).toEqual(expected);
+    }
+  });
+
+  it("accepts CRLF line endings and a final event without a trailing blank line", async () => {
+    const events = await collect([encode('event: error\r\ndata: {"error_type": "DATA_ERROR"}\r\n\r\nevent: done\r\ndata: {}')]);
+
+    expect(events).toEqual([
+      { event: "error", data: { error_type: "DATA_ERROR" } },
+      { event: "done", data: {} },
+    ]);
+  });
+
+  it("emits nothing until an event is complete", async () => {
+    const events: ChatStreamEvent[] = [];
+    const chunks = [encode('event: chart\ndata: {"chart'), encode('_json": 1}\n'), encode("\n")];
+    const seenBeforeRead: number[] = [];
+    const response = streamResponse(chunks, () => seenBeforeRead.push(events.length));
+
+    await readChatStream(response, (event) => events.push(event));
+
+    expect(seenBeforeRead).toEqual([0, 0, 0, 1]);
+    expect(events).toEqual([{ event: "chart", data: { chart_json: 1 } }]);
+  });
+});
+
+describe("parseRawData", () => {
+  // As sent by the backend: DataFrame.to_json(orient="split", date_format="iso"), NaN/NaT as null
+  const split = {
+    columns: ["Stage", "Sum of Value", "ExpectedCloseDate"],
+    data: [
+      ["Prospecting", 1250.5, "2024-03-01T00:00:00.000"],
+      ["Closed Won", null, null],
+    ],
+  };
+  const rows = [
+    { Stage: "Prospecting", "Sum of Value": 1250.5, ExpectedCloseDate: "2024-03-01T00:00:00.000" },
+    { Stage: "Closed Won", "Sum of Value": null, ExpectedCloseDate: null },
+  ];
+
+  it("turns split columns and values into row objects", () => {
+    expect(parseRawData(split)).toEqual(rows);
+  });
+
+  it("round-trips through the JSON text of a response", () => {
+    const parsed = parseRawData(JSON.stringify(split));
+
+    expect(parsed).toEqual(rows);
+    expect(Number.isNaN(Date.parse(parsed[0].ExpectedCloseDate))).toBe(false);
+  });
+
+  it("accepts row arrays and ignores anything else", () => {
+    expect(parseRawData(rows)).toBe(rows);
+    expect(parseRawData("not json")).toEqual([]);
+    expect(parseRawData(undefined)).toEqual([]);
+  });
+});